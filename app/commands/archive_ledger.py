@@ -0,0 +1,63 @@
+"""
+Ledger Archival 🧊
+
+Moves the history of settled users created before --before out of transaction_logs
+into transaction_log_archive, leaving one opening balance per entity in its place
+(see app.services.archive). Safe to run while workers are posting, but not
+concurrently with itself; rerunning with the same date finishes an interrupted run.
+
+Usage:
+    python -m app.commands.archive_ledger --before 2024-01-01 --dry-run
+    python -m app.commands.archive_ledger --before 2024-01-01 --chunk-size 10000
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import UTC, date, datetime
+from datetime import time as clock_time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.config import get_database_url, load_env_files
+from app.db.partitioning import install_log_partitions
+from app.services.archive import LedgerArchiveService
+
+
+async def archive(url: str, before: date, dry_run: bool, chunk_size: int) -> None:
+    engine = create_async_engine(url)
+    install_log_partitions(engine)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    started = time.perf_counter()
+    try:
+        cutoff = datetime.combine(before, clock_time.min, tzinfo=UTC)
+        stats = await LedgerArchiveService(session_factory, chunk_size).archive(cutoff, dry_run=dry_run)
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
+    finally:
+        await engine.dispose()
+
+    verb = "Would archive" if dry_run else "Archived"
+    print(
+        f"{verb} {stats.logs:,} logs of {stats.users:,} users ({stats.entities:,} entities) "
+        f"in {time.perf_counter() - started:.3f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--before", type=date.fromisoformat, required=True, help="Archive logs created before this date"
+    )
+    parser.add_argument("--url", help="Async database URL (default: DIVVY_DATABASE_URL)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived")
+    parser.add_argument("--chunk-size", type=int, default=5_000, help="Logs moved per transaction")
+    args = parser.parse_args()
+
+    load_env_files()
+    asyncio.run(archive(args.url or get_database_url(), args.before, args.dry_run, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Bank Statement Import 🏦
+
+Imports a CSV or OFX bank statement into a user's CASH and SHARED_COST entities
+(see app.services.statement_import). Progress is checkpointed per chunk: rerunning
+the same command after an interruption resumes where it stopped, and transactions
+already imported (also from overlapping statements) are skipped.
+
+CSV files need a header with date, amount and description columns; category and
+reference columns are used when present. Negative amounts are money going out.
+
+Usage:
+    python -m app.commands.import_statement statement.ofx --user 7
+    python -m app.commands.import_statement export.csv --user 7 --default-catalog Groceries
+    python -m app.commands.import_statement bank.csv --user 7 --date-format %d/%m/%Y --amount-column Betrag
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.config import get_database_url, load_env_files
+from app.core.statements import STATEMENT_FORMATS, CsvColumns
+from app.db.partitioning import install_log_partitions
+from app.exceptions import BusinessRuleError
+from app.services.statement_import import StatementImportService
+
+
+async def import_statement(url: str, args: argparse.Namespace, columns: CsvColumns) -> None:
+    engine = create_async_engine(url)
+    install_log_partitions(engine)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    try:
+        stats = await StatementImportService(session_factory, args.chunk_size).import_file(
+            args.file,
+            args.user,
+            statement_format=args.format,
+            default_catalog=args.default_catalog,
+            columns=columns,
+            date_format=args.date_format,
+            encoding=args.encoding,
+        )
+    except (BusinessRuleError, OSError, ValueError) as exc:
+        raise SystemExit(str(exc)) from exc
+    finally:
+        await engine.dispose()
+
+    resumed = f" (resumed at byte {stats.resumed_from:,})" if stats.resumed_from else ""
+    print(
+        f"Read {stats.lines:,} lines{resumed}: posted {stats.posted:,}, skipped {stats.duplicates:,} duplicates "
+        f"and {stats.skipped:,} zero amounts in {stats.elapsed_seconds:.3f}s"
+    )
+
+
+def main() -> None:
+    defaults = CsvColumns()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", help="Statement file")
+    parser.add_argument("--user", type=int, required=True, help="Owner of the bank account")
+    parser.add_argument("--format", choices=STATEMENT_FORMATS, help="Statement format (default: from the extension)")
+    parser.add_argument("--url", help="Async database URL (default: DIVVY_DATABASE_URL)")
+    parser.add_argument("--default-catalog", help="Expense catalog for lines no catalog matches")
+    parser.add_argument("--date-format", help="strptime format of CSV dates (default: ISO or YYYYMMDD)")
+    parser.add_argument("--encoding", default="utf-8", help="CSV file encoding (default: utf-8)")
+    for field in CsvColumns._fields:
+        option = f"--{field}-column"
+        parser.add_argument(option, default=getattr(defaults, field), help=f"CSV header of the {field} column")
+    parser.add_argument("--chunk-size", type=int, default=1_000, help="Statement lines posted per transaction")
+    args = parser.parse_args()
+
+    load_env_files()
+    columns = CsvColumns(*(getattr(args, f"{field}_column") for field in CsvColumns._fields))
+    asyncio.run(import_statement(args.url or get_database_url(), args, columns))
+
+
+if __name__ == "__main__":
+    main()
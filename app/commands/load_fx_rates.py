@@ -0,0 +1,62 @@
+"""
+FX Rate Loading 💱
+
+Loads exchange rates from local CSV files (header: base,quote,rate,effective_at)
+into fx_rates, replacing rates already loaded for the same pair and time. With
+--add-columns, first adds the currency columns to a database created before the
+ledger became multi-currency (see app.db.currency).
+
+Usage:
+    python -m app.commands.load_fx_rates rates.csv
+    python -m app.commands.load_fx_rates ecb_2025.csv ecb_2026.csv --add-columns
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.config import get_database_url, load_env_files
+from app.core.fx import read_rates_csv
+from app.db.currency import add_currency_columns
+from app.db.partitioning import install_log_partitions
+from app.repositories import FxRateRepository
+
+
+async def load(url: str, files: list[str], add_columns: bool) -> None:
+    engine = create_async_engine(url)
+    install_log_partitions(engine)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    started = time.perf_counter()
+    try:
+        if add_columns:
+            tables = await add_currency_columns(engine)
+            print(f"Added the currency column to {len(tables)} table(s): {', '.join(tables) or '-'}")
+        written = 0
+        async with session_factory() as session, session.begin():
+            repo = FxRateRepository(session)
+            for path in files:
+                written += await repo.add_rates(read_rates_csv(path))
+    except (OSError, ValueError) as exc:
+        raise SystemExit(str(exc)) from exc
+    finally:
+        await engine.dispose()
+
+    print(f"Loaded {written:,} rates from {len(files)} file(s) in {time.perf_counter() - started:.3f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="Rate files (CSV)")
+    parser.add_argument("--url", help="Async database URL (default: DIVVY_DATABASE_URL)")
+    parser.add_argument("--add-columns", action="store_true", help="Add missing currency columns first")
+    args = parser.parse_args()
+
+    load_env_files()
+    asyncio.run(load(args.url or get_database_url(), args.files, args.add_columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Transaction Log Partition Maintenance 🗂️
+
+Keeps transaction_logs partitioned by DIVVY_LOG_PARTITION_PERIOD (month or year):
+- PostgreSQL: creates the partitions for the coming months (and, with --convert,
+  first turns the existing table into a partitioned one).
+- SQLite: moves closed periods out of the main database into per-period files
+  under DIVVY_LOG_PARTITION_DIR.
+
+Run it periodically (e.g., daily from cron) while no other workers are posting;
+running workers must be restarted after a SQLite rotation.
+
+Usage:
+    python -m app.commands.maintain_log_partitions
+    python -m app.commands.maintain_log_partitions --convert --months-ahead 6
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import UTC, datetime
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import get_database_url, get_log_partition_directory, get_log_partition_period, load_env_files
+from app.db.partitioning import convert_to_partitioned, ensure_partitions, is_partitioned, rotate_sqlite_partitions
+
+
+async def maintain(url: str, convert: bool, months_ahead: int) -> None:
+    period = get_log_partition_period()
+    if period is None:
+        raise SystemExit("DIVVY_LOG_PARTITION_PERIOD is not set; nothing to do.")
+
+    engine = create_async_engine(url)
+    started = time.perf_counter()
+    try:
+        if engine.dialect.name == "postgresql":
+            async with engine.begin() as conn:
+                if not await is_partitioned(conn):
+                    if not convert:
+                        raise SystemExit("transaction_logs is not partitioned; rerun with --convert to migrate it.")
+                    await convert_to_partitioned(conn, period, months_ahead)
+                    print("Converted transaction_logs into a partitioned table.")
+                partitions = await ensure_partitions(conn, period, datetime.now(UTC), months_ahead)
+            print(f"Partitions up to date through {partitions[-1]}.")
+        elif engine.dialect.name == "sqlite":
+            moved = await rotate_sqlite_partitions(engine, period, get_log_partition_directory())
+            print(f"Moved logs into {len(moved)} partition(s): {', '.join(moved) or '-'}")
+        else:
+            raise SystemExit(f"Log partitioning is not supported on {engine.dialect.name}.")
+    finally:
+        await engine.dispose()
+    print(f"Done in {time.perf_counter() - started:.3f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Async database URL (default: DIVVY_DATABASE_URL)")
+    parser.add_argument(
+        "--convert", action="store_true", help="PostgreSQL: convert an unpartitioned transaction_logs table"
+    )
+    parser.add_argument("--months-ahead", type=int, default=3, help="PostgreSQL: months of partitions to pre-create")
+    args = parser.parse_args()
+
+    load_env_files()
+    asyncio.run(maintain(args.url or get_database_url(), args.convert, args.months_ahead))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Recurring Expense Materialization 🔁
+
+Posts every recurring expense occurrence due on or before --until (default: today,
+UTC), --batch-size schedules per transaction (see app.services.recurring). Safe to
+rerun, e.g. from cron or after a crash: occurrences that were posted are never
+posted again, and missed ones are caught up.
+
+Usage:
+    python -m app.commands.materialize_recurring
+    python -m app.commands.materialize_recurring --until 2026-12-31 --batch-size 500
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.config import get_database_url, load_env_files
+from app.core.datetime import utc_now
+from app.db.partitioning import install_log_partitions
+from app.exceptions import BusinessRuleError
+from app.repositories import AccountRepository, LedgerRepository, RecurringExpenseRepository
+from app.services.recurring import RecurringExpenseService
+
+
+async def materialize(url: str, until: date, batch_size: int) -> None:
+    engine = create_async_engine(url)
+    install_log_partitions(engine)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    started = time.perf_counter()
+    schedules = occurrences = finished = 0
+    try:
+        while True:
+            async with session_factory() as session, session.begin():
+                service = RecurringExpenseService(
+                    session, LedgerRepository(session), AccountRepository(session), RecurringExpenseRepository(session)
+                )
+                stats = await service.materialize(until, batch_size)
+            schedules += stats.schedules
+            occurrences += stats.occurrences
+            finished += stats.finished
+            if stats.schedules < batch_size:
+                break
+    except BusinessRuleError as exc:
+        raise SystemExit(str(exc)) from exc
+    finally:
+        await engine.dispose()
+
+    print(
+        f"Posted {occurrences:,} occurrences of {schedules:,} recurring expenses due by {until.isoformat()} "
+        f"({finished:,} schedules ended) in {time.perf_counter() - started:.3f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--until", type=date.fromisoformat, help="Post occurrences due on or before this date (default: today)"
+    )
+    parser.add_argument("--url", help="Async database URL (default: DIVVY_DATABASE_URL)")
+    parser.add_argument("--batch-size", type=int, default=1_000, help="Recurring expenses per transaction")
+    args = parser.parse_args()
+
+    load_env_files()
+    asyncio.run(materialize(args.url or get_database_url(), args.until or utc_now().date(), args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
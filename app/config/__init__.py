@@ -31,6 +31,30 @@ from .auth import (
     get_state_token_expire_delta,
     get_state_token_secret_key,
 )
+from .database import get_database_url, get_replica_database_url, get_replica_max_lag
+from .ledger import (
+    get_balance_shard_count,
+    get_balance_shard_hot_rate,
+    get_base_currency,
+    get_batch_id_block_size,
+    get_change_feed_queue_size,
+    get_change_feed_resync_interval,
+    get_change_feed_settle_delay,
+    get_drift_check_concurrency,
+    get_drift_check_interval,
+    get_drift_check_rate,
+    get_drift_check_sample_size,
+    get_idempotency_cache_size,
+    get_idempotency_key_ttl,
+    get_log_partition_directory,
+    get_log_partition_period,
+    get_posting_queue_max_batches,
+    get_posting_queue_max_delay,
+    get_report_cache_ttl,
+    get_snapshot_every_n_batches,
+    get_snapshot_interval,
+    get_snapshot_settle_delay,
+)
 from .log import setup_logging
 
 # Module-level logger (used before or during main app logging setup)
@@ -121,6 +145,10 @@ __all__ = [
     "get_state_token_expire_delta",
     # Other Auth / Account Management
     "get_account_link_request_expiration_delta",
+    # Database
+    "get_database_url",
+    "get_replica_database_url",
+    "get_replica_max_lag",
     # Application Configuration (URLs)
     "get_frontend_url",
     "get_google_redirect_uri",
@@ -131,4 +159,26 @@ __all__ = [
     "get_microsoft_client_id",
     "get_microsoft_client_secret",
     "get_microsoft_tenant_id",
+    # Ledger
+    "get_batch_id_block_size",
+    "get_snapshot_interval",
+    "get_snapshot_every_n_batches",
+    "get_snapshot_settle_delay",
+    "get_drift_check_interval",
+    "get_drift_check_sample_size",
+    "get_drift_check_concurrency",
+    "get_drift_check_rate",
+    "get_log_partition_period",
+    "get_log_partition_directory",
+    "get_posting_queue_max_delay",
+    "get_posting_queue_max_batches",
+    "get_balance_shard_count",
+    "get_balance_shard_hot_rate",
+    "get_idempotency_key_ttl",
+    "get_idempotency_cache_size",
+    "get_report_cache_ttl",
+    "get_base_currency",
+    "get_change_feed_queue_size",
+    "get_change_feed_resync_interval",
+    "get_change_feed_settle_delay",
 ]
@@ -0,0 +1,48 @@
+"""
+Database Configuration 🗄️
+
+This module defines the database connection settings.
+"""
+
+import os
+from datetime import timedelta
+
+# --- CONNECTION ---
+
+
+def get_database_url() -> str:
+    """
+    Get the async SQLAlchemy database URL.
+
+    Must use an async driver (aiosqlite, asyncpg, aiomysql, ...).
+    Returns:
+        Database URL (default: sqlite+aiosqlite:///data/expenses.db)
+    """
+    return os.getenv("DIVVY_DATABASE_URL", "sqlite+aiosqlite:///data/expenses.db")
+
+
+# --- READ REPLICA ---
+
+
+def get_replica_database_url() -> str | None:
+    """
+    Get the async SQLAlchemy URL of the read replica that serves reporting queries.
+
+    For SQLite, point it at the same file opened read-only, e.g.
+    sqlite+aiosqlite:///file:data/expenses.db?mode=ro&uri=true
+    Returns:
+        Replica URL, or None (default) to send every query to the primary.
+    """
+    return os.getenv("DIVVY_REPLICA_DATABASE_URL") or None
+
+
+def get_replica_max_lag() -> timedelta:
+    """
+    Get how far the replica may lag behind the primary before reads fall back to the primary.
+
+    The bound is read in seconds from the environment (DIVVY_REPLICA_MAX_LAG_SECONDS).
+    Returns:
+        Staleness bound (default: 5 seconds).
+    """
+    seconds = float(os.getenv("DIVVY_REPLICA_MAX_LAG_SECONDS", "5"))
+    return timedelta(seconds=seconds)
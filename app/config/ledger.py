@@ -0,0 +1,317 @@
+"""
+Ledger Configuration 📒
+
+This module defines tunables for the ledger (batch ID allocation, balance
+snapshots, etc.).
+"""
+
+import os
+from datetime import timedelta
+
+# --- BATCH ID ALLOCATION ---
+
+
+def get_batch_id_block_size() -> int:
+    """
+    Get the number of transaction_batch_id values each process reserves per database round trip.
+
+    IDs left unused in a block when the process exits are skipped, so larger blocks
+    trade gaps in the ID space for fewer round trips.
+    Returns:
+        Block size (default: 1000).
+
+    Raises:
+        ValueError: If DIVVY_BATCH_ID_BLOCK_SIZE is not a positive integer.
+    """
+    block_size = int(os.getenv("DIVVY_BATCH_ID_BLOCK_SIZE", "1000"))
+    if block_size < 1:
+        raise ValueError("DIVVY_BATCH_ID_BLOCK_SIZE must be a positive integer")
+    return block_size
+
+
+# --- BALANCE SNAPSHOTS ---
+
+
+def get_snapshot_interval() -> timedelta:
+    """
+    Get how often the scheduler writes balance snapshots.
+
+    The duration is read in seconds from the environment (DIVVY_SNAPSHOT_INTERVAL_SECONDS).
+    Returns:
+        Interval (default: 1 hour).
+    """
+    seconds = int(os.getenv("DIVVY_SNAPSHOT_INTERVAL_SECONDS", "3600"))
+    return timedelta(seconds=seconds)
+
+
+def get_snapshot_every_n_batches() -> int:
+    """
+    Get the number of posted batches after which a snapshot is due, regardless of the interval.
+
+    Returns:
+        Batch count (default: 10000).
+    """
+    return int(os.getenv("DIVVY_SNAPSHOT_EVERY_N_BATCHES", "10000"))
+
+
+def get_snapshot_settle_delay() -> timedelta:
+    """
+    Get how long a missing log ID must stay missing before a snapshot moves past it.
+
+    Log IDs are assigned before commit, so a gap in the IDs may be a posting that has
+    not committed yet; it is only given up on after the longest expected posting
+    transaction, otherwise a late commit below the snapshot's high-water mark would be missed.
+    The duration is read in seconds from the environment (DIVVY_SNAPSHOT_SETTLE_SECONDS).
+    Returns:
+        Settle delay (default: 60 seconds).
+    """
+    seconds = int(os.getenv("DIVVY_SNAPSHOT_SETTLE_SECONDS", "60"))
+    return timedelta(seconds=seconds)
+
+
+# --- BALANCE DRIFT DETECTION ---
+
+
+def get_drift_check_interval() -> timedelta:
+    """
+    Get the pause between two sampled balance-drift checks.
+
+    The duration is read in seconds from the environment (DIVVY_DRIFT_CHECK_INTERVAL_SECONDS).
+    Returns:
+        Interval (default: 5 minutes).
+    """
+    seconds = int(os.getenv("DIVVY_DRIFT_CHECK_INTERVAL_SECONDS", "300"))
+    return timedelta(seconds=seconds)
+
+
+def get_drift_check_sample_size() -> int:
+    """
+    Get the number of AccountEntity rows verified per drift check (half recently touched, half random).
+
+    Returns:
+        Sample size (default: 200).
+    """
+    return int(os.getenv("DIVVY_DRIFT_CHECK_SAMPLE_SIZE", "200"))
+
+
+def get_drift_check_concurrency() -> int:
+    """
+    Get the maximum number of entity checks in flight (i.e., connections held) at once.
+
+    Returns:
+        Concurrency (default: 2).
+
+    Raises:
+        ValueError: If DIVVY_DRIFT_CHECK_CONCURRENCY is not a positive integer.
+    """
+    concurrency = int(os.getenv("DIVVY_DRIFT_CHECK_CONCURRENCY", "2"))
+    if concurrency < 1:
+        raise ValueError("DIVVY_DRIFT_CHECK_CONCURRENCY must be a positive integer")
+    return concurrency
+
+
+def get_drift_check_rate() -> float:
+    """
+    Get the maximum number of entity checks started per second, so the detector never
+    competes with posting traffic.
+
+    Returns:
+        Checks per second (default: 20).
+
+    Raises:
+        ValueError: If DIVVY_DRIFT_CHECK_RATE is not a positive number.
+    """
+    rate = float(os.getenv("DIVVY_DRIFT_CHECK_RATE", "20"))
+    if not rate > 0:
+        raise ValueError("DIVVY_DRIFT_CHECK_RATE must be a positive number")
+    return rate
+
+
+# --- LOG PARTITIONING ---
+
+
+def get_log_partition_period() -> str | None:
+    """
+    Get the period by which transaction_logs is range-partitioned on created_at.
+
+    Returns:
+        "month", "year", or None when partitioning is disabled (default).
+
+    Raises:
+        ValueError: If DIVVY_LOG_PARTITION_PERIOD is set to anything else.
+    """
+    period = os.getenv("DIVVY_LOG_PARTITION_PERIOD", "").strip().lower()
+    if not period:
+        return None
+    if period not in ("month", "year"):
+        raise ValueError("DIVVY_LOG_PARTITION_PERIOD must be 'month' or 'year'")
+    return period
+
+
+def get_log_partition_directory() -> str:
+    """
+    Get the directory holding the per-period SQLite partition files.
+
+    Returns:
+        Directory path (default: data/log_partitions).
+    """
+    return os.getenv("DIVVY_LOG_PARTITION_DIR", "data/log_partitions")
+
+
+# --- GROUP-COMMIT POSTING QUEUE ---
+
+
+def get_posting_queue_max_delay() -> timedelta:
+    """
+    Get how long the posting queue waits for more postings before committing a group.
+
+    The duration is read in milliseconds from the environment (DIVVY_POSTING_QUEUE_MAX_DELAY_MS).
+    Returns:
+        Delay (default: 5 milliseconds).
+    """
+    milliseconds = float(os.getenv("DIVVY_POSTING_QUEUE_MAX_DELAY_MS", "5"))
+    return timedelta(milliseconds=milliseconds)
+
+
+def get_posting_queue_max_batches() -> int:
+    """
+    Get the maximum number of postings committed together in one transaction.
+
+    Returns:
+        Group size (default: 500).
+
+    Raises:
+        ValueError: If DIVVY_POSTING_QUEUE_MAX_BATCHES is not a positive integer.
+    """
+    max_batches = int(os.getenv("DIVVY_POSTING_QUEUE_MAX_BATCHES", "500"))
+    if max_batches < 1:
+        raise ValueError("DIVVY_POSTING_QUEUE_MAX_BATCHES must be a positive integer")
+    return max_batches
+
+
+# --- BALANCE SHARDS ---
+
+
+def get_balance_shard_count() -> int:
+    """
+    Get the number of balance counters a hot AccountEntity is split into.
+
+    Returns:
+        Shards per hot entity (default: 0, which disables sharding).
+    """
+    return int(os.getenv("DIVVY_BALANCE_SHARDS", "0"))
+
+
+def get_balance_shard_hot_rate() -> float:
+    """
+    Get the balance update rate at which an AccountEntity is promoted to sharded counters.
+
+    Returns:
+        Updates per second, per process (default: 20).
+    """
+    return float(os.getenv("DIVVY_BALANCE_SHARD_HOT_UPDATES_PER_SECOND", "20"))
+
+
+# --- IDEMPOTENT POSTING ---
+
+
+def get_idempotency_key_ttl() -> timedelta:
+    """
+    Get how long an idempotency key keeps returning its original batch.
+
+    Clients must not retry a submission for longer than this. The duration is read
+    in seconds from the environment (DIVVY_IDEMPOTENCY_KEY_TTL_SECONDS).
+    Returns:
+        Time to live (default: 24 hours).
+    """
+    seconds = int(os.getenv("DIVVY_IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+    return timedelta(seconds=seconds)
+
+
+def get_idempotency_cache_size() -> int:
+    """
+    Get the number of recently used idempotency keys each process keeps in memory.
+
+    Returns:
+        Cache size (default: 10000; 0 disables the cache).
+    """
+    return int(os.getenv("DIVVY_IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+
+# --- BALANCE REPORTS ---
+
+
+def get_report_cache_ttl() -> timedelta:
+    """
+    Get how long a cached balance sheet or trial balance may be served.
+
+    Reports are invalidated by postings committed in the same process; this bounds
+    how long postings from other processes can go unseen. The duration is read in
+    seconds from the environment (DIVVY_REPORT_CACHE_TTL_SECONDS).
+    Returns:
+        Time to live (default: 60 seconds; 0 disables the cache).
+    """
+    seconds = float(os.getenv("DIVVY_REPORT_CACHE_TTL_SECONDS", "60"))
+    return timedelta(seconds=seconds)
+
+
+# --- CURRENCIES ---
+
+
+def get_base_currency() -> str:
+    """
+    Get the ledger's base currency: the currency of entities and logs without one of
+    their own, and of converted reports unless another currency is requested.
+
+    Returns:
+        ISO 4217 code (default: USD).
+
+    Raises:
+        ValueError: If DIVVY_BASE_CURRENCY is not a three-letter code.
+    """
+    currency = os.getenv("DIVVY_BASE_CURRENCY", "USD").strip().upper()
+    if len(currency) != 3 or not currency.isalpha():
+        raise ValueError("DIVVY_BASE_CURRENCY must be a three-letter ISO 4217 code")
+    return currency
+
+
+# --- CHANGE FEED ---
+
+
+def get_change_feed_queue_size() -> int:
+    """
+    Get the number of ledger changes queued for each change feed subscriber before the
+    oldest are dropped. A subscriber that falls behind catches up from its cursor.
+
+    Returns:
+        Queue size per subscriber (default: 1000).
+    """
+    return int(os.getenv("DIVVY_CHANGE_FEED_QUEUE_SIZE", "1000"))
+
+
+def get_change_feed_resync_interval() -> timedelta:
+    """
+    Get how often change feed consumers re-read the ledger from their cursor without
+    being woken. In-process postings wake them at once; this bounds how long postings
+    from other processes can go unseen. The duration is read in seconds from the
+    environment (DIVVY_CHANGE_FEED_RESYNC_SECONDS).
+
+    Returns:
+        Resync interval (default: 60 seconds).
+    """
+    seconds = float(os.getenv("DIVVY_CHANGE_FEED_RESYNC_SECONDS", "60"))
+    return timedelta(seconds=seconds)
+
+
+def get_change_feed_settle_delay() -> timedelta:
+    """
+    Get how long a missing log ID must stay missing before a change feed consumer moves
+    its cursor past it. Log IDs are assigned before commit, so until then the gap may be
+    a posting that has not committed yet. The duration is read in seconds from the
+    environment (DIVVY_CHANGE_FEED_SETTLE_SECONDS).
+
+    Returns:
+        Settle delay (default: 10 seconds).
+    """
+    seconds = float(os.getenv("DIVVY_CHANGE_FEED_SETTLE_SECONDS", "10"))
+    return timedelta(seconds=seconds)
@@ -0,0 +1,45 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+# Amounts are stored as integer counts of minor units: multiples of 10^-AMOUNT_SCALE (see app.models.types.Money).
+AMOUNT_SCALE = 4
+
+# Smallest representable step of a stored amount or balance (one minor unit)
+AMOUNT_QUANTUM = Decimal(1).scaleb(-AMOUNT_SCALE)
+
+
+def to_decimal(value: Decimal | float | int | str) -> Decimal:
+    """
+    Converts a monetary amount to Decimal without inheriting binary float error.
+
+    Floats are converted through their shortest repr (e.g., 0.1 -> Decimal("0.1"),
+    not Decimal("0.1000000000000000055511151231257827...")).
+    """
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+def to_minor_units(value: Decimal | float | int | str) -> int:
+    """
+    Converts a monetary amount to its integer count of minor units (e.g., 12.34 -> 123400).
+    Digits beyond AMOUNT_SCALE are rounded half away from zero, as DECIMAL(14, 4) columns did.
+    """
+    return int(to_decimal(value).scaleb(AMOUNT_SCALE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(units: int | Decimal) -> Decimal:
+    """Converts an integer count of minor units back to an amount with AMOUNT_SCALE places (123400 -> 12.3400)."""
+    return Decimal(units).scaleb(-AMOUNT_SCALE)
+
+
+def sum_to_decimal(value: Decimal | float | int | str | None) -> Decimal:
+    """
+    Converts an SQL SUM() of amount columns to an exact Decimal with AMOUNT_SCALE places.
+
+    Sums over Money columns are computed on integers and arrive exact; the rounding
+    only matters for values that went through a float (e.g., SQLite's SUM() over
+    DECIMAL data that has not been migrated to minor units yet). NULL (an empty sum) is 0.
+    """
+    return to_decimal(value or 0).quantize(AMOUNT_QUANTUM)
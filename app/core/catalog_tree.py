@@ -0,0 +1,140 @@
+"""
+Expense Catalog Tree 🌳
+
+An immutable in-memory copy of the ExpenseCatalog hierarchy with O(1) ancestor /
+descendant checks, plus the process-wide cache it is served from.
+
+---
+DESIGN:
+- A depth-first walk numbers every catalog on entry and exit; A is an ancestor of
+  D exactly when A's interval encloses D's (nested-set intervals), so checks are
+  two comparisons. A subtree is a contiguous slice of the walk order.
+- The cache is invalidated when a transaction that changed a catalog commits
+  (app.models.catalog_closure). A generation counter keeps a load that raced
+  with an invalidation from caching the stale tree. Other processes keep their
+  copy until they invalidate it themselves or restart.
+"""
+
+import threading
+from collections.abc import Iterable
+from typing import NamedTuple
+
+
+class CatalogNode(NamedTuple):
+    """One expense catalog of the tree."""
+
+    id: int
+    name: str
+    parent_id: int | None
+
+
+class CatalogTree:
+    """
+    The ExpenseCatalog hierarchy. Catalogs whose parent is missing are treated as
+    top-level.
+    """
+
+    def __init__(self, nodes: Iterable[CatalogNode]):
+        self._nodes = {node.id: node for node in nodes}
+        self._children: dict[int | None, list[int]] = {}
+        for node in sorted(self._nodes.values(), key=lambda n: (n.name, n.id)):
+            parent_id = node.parent_id if node.parent_id in self._nodes else None
+            self._children.setdefault(parent_id, []).append(node.id)
+
+        # Depth-first walk: _enter/_exit bound each subtree in _order; _root/_depth are per node.
+        self._order: list[int] = []
+        self._enter: dict[int, int] = {}
+        self._exit: dict[int, int] = {}
+        self._root: dict[int, int] = {}
+        self._depth: dict[int, int] = {}
+        for root_id in self._children.get(None, []):
+            stack: list[tuple[int, int, bool]] = [(root_id, 0, False)]
+            while stack:
+                catalog_id, depth, visited = stack.pop()
+                if visited:
+                    self._exit[catalog_id] = len(self._order)
+                    continue
+                self._enter[catalog_id] = len(self._order)
+                self._order.append(catalog_id)
+                self._root[catalog_id] = root_id
+                self._depth[catalog_id] = depth
+                stack.append((catalog_id, depth, True))
+                stack.extend((child_id, depth + 1, False) for child_id in reversed(self._children.get(catalog_id, [])))
+
+    def __contains__(self, catalog_id: object) -> bool:
+        return catalog_id in self._enter
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def get(self, catalog_id: int) -> CatalogNode:
+        """
+        Raises:
+            KeyError: If the catalog is not part of the tree.
+        """
+        return self._nodes[catalog_id]
+
+    @property
+    def roots(self) -> list[CatalogNode]:
+        """Top-level catalogs, by name."""
+        return [self._nodes[root_id] for root_id in self._children.get(None, [])]
+
+    def children(self, catalog_id: int) -> list[CatalogNode]:
+        """Direct sub-catalogs, by name."""
+        return [self._nodes[child_id] for child_id in self._children.get(catalog_id, [])]
+
+    def is_ancestor(self, ancestor_id: int, descendant_id: int) -> bool:
+        """Whether `ancestor_id` is `descendant_id` or one of its ancestors. O(1)."""
+        if ancestor_id not in self._enter or descendant_id not in self._enter:
+            return False
+        return self._enter[ancestor_id] <= self._enter[descendant_id] < self._exit[ancestor_id]
+
+    def descendant_ids(self, catalog_id: int) -> list[int]:
+        """The catalog and everything below it, in depth-first order."""
+        return self._order[self._enter[catalog_id] : self._exit[catalog_id]]
+
+    def ancestors(self, catalog_id: int) -> list[CatalogNode]:
+        """Parent, grandparent, ... up to the top-level catalog (excluding the catalog itself)."""
+        path: list[CatalogNode] = []
+        parent_id = self._nodes[catalog_id].parent_id
+        while parent_id in self._nodes and len(path) < self._depth[catalog_id]:
+            path.append(self._nodes[parent_id])
+            parent_id = self._nodes[parent_id].parent_id
+        return path
+
+    def root_of(self, catalog_id: int) -> CatalogNode:
+        """The top-level catalog containing `catalog_id`. O(1)."""
+        return self._nodes[self._root[catalog_id]]
+
+    def depth(self, catalog_id: int) -> int:
+        """0 for top-level catalogs, 1 for their children, and so on."""
+        return self._depth[catalog_id]
+
+
+# --- Process-Wide Cache ---
+
+_lock = threading.Lock()
+_cached_tree: CatalogTree | None = None
+_generation = 0
+
+
+def get_cached_catalog_tree() -> tuple[CatalogTree | None, int]:
+    """Returns the cached tree (None if not loaded) and the cache generation to pass to cache_catalog_tree()."""
+    with _lock:
+        return _cached_tree, _generation
+
+
+def cache_catalog_tree(tree: CatalogTree, generation: int) -> None:
+    """Caches a freshly loaded tree, unless the catalog changed since `generation` was read."""
+    global _cached_tree
+    with _lock:
+        if generation == _generation:
+            _cached_tree = tree
+
+
+def invalidate_catalog_tree() -> None:
+    """Drops the cached tree; the next reader reloads it."""
+    global _cached_tree, _generation
+    with _lock:
+        _cached_tree = None
+        _generation += 1
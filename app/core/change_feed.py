@@ -0,0 +1,159 @@
+"""
+Ledger Change Feed 📣
+
+In-process publish/subscribe for committed postings: LedgerRepository publishes
+a LedgerChange once the transaction that recorded a batch commits, and every
+subscriber is woken without polling the database.
+
+---
+DESIGN:
+- The feed is a notification channel; the ledger itself is the durable log.
+  Consumers keep a cursor (the highest TransactionLog.id they have handled) and
+  read the logs after it from the database when woken, so a subscriber that
+  starts late, restarts, or misses changes catches up from its cursor
+  (app.services.change_feed).
+- Each subscriber has its own bounded queue, so one slow consumer never blocks
+  publishers or other subscribers. When a queue is full the oldest change is
+  dropped and counted; the next delivery reports the drop so the consumer knows
+  to re-read from its cursor rather than trust the changes it received.
+- Publishing is thread-safe: a change is handed to each subscriber's event loop,
+  directly when published from that loop, through call_soon_threadsafe otherwise.
+- Changes published by other processes are not seen; consumers that must observe
+  them still re-read from their cursor on a (much longer) timer.
+"""
+
+import asyncio
+import contextlib
+import threading
+from collections import deque
+from typing import NamedTuple, Self
+
+
+class LedgerChange(NamedTuple):
+    """Batches recorded by one committed transaction."""
+
+    batch_ids: tuple[int, ...]
+    entity_ids: frozenset[int]  # Entities on either side of the batches' logs
+    log_count: int
+
+
+class FeedDelivery(NamedTuple):
+    """Changes taken from a subscription at once, oldest first."""
+
+    changes: list[LedgerChange]
+    dropped: int  # Changes discarded since the previous delivery because the queue was full
+
+    @property
+    def batch_count(self) -> int:
+        return sum(len(change.batch_ids) for change in self.changes)
+
+    @property
+    def entity_ids(self) -> set[int]:
+        return {entity_id for change in self.changes for entity_id in change.entity_ids}
+
+
+class ChangeFeedSubscription:
+    """
+    A subscriber's bounded queue of changes. Must be created and consumed on one event
+    loop; use as `with feed.subscribe() as subscription:` or call close().
+    """
+
+    def __init__(self, feed: LedgerChangeFeed, max_pending: int):
+        if max_pending < 1:
+            raise ValueError("A subscription must hold at least one pending change.")
+        self._feed = feed
+        self._loop = asyncio.get_running_loop()
+        self._pending: deque[LedgerChange] = deque(maxlen=max_pending)
+        self._ready = asyncio.Event()
+        self._dropped = 0
+        self.dropped_total = 0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stops receiving changes."""
+        self._feed.unsubscribe(self)
+
+    def take(self) -> FeedDelivery:
+        """Returns every pending change (possibly none) without waiting."""
+        delivery = FeedDelivery(list(self._pending), self._dropped)
+        self._pending.clear()
+        self._dropped = 0
+        self._ready.clear()
+        return delivery
+
+    async def wait(self, stop: asyncio.Event | None = None, timeout: float | None = None) -> FeedDelivery:
+        """
+        Waits until a change arrives, `stop` is set or `timeout` seconds pass, then returns
+        every pending change (none on stop or timeout).
+        """
+        if not self._ready.is_set():
+            waiters = [asyncio.ensure_future(self._ready.wait())]
+            if stop is not None:
+                waiters.append(asyncio.ensure_future(stop.wait()))
+            try:
+                await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+        return self.take()
+
+    def offer(self, change: LedgerChange) -> None:
+        """Hands a change to the subscriber's loop; thread-safe."""
+        with contextlib.suppress(RuntimeError):
+            if asyncio.get_running_loop() is self._loop:
+                self._put(change)
+                return
+        with contextlib.suppress(RuntimeError):  # The subscriber's loop is closed
+            self._loop.call_soon_threadsafe(self._put, change)
+
+    def _put(self, change: LedgerChange) -> None:
+        if len(self._pending) == self._pending.maxlen:
+            self._dropped += 1  # deque(maxlen=...) evicts the oldest change
+            self.dropped_total += 1
+        self._pending.append(change)
+        self._ready.set()
+
+
+class LedgerChangeFeed:
+    """Fans committed ledger changes out to in-process subscribers."""
+
+    def __init__(self, max_pending: int = 1000):
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscriptions: tuple[ChangeFeedSubscription, ...] = ()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, max_pending: int | None = None) -> ChangeFeedSubscription:
+        """
+        Starts receiving the changes published from now on. Call from the event loop that
+        will consume them.
+
+        Args:
+            max_pending: Changes kept for the subscriber before the oldest are dropped
+                         (default: the feed's).
+        """
+        subscription = ChangeFeedSubscription(self, max_pending or self._max_pending)
+        with self._lock:
+            self._subscriptions += (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: ChangeFeedSubscription) -> None:
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+
+    def publish(self, change: LedgerChange) -> None:
+        """Delivers a committed change to every subscriber; never blocks."""
+        for subscription in self._subscriptions:
+            subscription.offer(change)
+
+
+# Process-wide feed
+ledger_change_feed = LedgerChangeFeed()
@@ -0,0 +1,152 @@
+"""
+Ledger Export Writers 📤
+
+Format-specific writers for streamed TransactionLog rows. Each writer receives
+chunks of plain row tuples in EXPORT_COLUMNS order and writes them straight to
+its file, so an export holds at most one chunk in memory.
+
+---
+FORMATS:
+- csv: header row, amounts as exact decimal strings, timestamps in ISO 8601 (UTC).
+- ndjson: one JSON object per log, amounts as strings to keep their precision.
+- arrow / parquet: columnar, one record batch / row group per chunk, with amounts
+  as decimal128(14, 4). Requires the optional pyarrow dependency (`pip install divvy[export]`).
+"""
+
+import csv
+import json
+from collections.abc import Sequence
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Protocol
+
+from app.core.datetime import utc
+
+# Exported TransactionLog columns, in file order.
+EXPORT_COLUMNS = (
+    "id",
+    "transaction_batch_id",
+    "debit_account_entity_id",
+    "credit_account_entity_id",
+    "amount",
+    "currency",
+    "counterparty_entity_id",
+    "expense_catalog_id",
+    "narrative",
+    "created_at",
+    "created_by",
+)
+
+EXPORT_FORMATS = ("csv", "ndjson", "arrow", "parquet")
+
+
+class LedgerWriter(Protocol):
+    """Writes chunks of exported rows to one destination."""
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+def _plain(value: Any) -> Any:
+    """Text-format representation of a column value (exact decimals, ISO timestamps)."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return utc(value).isoformat()
+    return value
+
+
+class CsvWriter:
+    """Comma-separated values with a header row; NULLs are empty fields."""
+
+    def __init__(self, path: str | Path):
+        self._file = open(path, "w", newline="", encoding="utf-8")  # noqa: SIM115 (closed in close())
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(EXPORT_COLUMNS)
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        self._writer.writerows([_plain(value) for value in row] for row in rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class NdjsonWriter:
+    """Newline-delimited JSON, one object per log."""
+
+    def __init__(self, path: str | Path):
+        self._file = open(path, "w", encoding="utf-8")  # noqa: SIM115 (closed in close())
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        self._file.writelines(
+            json.dumps(dict(zip(EXPORT_COLUMNS, map(_plain, row), strict=True)), ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ArrowWriter:
+    """Arrow IPC file or Parquet file, written one record batch per chunk."""
+
+    def __init__(self, path: str | Path, parquet: bool = False):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Arrow/Parquet export requires pyarrow: pip install divvy[export]") from exc
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("transaction_batch_id", pa.int64()),
+                ("debit_account_entity_id", pa.int64()),
+                ("credit_account_entity_id", pa.int64()),
+                ("amount", pa.decimal128(14, 4)),
+                ("currency", pa.string()),
+                ("counterparty_entity_id", pa.int64()),
+                ("expense_catalog_id", pa.int64()),
+                ("narrative", pa.string()),
+                ("created_at", pa.timestamp("us", tz="UTC")),
+                ("created_by", pa.int64()),
+            ]
+        )
+        if parquet:
+            self._writer = pq.ParquetWriter(str(path), self._schema)
+        else:
+            self._writer = pa.ipc.new_file(str(path), self._schema)
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        if not rows:
+            return
+        columns = [list(column) for column in zip(*rows, strict=True)]
+        created_at = EXPORT_COLUMNS.index("created_at")
+        columns[created_at] = [utc(value) for value in columns[created_at]]
+        # One chunk becomes one record batch (IPC) or row group (Parquet).
+        self._writer.write_table(
+            self._pa.Table.from_pydict(dict(zip(EXPORT_COLUMNS, columns, strict=True)), self._schema)
+        )
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def open_writer(export_format: str, path: str | Path) -> LedgerWriter:
+    """
+    Creates the writer for one of EXPORT_FORMATS.
+
+    Raises:
+        ValueError: If the format is unknown.
+        RuntimeError: For arrow/parquet when pyarrow is not installed.
+    """
+    if export_format == "csv":
+        return CsvWriter(path)
+    if export_format == "ndjson":
+        return NdjsonWriter(path)
+    if export_format in ("arrow", "parquet"):
+        return ArrowWriter(path, parquet=export_format == "parquet")
+    raise ValueError(f"Unknown export format '{export_format}'; expected one of: {', '.join(EXPORT_FORMATS)}.")
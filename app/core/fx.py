@@ -0,0 +1,156 @@
+"""
+FX Rates 💱
+
+An in-memory copy of the fx_rates table with as-of lookups, plus the
+process-wide cache it is served from and a reader for local rate files.
+
+---
+DESIGN:
+- Each currency pair keeps two parallel arrays sorted by effective time (epoch
+  seconds and rates); the rate in effect at T is found by bisecting the times,
+  O(log n) per lookup, with no database round trip.
+- A pair without rates of its own is served by the inverse pair (1 / rate), then
+  by crossing through the pivot currency (the ledger's base currency), e.g.,
+  EUR -> USD -> JPY.
+- series() exposes the sorted arrays so bulk conversions (app.services.analytics)
+  can look up many timestamps at once with a vectorized search.
+- The cache is invalidated when a transaction that loaded rates commits
+  (app.repositories.fx); a generation counter keeps a load that raced with an
+  invalidation from caching stale rates. Other processes keep their copy until
+  they invalidate it themselves or restart.
+"""
+
+import csv
+import threading
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from pathlib import Path
+from typing import NamedTuple
+
+from app.core.amounts import AMOUNT_QUANTUM, to_decimal
+from app.core.datetime import utc
+
+_ONE = Decimal(1)
+
+
+class FxQuote(NamedTuple):
+    """One row of fx_rates: 1 base_currency = rate quote_currency from effective_at on."""
+
+    base_currency: str
+    quote_currency: str
+    effective_at: datetime
+    rate: Decimal
+
+
+class FxRates:
+    """As-of exchange rates for every loaded currency pair."""
+
+    def __init__(self, quotes: Iterable[FxQuote], pivot: str):
+        self._pivot = pivot
+        history: dict[tuple[str, str], list[tuple[float, Decimal]]] = {}
+        for base, quote, effective_at, rate in quotes:
+            history.setdefault((base, quote), []).append((utc(effective_at).timestamp(), to_decimal(rate)))
+        self._series: dict[tuple[str, str], tuple[list[float], list[Decimal]]] = {}
+        for pair, points in history.items():
+            points.sort()
+            self._series[pair] = ([time for time, _ in points], [rate for _, rate in points])
+
+    def __len__(self) -> int:
+        return sum(len(times) for times, _ in self._series.values())
+
+    @property
+    def pivot(self) -> str:
+        return self._pivot
+
+    def series(self, base: str, quote: str) -> tuple[list[float], list[Decimal]] | None:
+        """
+        The pair's (effective times in epoch seconds, rates), sorted by time, from its own
+        rates or inverted from the opposite pair's; None if neither was loaded.
+        """
+        series = self._series.get((base, quote))
+        if series is None and (inverse := self._series.get((quote, base))) is not None:
+            series = self._series[(base, quote)] = (inverse[0], [_ONE / rate for rate in inverse[1]])
+        return series
+
+    def rate(self, base: str, quote: str, at: datetime) -> Decimal:
+        """
+        Units of `quote` per unit of `base` in effect at `at`.
+
+        Raises:
+            ValueError: If no rate for the pair (direct, inverse or through the pivot)
+                        took effect at or before `at`.
+        """
+        if base == quote:
+            return _ONE
+        timestamp = utc(at).timestamp()
+        series = self.series(base, quote)
+        if series is not None:
+            index = bisect_right(series[0], timestamp) - 1
+            if index >= 0:
+                return series[1][index]
+        elif self._pivot not in (base, quote):
+            return self.rate(base, self._pivot, at) * self.rate(self._pivot, quote, at)
+        raise ValueError(f"No {base}/{quote} exchange rate in effect at {utc(at).isoformat()}.")
+
+    def convert(self, amount: Decimal, base: str, quote: str, at: datetime) -> Decimal:
+        """
+        Converts an amount at the rate in effect at `at`, rounded half away from zero to
+        the stored amount precision.
+
+        Raises:
+            ValueError: If no rate is in effect (see rate()).
+        """
+        return (to_decimal(amount) * self.rate(base, quote, at)).quantize(AMOUNT_QUANTUM, rounding=ROUND_HALF_UP)
+
+
+def read_rates_csv(path: str | Path) -> Iterator[FxQuote]:
+    """
+    Reads exchange rates from a CSV file with the header base,quote,rate,effective_at.
+    Currency codes are upper-cased; effective_at is an ISO 8601 date or datetime (naive
+    values are UTC).
+
+    Raises:
+        ValueError: If a row is malformed.
+    """
+    with Path(path).open(newline="", encoding="utf-8-sig") as file:
+        for line_number, row in enumerate(csv.DictReader(file), start=2):
+            try:
+                base, quote = row["base"].strip().upper(), row["quote"].strip().upper()
+                rate = Decimal(row["rate"].strip())
+                effective_at = utc(datetime.fromisoformat(row["effective_at"].strip()))
+            except (KeyError, AttributeError, InvalidOperation, ValueError) as exc:
+                raise ValueError(f"Line {line_number}: expected base, quote, rate and effective_at.") from exc
+            if len(base) != 3 or len(quote) != 3 or base == quote or not rate.is_finite() or rate <= 0:
+                raise ValueError(f"Line {line_number}: invalid rate {base}/{quote} = {row['rate']}.")
+            yield FxQuote(base, quote, effective_at, rate)
+
+
+# --- PROCESS-WIDE CACHE ---
+
+_lock = threading.Lock()
+_cached_rates: FxRates | None = None
+_generation = 0
+
+
+def get_cached_fx_rates() -> tuple[FxRates | None, int]:
+    """Returns the cached rates (None if not loaded) and the cache generation to pass to cache_fx_rates()."""
+    with _lock:
+        return _cached_rates, _generation
+
+
+def cache_fx_rates(rates: FxRates, generation: int) -> None:
+    """Caches freshly loaded rates, unless rates were loaded into the database since `generation` was read."""
+    global _cached_rates
+    with _lock:
+        if generation == _generation:
+            _cached_rates = rates
+
+
+def invalidate_fx_rates() -> None:
+    """Drops the cached rates; the next reader reloads them."""
+    global _cached_rates, _generation
+    with _lock:
+        _cached_rates = None
+        _generation += 1
@@ -0,0 +1,43 @@
+"""
+Hot Entity Detection 🔥
+
+Counts balance updates per AccountEntity in fixed time windows and reports the
+entities updated often enough to be worth sharding (see AccountEntityBalanceShard).
+Counts are per process; every process posting to a hot entity sees it as hot.
+"""
+
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable
+
+
+class HotEntityDetector:
+    """Flags entities whose update rate within a window reaches `updates_per_second`."""
+
+    def __init__(self, updates_per_second: float, window_seconds: float = 10.0):
+        self._threshold = max(1, round(updates_per_second * window_seconds))
+        self._window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._counts: Counter[int] = Counter()
+
+    def record(self, entity_ids: Iterable[int]) -> list[int]:
+        """
+        Counts one update of each entity.
+
+        Returns:
+            The entities that reached the threshold with this update (each reported once per window).
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self._window_seconds:
+                self._window_start = now
+                self._counts.clear()
+
+            hot: list[int] = []
+            for entity_id in entity_ids:
+                self._counts[entity_id] += 1
+                if self._counts[entity_id] == self._threshold:
+                    hot.append(entity_id)
+            return hot
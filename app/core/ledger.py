@@ -0,0 +1,134 @@
+"""
+Ledger arithmetic shared by repositories and services.
+"""
+
+import hashlib
+import json
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Mapping, Sequence
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import RowMapping
+
+from app.core.amounts import to_decimal
+from app.models.ledger import TransactionLog
+
+# A log to be posted: either a transient TransactionLog or a mapping of its column values
+# (a result row mapping when logs are replayed from the ledger).
+TransactionLogLike = TransactionLog | Mapping[str, Any] | RowMapping
+
+
+def log_value(log: TransactionLogLike, column: str) -> Any:
+    """Reads a column value from a TransactionLog-like object."""
+    return log.get(column) if isinstance(log, Mapping) else getattr(log, column)
+
+
+def net_balance_deltas(logs: Iterable[TransactionLogLike]) -> dict[int, Decimal]:
+    """
+    Nets the balance impact of many logs per AccountEntity.
+
+    Follows the SSD balance formula (Debits - Credits): each log adds its amount to the
+    debit entity and subtracts it from the credit entity. Entities whose changes cancel
+    out are omitted.
+    """
+    deltas: defaultdict[int, Decimal] = defaultdict(Decimal)
+    for log in logs:
+        amount = to_decimal(log_value(log, "amount"))
+        deltas[log_value(log, "debit_account_entity_id")] += amount
+        deltas[log_value(log, "credit_account_entity_id")] -= amount
+    return {entity_id: delta for entity_id, delta in deltas.items() if delta}
+
+
+def check_currencies(
+    logs: Iterable[TransactionLogLike], entity_currencies: Mapping[int, str | None], base_currency: str
+) -> None:
+    """
+    Checks that every log is in the currency of both its entities, so balances never add
+    up amounts in different currencies. A NULL currency (log or entity) is the base one.
+
+    Args:
+        entity_currencies: Currency of each entity the logs post to; entities missing from
+                           it are skipped (their foreign keys fail on insert instead).
+
+    Raises:
+        ValueError: If a log's currency differs from one of its entities' currencies.
+    """
+    for log in logs:
+        currency = log_value(log, "currency") or base_currency
+        for column in ("debit_account_entity_id", "credit_account_entity_id"):
+            entity_id = log_value(log, column)
+            if entity_id not in entity_currencies:
+                continue
+            entity_currency = entity_currencies[entity_id] or base_currency
+            if entity_currency != currency:
+                raise ValueError(
+                    f"A {currency} log cannot post to AccountEntity {entity_id}, which is kept in {entity_currency}."
+                )
+
+
+# Columns that make up a batch's content for batch_fingerprint()
+_FINGERPRINT_COLUMNS = (
+    "debit_account_entity_id",
+    "credit_account_entity_id",
+    "amount",
+    "counterparty_entity_id",
+    "expense_catalog_id",
+    "narrative",
+)
+
+
+def batch_fingerprint(logs: Iterable[TransactionLogLike]) -> str:
+    """
+    SHA-256 (hex) of a batch's content, independent of log order and of how amounts
+    are written (e.g., 12.3 and "12.3000" match).
+    """
+    entries = sorted(json.dumps(_fingerprint_values(log)) for log in logs)
+    return hashlib.sha256("\n".join(entries).encode()).hexdigest()
+
+
+def _fingerprint_values(log: TransactionLogLike) -> list[Any]:
+    values = [
+        str(to_decimal(log_value(log, c)).normalize()) if c == "amount" else log_value(log, c)
+        for c in _FINGERPRINT_COLUMNS
+    ]
+    # Only logs in a currency of their own include it, so base-currency fingerprints stay as they were.
+    currency = log_value(log, "currency")
+    if currency is not None:
+        values.append(currency)
+    return values
+
+
+class LogIdGaps:
+    """
+    Reader-side high-water mark over TransactionLog IDs.
+
+    IDs are assigned when rows are inserted, so with concurrent writers (PostgreSQL,
+    MySQL) a missing ID is either an insert that rolled back or one whose transaction
+    has not committed yet. A reader moves past a gap only once it has been missing for
+    `settle_delay`, timed from when this reader first saw it; log timestamps are never
+    used, since callers may backdate created_at.
+    """
+
+    def __init__(self, settle_delay: timedelta):
+        self._settle_seconds = settle_delay.total_seconds()
+        self._first_seen: dict[int, float] = {}  # First missing ID of each open gap -> time.monotonic()
+
+    def settled(self, after_id: int, log_ids: Sequence[int]) -> int:
+        """
+        Returns how many of `log_ids` (ascending, all after `after_id`) can be read:
+        those before the first gap that has not been missing for the settle delay yet.
+        """
+        now = time.monotonic()
+        expected = after_id + 1
+        count = len(log_ids)
+        for index, log_id in enumerate(log_ids):
+            if log_id != expected and now - self._first_seen.setdefault(expected, now) < self._settle_seconds:
+                count = index
+                break
+            expected = log_id + 1
+        # Gaps behind the new mark are either filled or given up on.
+        self._first_seen = {start: seen for start, seen in self._first_seen.items() if start >= expected}
+        return count
@@ -0,0 +1,63 @@
+"""
+In-Process Metrics 📈
+
+A minimal metrics surface for background jobs: monotonically increasing counters,
+last-value gauges, and duration summaries. Values are kept in memory per process
+and exposed through `snapshot()` for logging or an HTTP metrics endpoint.
+"""
+
+import threading
+from dataclasses import dataclass
+
+
+@dataclass
+class DurationSummary:
+    """Count, total and maximum of observed durations, in seconds."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+class MetricsRegistry:
+    """Thread-safe store of named counters, gauges and duration summaries."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._durations: dict[str, DurationSummary] = {}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Adds `value` to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Records the latest value of a gauge."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe_duration(self, name: str, seconds: float) -> None:
+        """Adds one duration to a summary."""
+        with self._lock:
+            self._durations.setdefault(name, DurationSummary()).observe(seconds)
+
+    def snapshot(self) -> dict[str, float]:
+        """Returns every metric as a flat name -> value mapping (summaries as `<name>.count|total|max`)."""
+        with self._lock:
+            values = {**self._counters, **self._gauges}
+            for name, summary in self._durations.items():
+                values[f"{name}.count"] = summary.count
+                values[f"{name}.total"] = summary.total
+                values[f"{name}.max"] = summary.max
+            return values
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
@@ -0,0 +1,62 @@
+"""
+Recurrence Dates 🔁
+
+Date arithmetic for recurring expenses: the n-th occurrence of a schedule that
+starts on a date and repeats every `count` days, weeks, months or years.
+
+---
+DESIGN:
+- Occurrences are numbered from 0 and always computed from the start date, never
+  from the previous occurrence, so month-end schedules do not drift: a monthly
+  schedule starting on January 31 falls on February 28 (or 29), then March 31.
+- Days past the end of a shorter month are clamped to its last day (the same goes
+  for February 29 in yearly schedules).
+"""
+
+import calendar
+from collections.abc import Iterator
+from datetime import date, timedelta
+
+INTERVAL_UNITS = ("day", "week", "month", "year")
+
+
+def occurrence_date(starts_on: date, interval_unit: str, interval_count: int, occurrence: int) -> date:
+    """
+    The date of a schedule's occurrence number `occurrence` (0 is `starts_on`).
+
+    Raises:
+        ValueError: If the unit is unknown or the count is not positive.
+    """
+    if interval_unit not in INTERVAL_UNITS:
+        raise ValueError(f"Unknown interval unit {interval_unit!r} (expected one of {INTERVAL_UNITS}).")
+    if interval_count < 1:
+        raise ValueError("The interval count must be at least 1.")
+
+    steps = interval_count * occurrence
+    if interval_unit == "day":
+        return starts_on + timedelta(days=steps)
+    if interval_unit == "week":
+        return starts_on + timedelta(weeks=steps)
+    months = steps * 12 if interval_unit == "year" else steps
+    year, month = divmod(starts_on.month - 1 + months, 12)
+    year += starts_on.year
+    return date(year, month + 1, min(starts_on.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def due_occurrences(
+    starts_on: date,
+    interval_unit: str,
+    interval_count: int,
+    next_occurrence: int,
+    until: date,
+    ends_on: date | None = None,
+) -> Iterator[tuple[int, date]]:
+    """
+    Yields (occurrence, date) from `next_occurrence` on, for every occurrence due on or
+    before `until` and not after `ends_on`.
+    """
+    last = min(until, ends_on) if ends_on else until
+    occurrence = next_occurrence
+    while (due_on := occurrence_date(starts_on, interval_unit, interval_count, occurrence)) <= last:
+        yield occurrence, due_on
+        occurrence += 1
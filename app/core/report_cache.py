@@ -0,0 +1,112 @@
+"""
+Balance Report Cache 🗄️
+
+Process-wide cache for reports derived from AccountEntity balances (per-user
+balance sheets and the system trial balance), invalidated by the postings that
+change those balances.
+
+---
+DESIGN:
+- A logical clock ticks on every committed balance change. Each changed entity
+  (and each user who gained an entity) remembers the tick of its last change.
+- A report records the clock BEFORE it queries. It stays valid while none of its
+  entities, its user, or (for the trial balance) any entity changed at or after
+  that tick, so a posting that commits while the report is being built can only
+  make it reload, never serve stale data.
+- Repositories report changes through on_commit() hooks, so rolled-back postings
+  invalidate nothing. Other processes are not notified; `max_age` bounds how
+  long they may serve a report.
+"""
+
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any, NamedTuple
+
+
+class _Entry(NamedTuple):
+    value: Any
+    entity_ids: frozenset[int]
+    loaded_at_tick: int
+    loaded_at: float
+
+
+class BalanceReportCache:
+    """Caches per-user and system-wide balance reports until a relevant posting commits."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tick = 0
+        self._entity_changed: dict[int, int] = {}
+        self._user_changed: dict[int, int] = {}
+        self._any_changed = 0
+        self._users: dict[int, _Entry] = {}
+        self._system: _Entry | None = None
+
+    # --- Invalidation ---
+
+    def entities_changed(self, entity_ids: Iterable[int]) -> None:
+        """Records committed balance changes of the given entities."""
+        with self._lock:
+            self._tick += 1
+            self._any_changed = self._tick
+            for entity_id in entity_ids:
+                self._entity_changed[entity_id] = self._tick
+
+    def users_changed(self, user_ids: Iterable[int]) -> None:
+        """Records committed changes to the set of entities the given users own."""
+        with self._lock:
+            self._tick += 1
+            self._any_changed = self._tick
+            for user_id in user_ids:
+                self._user_changed[user_id] = self._tick
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+            self._system = None
+
+    # --- Reads and Writes ---
+
+    def begin_load(self) -> int:
+        """Returns the tick to pass to put_user()/put_system(); call it before querying."""
+        with self._lock:
+            self._tick += 1
+            return self._tick
+
+    def get_user(self, user_id: int, max_age: float) -> Any | None:
+        """The user's cached report, or None if missing, invalidated or older than `max_age` seconds."""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            stale = self._user_changed.get(user_id, 0) >= entry.loaded_at_tick or any(
+                self._entity_changed.get(entity_id, 0) >= entry.loaded_at_tick for entity_id in entry.entity_ids
+            )
+            if stale or time.monotonic() - entry.loaded_at > max_age:
+                del self._users[user_id]
+                return None
+            return entry.value
+
+    def put_user(self, user_id: int, entity_ids: Iterable[int], value: Any, loaded_at_tick: int) -> None:
+        with self._lock:
+            self._users[user_id] = _Entry(value, frozenset(entity_ids), loaded_at_tick, time.monotonic())
+
+    def get_system(self, max_age: float) -> Any | None:
+        """The cached system-wide report, or None if missing, invalidated or older than `max_age` seconds."""
+        with self._lock:
+            entry = self._system
+            if entry is None:
+                return None
+            if self._any_changed >= entry.loaded_at_tick or time.monotonic() - entry.loaded_at > max_age:
+                self._system = None
+                return None
+            return entry.value
+
+    def put_system(self, value: Any, loaded_at_tick: int) -> None:
+        with self._lock:
+            self._system = _Entry(value, frozenset(), loaded_at_tick, time.monotonic())
+
+
+# Process-wide cache
+balance_report_cache = BalanceReportCache()
@@ -0,0 +1,133 @@
+"""
+Debt Settlement Planning 🤝
+
+Turns the net positions of a group (what each member is owed, positive, or owes,
+negative) into a short list of cash transfers that settles everyone.
+
+---
+DESIGN:
+- Greedy (any group size, O(n log n)): repeatedly match the largest creditor with
+  the largest debtor through two heaps. Every transfer zeroes at least one member,
+  so at most n - 1 transfers are produced.
+- Exact (small groups, O(2^n * n)): the minimum number of transfers is n minus the
+  largest number of disjoint zero-sum subgroups, because each subgroup settles
+  internally with (size - 1) transfers and debt cycles between them cancel out. A
+  subset DP finds that partition; each subgroup is then settled greedily.
+"""
+
+import heapq
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import NamedTuple
+
+# Largest group settled exactly by default; the DP is exponential in the member count.
+EXACT_SETTLEMENT_MAX_MEMBERS = 15
+
+
+class Transfer(NamedTuple):
+    """A cash payment from a debtor to a creditor."""
+
+    debtor_id: int
+    creditor_id: int
+    amount: Decimal
+
+
+def plan_transfers_greedy(positions: Mapping[int, Decimal]) -> list[Transfer]:
+    """
+    Settles net positions with at most n - 1 transfers, largest amounts first.
+
+    Raises:
+        ValueError: If the positions do not sum to zero.
+    """
+    _check_balanced(positions)
+
+    # heapq is a min-heap: amounts are negated to pop the largest first; IDs break ties deterministically.
+    creditors = [(-amount, member_id) for member_id, amount in positions.items() if amount > 0]
+    debtors = [(amount, member_id) for member_id, amount in positions.items() if amount < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers: list[Transfer] = []
+    while creditors and debtors:
+        negated_credit, creditor_id = heapq.heappop(creditors)
+        debt, debtor_id = heapq.heappop(debtors)
+        amount = min(-negated_credit, -debt)
+        transfers.append(Transfer(debtor_id, creditor_id, amount))
+
+        if -negated_credit > amount:
+            heapq.heappush(creditors, (negated_credit + amount, creditor_id))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor_id))
+    return transfers
+
+
+def plan_transfers_exact(positions: Mapping[int, Decimal]) -> list[Transfer]:
+    """
+    Settles net positions with the minimum possible number of transfers.
+
+    Raises:
+        ValueError: If the positions do not sum to zero, or the group has more than
+                    EXACT_SETTLEMENT_MAX_MEMBERS non-zero members.
+    """
+    _check_balanced(positions)
+    members = sorted(member_id for member_id, amount in positions.items() if amount)
+    if len(members) > EXACT_SETTLEMENT_MAX_MEMBERS:
+        raise ValueError(
+            f"Exact settlement supports at most {EXACT_SETTLEMENT_MAX_MEMBERS} members with a balance, "
+            f"got {len(members)}."
+        )
+
+    n = len(members)
+    full = (1 << n) - 1
+    sums = [Decimal(0)] * (full + 1)
+    for mask in range(1, full + 1):
+        lowest = (mask & -mask).bit_length() - 1
+        sums[mask] = sums[mask & (mask - 1)] + positions[members[lowest]]
+
+    # groups[mask]: most disjoint zero-sum subgroups that `mask` can be split into.
+    # Along any order of adding members, a subgroup closes each time the running sum hits zero.
+    groups = [0] * (full + 1)
+    parent = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        best, best_prev = -1, 0
+        remaining = mask
+        while remaining:
+            bit = remaining & -remaining
+            remaining ^= bit
+            if groups[mask ^ bit] > best:
+                best, best_prev = groups[mask ^ bit], mask ^ bit
+        groups[mask] = best + (1 if sums[mask] == 0 else 0)
+        parent[mask] = best_prev
+
+    # The best chain of prefixes is zero-sum at each subgroup boundary; walk it back from the full group.
+    boundaries: list[int] = []
+    mask = full
+    while mask:
+        if sums[mask] == 0:
+            boundaries.append(mask)
+        mask = parent[mask]
+    boundaries.append(0)
+
+    transfers: list[Transfer] = []
+    for outer, inner in zip(boundaries, boundaries[1:], strict=False):
+        transfers.extend(plan_transfers_greedy(_members_of(outer ^ inner, members, positions)))
+    return transfers
+
+
+def plan_transfers(
+    positions: Mapping[int, Decimal], exact_max_members: int = EXACT_SETTLEMENT_MAX_MEMBERS
+) -> list[Transfer]:
+    """Settles net positions exactly for groups of up to `exact_max_members` members, greedily otherwise."""
+    if sum(1 for amount in positions.values() if amount) <= min(exact_max_members, EXACT_SETTLEMENT_MAX_MEMBERS):
+        return plan_transfers_exact(positions)
+    return plan_transfers_greedy(positions)
+
+
+def _members_of(mask: int, members: list[int], positions: Mapping[int, Decimal]) -> dict[int, Decimal]:
+    return {member_id: positions[member_id] for i, member_id in enumerate(members) if mask >> i & 1}
+
+
+def _check_balanced(positions: Mapping[int, Decimal]) -> None:
+    total = sum(positions.values(), Decimal(0))
+    if total != 0:
+        raise ValueError(f"Net positions must sum to zero, got {total}.")
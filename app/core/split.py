@@ -0,0 +1,204 @@
+"""
+Bill Splitting ✂️
+
+Divides shared expenses between their participants, many expenses per call, with
+NumPy. Requires the optional NumPy dependency (`pip install divvy[analytics]`).
+
+---
+DESIGN:
+- Amounts are split in integer minor units (app.core.amounts), so the shares of an
+  expense always add up to its amount exactly.
+- Every method reduces to integer weights: "equal" (1 each), "weighted" (the given
+  weights), "percentage" (the given percentages, which must total 100) and "fixed"
+  (the given amounts, which must total the expense and are used as they are).
+- Largest-remainder method: each share starts at floor(amount * weight / weight sum),
+  and the minor units left over go, one each, to the shares with the largest
+  remainders (ties: the earlier participant first).
+- All expenses of a call are flattened into one array of shares grouped by expense,
+  so a bulk import is split by a handful of array operations, not a loop per expense.
+"""
+
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from app.core.amounts import from_minor_units, to_decimal, to_minor_units
+
+SPLIT_METHODS = ("equal", "weighted", "percentage", "fixed")
+
+Int64Array = NDArray[np.int64]
+
+_INT64_MAX = np.iinfo(np.int64).max
+
+# Most decimal places accepted in weights and percentages (they are scaled to integers)
+_MAX_VALUE_PLACES = 6
+
+
+class Expense(NamedTuple):
+    """An expense paid by `payer_id` and shared by `participant_ids` (the payer may be one of them)."""
+
+    payer_id: int
+    amount: Decimal
+    participant_ids: Sequence[int]
+    method: str = "equal"
+    values: Sequence[Decimal | int | str] | None = None  # Weights, percentages or fixed amounts, per participant
+    expense_catalog_id: int | None = None
+    narrative: str | None = None
+
+
+class Share(NamedTuple):
+    """One participant's part of an expense."""
+
+    user_id: int
+    amount: Decimal
+
+
+def split_expenses(expenses: Sequence[Expense]) -> list[list[Share]]:
+    """
+    Splits every expense between its participants.
+
+    Returns:
+        The shares of each expense, in input order, one per participant in participant order.
+
+    Raises:
+        ValueError: If an expense has an unknown method, no or duplicate participants, a
+                    negative amount or value, the wrong number of values, percentages that
+                    do not total 100, or fixed amounts that do not total the expense.
+    """
+    if not expenses:
+        return []
+
+    totals = np.array([_checked_total(index, expense) for index, expense in enumerate(expenses)], dtype=np.int64)
+    counts = np.array([len(expense.participant_ids) for expense in expenses], dtype=np.int64)
+    values = [_share_values(index, expense) for index, expense in enumerate(expenses)]
+
+    # Fixed amounts are minor units already; all other values become integer weights on one common scale.
+    methods = np.array([expense.method for expense in expenses])
+    fixed = methods == "fixed"
+    scale = max(
+        (
+            _decimal_places(value)
+            for row, is_fixed in zip(values, fixed, strict=True)
+            if not is_fixed
+            for value in row
+            if not isinstance(value, int)
+        ),
+        default=0,
+    )
+    factor = 10**scale
+    weights = np.array(
+        [
+            (
+                to_minor_units(value)
+                if is_fixed
+                else value * factor if isinstance(value, int) else int(value.scaleb(scale))
+            )
+            for row, is_fixed in zip(values, fixed, strict=True)
+            for value in row
+        ],
+        dtype=np.int64,
+    )
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    _check_weight_sums(expenses, methods, totals, np.add.reduceat(weights, starts), scale)
+
+    shares = weights.copy()
+    if not fixed.all():
+        split = ~fixed
+        rows = np.repeat(split, counts)
+        shares[rows] = allocate_largest_remainder(totals[split], counts[split], weights[rows])
+
+    result: list[list[Share]] = []
+    for expense, start in zip(expenses, starts.tolist(), strict=True):
+        parts = shares[start : start + len(expense.participant_ids)].tolist()
+        result.append(
+            [
+                Share(user_id, from_minor_units(part))
+                for user_id, part in zip(expense.participant_ids, parts, strict=True)
+            ]
+        )
+    return result
+
+
+def allocate_largest_remainder(totals: Int64Array, counts: Int64Array, weights: Int64Array) -> Int64Array:
+    """
+    Divides each totals[g] (minor units) over the counts[g] consecutive entries of `weights`
+    that belong to group g, in proportion to the weights and without losing a unit.
+
+    Every group needs at least one entry and a positive weight sum.
+    """
+    groups = np.repeat(np.arange(len(totals)), counts)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    weight_sums = np.add.reduceat(weights, starts)
+
+    # amount * weight can exceed int64 for very large amounts; Python ints keep it exact.
+    numerators, divisors = totals[groups], weight_sums[groups]
+    if int(totals.max(initial=0)) * int(weights.max(initial=0)) > _INT64_MAX:
+        numerators, divisors = numerators.astype(object), divisors.astype(object)
+    numerators = numerators * weights
+    shares = (numerators // divisors).astype(np.int64)
+    remainders = (numerators % divisors).astype(np.int64)
+
+    leftover = totals - np.add.reduceat(shares, starts)
+    positions = np.arange(len(weights))
+    order = np.lexsort((positions, -remainders, groups))
+    rank = positions - starts[groups[order]]
+    shares[order[rank < leftover[groups[order]]]] += 1
+    return shares
+
+
+def _checked_total(index: int, expense: Expense) -> int:
+    if expense.method not in SPLIT_METHODS:
+        raise ValueError(f"Expense {index}: unknown split method {expense.method!r} (expected one of {SPLIT_METHODS}).")
+    if not expense.participant_ids:
+        raise ValueError(f"Expense {index}: no participants.")
+    if len(set(expense.participant_ids)) != len(expense.participant_ids):
+        raise ValueError(f"Expense {index}: duplicate participants.")
+    total = to_minor_units(expense.amount)
+    if total < 0:
+        raise ValueError(f"Expense {index}: the amount must not be negative.")
+    return total
+
+
+def _share_values(index: int, expense: Expense) -> list[int | Decimal]:
+    """The expense's split values; whole numbers stay ints, which skips Decimal work for common weights."""
+    if expense.method == "equal":
+        return [1] * len(expense.participant_ids)
+    if expense.values is None or len(expense.values) != len(expense.participant_ids):
+        raise ValueError(f"Expense {index}: {expense.method} splits need one value per participant.")
+    values = [value if isinstance(value, int) else to_decimal(value) for value in expense.values]
+    if any(value < 0 for value in values):
+        raise ValueError(f"Expense {index}: split values must not be negative.")
+    return values
+
+
+def _decimal_places(value: Decimal) -> int:
+    places = max(0, -int(value.normalize().as_tuple().exponent))
+    if places > _MAX_VALUE_PLACES:
+        raise ValueError(f"Split values support at most {_MAX_VALUE_PLACES} decimal places, got {value}.")
+    return places
+
+
+def _check_weight_sums(
+    expenses: Sequence[Expense], methods: NDArray[np.str_], totals: Int64Array, weight_sums: Int64Array, scale: int
+) -> None:
+    """Raises for the first expense whose values do not add up (checked for all expenses at once)."""
+    fixed = methods == "fixed"
+    percentage = methods == "percentage"
+    invalid = (
+        (fixed & (weight_sums != totals))
+        | (percentage & (weight_sums != 100 * 10**scale))
+        | (~fixed & ~percentage & (weight_sums <= 0))
+    )
+    if not invalid.any():
+        return
+
+    index = int(np.flatnonzero(invalid)[0])
+    expense, weight_sum = expenses[index], int(weight_sums[index])
+    if fixed[index]:
+        raise ValueError(f"Expense {index}: fixed shares total {from_minor_units(weight_sum)}, not {expense.amount}.")
+    if percentage[index]:
+        raise ValueError(f"Expense {index}: percentages total {Decimal(weight_sum).scaleb(-scale)}, not 100.")
+    raise ValueError(f"Expense {index}: the weights must not all be zero.")
@@ -0,0 +1,64 @@
+"""
+Currency Column Migration 💱
+
+Adds the nullable `currency` columns (NULL: the base currency) to account_entities,
+transaction_logs and transaction_log_archive of a database created before the
+ledger became multi-currency; create_all() only creates missing tables, not
+missing columns. On SQLite the attached log partition files are updated too, and
+on PostgreSQL a partitioned transaction_logs passes the column on to its partitions.
+
+Existing rows keep NULL, so no data is rewritten and each ALTER is instant on the
+supported databases. Tables that already have the column are skipped.
+"""
+
+from sqlalchemy import Connection, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models.ledger import AccountEntity, TransactionLog, transaction_log_archive
+
+_TABLES = (AccountEntity.__tablename__, TransactionLog.__tablename__, transaction_log_archive.name)
+
+
+def _missing_columns(conn: Connection) -> list[tuple[str | None, str]]:
+    """(schema, table) of every table that still lacks the currency column."""
+    inspector = inspect(conn)
+    schemas: list[str | None] = [None]
+    if conn.dialect.name == "sqlite":
+        # Attached log partitions (app.db.partitioning) hold transaction_logs tables of their own.
+        schemas += [schema for schema in inspector.get_schema_names() if schema != "main"]
+
+    missing: list[tuple[str | None, str]] = []
+    for schema in schemas:
+        existing = set(inspector.get_table_names(schema=schema))
+        for name in _TABLES:
+            if name in existing and "currency" not in {c["name"] for c in inspector.get_columns(name, schema=schema)}:
+                missing.append((schema, name))
+    return missing
+
+
+def _add_columns(conn: Connection) -> list[str]:
+    preparer = conn.dialect.identifier_preparer
+    added: list[str] = []
+    for schema, name in _missing_columns(conn):
+        qualified = f"{preparer.quote_schema(schema)}.{preparer.quote(name)}" if schema else preparer.quote(name)
+        conn.exec_driver_sql(f"ALTER TABLE {qualified} ADD COLUMN currency VARCHAR(3)")
+        added.append(".".join(filter(None, (schema, name))))
+    return added
+
+
+async def find_tables_without_currency(engine: AsyncEngine) -> list[str]:
+    """Names ("[schema.]table") of the tables that still need the currency column."""
+    async with engine.connect() as conn:
+        missing = await conn.run_sync(_missing_columns)
+    return [".".join(filter(None, entry)) for entry in missing]
+
+
+async def add_currency_columns(engine: AsyncEngine) -> list[str]:
+    """
+    Adds the currency column wherever it is missing, in one transaction.
+
+    Returns:
+        The names ("[schema.]table") of the tables that were altered.
+    """
+    async with engine.begin() as conn:
+        return await conn.run_sync(_add_columns)
@@ -0,0 +1,19 @@
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+
+def get_async_engine(session: AsyncSession) -> AsyncEngine:
+    """
+    Resolves the AsyncEngine an AsyncSession is bound to.
+
+    Used by components that must run work outside the caller's transaction
+    (e.g., reserving ID blocks that must survive a rollback).
+
+    Raises:
+        RuntimeError: If the session is not bound to an AsyncEngine or AsyncConnection.
+    """
+    bind = session.bind
+    if isinstance(bind, AsyncConnection):
+        return bind.engine
+    if isinstance(bind, AsyncEngine):
+        return bind
+    raise RuntimeError("AsyncSession must be bound to an AsyncEngine or AsyncConnection.")
@@ -0,0 +1,87 @@
+"""
+Transaction Outcome Hooks 🪝
+
+Lets repositories defer in-process side effects (cache updates, notifications)
+until the caller's transaction actually commits, or undo them if it rolls back.
+
+Commit callbacks wait for the outermost transaction; releasing a SAVEPOINT hands
+its callbacks to the enclosing transaction. Rolling back a SAVEPOINT runs the
+rollback callbacks registered inside it and drops its commit callbacks, since the
+work done inside it is undone; callbacks registered before the SAVEPOINT began
+are left alone. All pending callbacks of a session are cleared once the outermost
+transaction ends either way.
+"""
+
+import functools
+from collections.abc import Callable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+_HOOKS_KEY = "divvy.transaction_hooks"
+
+
+class _TransactionHooks:
+    """Pending callbacks of a session, with the point where each open SAVEPOINT began."""
+
+    def __init__(self) -> None:
+        self.commit: list[Callable[[], None]] = []
+        self.rollback: list[Callable[[], None]] = []
+        # Hook counts when each SAVEPOINT began; SAVEPOINTs opened before the first hook have no mark.
+        self.savepoints: dict[SessionTransaction, tuple[int, int]] = {}
+
+
+def on_commit(session: AsyncSession | Session, callback: Callable[[], None]) -> None:
+    """Runs `callback` after the session's current transaction commits."""
+    _hooks(session).commit.append(callback)
+
+
+def on_rollback(session: AsyncSession | Session, callback: Callable[[], None]) -> None:
+    """Runs `callback` after the session's current transaction (or SAVEPOINT) rolls back."""
+    _hooks(session).rollback.append(callback)
+
+
+def _hooks(session: AsyncSession | Session) -> _TransactionHooks:
+    # Accepts the sync Session too, for callers inside ORM events (e.g., mapper listeners).
+    sync_session = session.sync_session if isinstance(session, AsyncSession) else session
+    hooks: _TransactionHooks | None = sync_session.info.get(_HOOKS_KEY)
+    if hooks is None:
+        hooks = _TransactionHooks()
+        sync_session.info[_HOOKS_KEY] = hooks
+        event.listen(sync_session, "after_transaction_create", functools.partial(_mark, hooks=hooks))
+        event.listen(sync_session, "after_transaction_end", functools.partial(_unmark, hooks=hooks))
+        event.listen(sync_session, "after_commit", functools.partial(_fire_commit, hooks=hooks))
+        event.listen(sync_session, "after_rollback", functools.partial(_fire_rollback, hooks=hooks))
+    return hooks
+
+
+def _mark(_: Session, transaction: SessionTransaction, hooks: _TransactionHooks) -> None:
+    if transaction.nested:
+        hooks.savepoints[transaction] = (len(hooks.commit), len(hooks.rollback))
+
+
+def _unmark(_: Session, transaction: SessionTransaction, hooks: _TransactionHooks) -> None:
+    hooks.savepoints.pop(transaction, None)
+
+
+def _fire_commit(sync_session: Session, hooks: _TransactionHooks) -> None:
+    # Releasing a SAVEPOINT dispatches the same event while the outermost transaction is still open.
+    if sync_session.in_nested_transaction():
+        return
+    callbacks = list(hooks.commit)
+    hooks.commit.clear()
+    hooks.rollback.clear()
+    for callback in callbacks:
+        callback()
+
+
+def _fire_rollback(sync_session: Session, hooks: _TransactionHooks) -> None:
+    # The event fires before the rolled-back SAVEPOINT is closed, so it is still the session's nested transaction.
+    savepoint = sync_session.get_nested_transaction()
+    commit_mark, rollback_mark = hooks.savepoints.get(savepoint, (0, 0)) if savepoint else (0, 0)
+    callbacks = hooks.rollback[rollback_mark:]
+    del hooks.commit[commit_mark:]
+    del hooks.rollback[rollback_mark:]
+    for callback in callbacks:
+        callback()
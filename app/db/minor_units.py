@@ -0,0 +1,120 @@
+"""
+Minor-Unit Amount Migration 🪙
+
+Converts amount and balance columns created as DECIMAL(14, 4) into BIGINT counts of
+minor units (see app.models.types.Money), in place:
+- PostgreSQL: one `ALTER COLUMN ... TYPE BIGINT USING round(column * 10^4)` per column
+  (a partitioned transaction_logs passes the change on to its partitions).
+- MySQL / SQLite: adds a BIGINT column, fills it, drops the DECIMAL column and renames
+  the new one. On SQLite the attached log partition files are converted too.
+
+Columns that are already integers are skipped, so an interrupted migration is finished
+by running it again (MySQL commits each DDL statement on its own). Run it while no
+workers are posting, and restart them afterwards.
+"""
+
+from sqlalchemy import BigInteger, Column, Connection, Table, cast, column, func, inspect, table, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import sqltypes
+
+from app.core.amounts import AMOUNT_SCALE
+from app.models.base import Base
+from app.models.types import Money
+
+# Temporary name of the BIGINT column while it replaces the DECIMAL one (MySQL / SQLite)
+_PENDING_SUFFIX = "_minor_units"
+
+
+def _money_columns() -> list[tuple[Table, Column[object]]]:
+    return [
+        (source, money_column)
+        for source in Base.metadata.sorted_tables
+        for money_column in source.columns
+        if isinstance(money_column.type, Money)
+    ]
+
+
+def _pending_columns(conn: Connection) -> list[tuple[str | None, Table, Column[object]]]:
+    """(schema, table, column) of every Money column still stored as a non-integer type."""
+    inspector = inspect(conn)
+    schemas: list[str | None] = [None]
+    if conn.dialect.name == "sqlite":
+        # Attached log partitions (app.db.partitioning) hold transaction_logs tables of their own.
+        schemas += [schema for schema in inspector.get_schema_names() if schema != "main"]
+
+    pending: list[tuple[str | None, Table, Column[object]]] = []
+    for schema in schemas:
+        existing = set(inspector.get_table_names(schema=schema))
+        for source, money_column in _money_columns():
+            if source.name not in existing:
+                continue
+            reflected = {info["name"]: info["type"] for info in inspector.get_columns(source.name, schema=schema)}
+            decimal = isinstance(reflected.get(money_column.name), sqltypes.Numeric)
+            half_done = money_column.name not in reflected and f"{money_column.name}{_PENDING_SUFFIX}" in reflected
+            if decimal or half_done:
+                pending.append((schema, source, money_column))
+    return pending
+
+
+def _qualified_name(schema: str | None, source: Table, money_column: Column[object]) -> str:
+    return ".".join(filter(None, (schema, source.name, money_column.name)))
+
+
+async def find_decimal_columns(engine: AsyncEngine) -> list[str]:
+    """Names ("[schema.]table.column") of the amount columns that still need migrating."""
+    async with engine.connect() as conn:
+        pending = await conn.run_sync(_pending_columns)
+    return [_qualified_name(*entry) for entry in pending]
+
+
+async def migrate_to_minor_units(engine: AsyncEngine) -> list[str]:
+    """
+    Converts every pending amount column, one transaction per column.
+
+    Returns:
+        The names ("[schema.]table.column") of the converted columns.
+
+    Raises:
+        RuntimeError: If the database dialect is not supported.
+    """
+    dialect = engine.dialect.name
+    if dialect not in ("postgresql", "mysql", "sqlite"):
+        raise RuntimeError(f"Amount migration is not supported on {dialect}.")
+
+    async with engine.connect() as conn:
+        pending = await conn.run_sync(_pending_columns)
+    for schema, source, money_column in pending:
+        async with engine.begin() as conn:
+            await conn.run_sync(_convert_column, schema, source, money_column)
+    return [_qualified_name(*entry) for entry in pending]
+
+
+def _convert_column(conn: Connection, schema: str | None, source: Table, money_column: Column[object]) -> None:
+    preparer = conn.dialect.identifier_preparer
+    name = preparer.quote(source.name)
+    qualified = f"{preparer.quote_schema(schema)}.{name}" if schema else name
+    old = preparer.quote(money_column.name)
+    scale = 10**AMOUNT_SCALE
+
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(f"ALTER TABLE {qualified} ALTER COLUMN {old} TYPE BIGINT USING round({old} * {scale})")
+        return
+
+    pending_name = f"{money_column.name}{_PENDING_SUFFIX}"
+    new = preparer.quote(pending_name)
+    columns = {info["name"] for info in inspect(conn).get_columns(source.name, schema=schema)}
+    # MySQL's DDL is not transactional: finish or restart a conversion that was interrupted.
+    if money_column.name not in columns:
+        conn.exec_driver_sql(f"ALTER TABLE {qualified} RENAME COLUMN {new} TO {old}")
+        return
+    if pending_name in columns:
+        conn.exec_driver_sql(f"ALTER TABLE {qualified} DROP COLUMN {new}")
+    not_null = "" if money_column.nullable else " NOT NULL DEFAULT 0"
+    conn.exec_driver_sql(f"ALTER TABLE {qualified} ADD COLUMN {new} BIGINT{not_null}")
+
+    target = table(source.name, column(money_column.name), column(pending_name), schema=schema)
+    conn.execute(
+        update(target).values({pending_name: cast(func.round(target.c[money_column.name] * scale), BigInteger)})
+    )
+    conn.exec_driver_sql(f"ALTER TABLE {qualified} DROP COLUMN {old}")
+    conn.exec_driver_sql(f"ALTER TABLE {qualified} RENAME COLUMN {new} TO {old}")
@@ -0,0 +1,405 @@
+"""
+Time-Partitioned Transaction Logs 🗂️
+
+Range-partitions transaction_logs by created_at (monthly or yearly), so that
+inserts only touch the current period's indexes and date-bounded queries only
+read the periods they cover.
+
+---
+DESIGN:
+- PostgreSQL: native declarative partitioning. The table is converted once into
+  a `PARTITION BY RANGE (created_at)` parent (primary key becomes (id, created_at)),
+  with one partition per period plus a DEFAULT partition so no insert can fail.
+  Future partitions are created ahead of time. The planner prunes partitions from
+  the created_at predicates in each query.
+- SQLite: the main database keeps the open period. Closed periods are moved into
+  per-period database files, listed in `log_partitions` and ATTACHed by every
+  connection. log_source() puts the main table and the attached partitions that
+  overlap the requested dates behind one UNION ALL. SQLite attaches at most 10
+  databases per connection, so once that many partitions exist, rotation folds
+  the oldest two into one cold file covering both periods.
+- Repository queries read logs through log_source() and pass any date bounds
+  they have. With partitioning disabled, log_source() returns TransactionLog
+  itself and nothing changes.
+"""
+
+import functools
+import logging
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import (
+    Column,
+    Engine,
+    Index,
+    MetaData,
+    Table,
+    delete,
+    event,
+    func,
+    insert,
+    select,
+    text,
+    union_all,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.orm import aliased
+from sqlalchemy.schema import AddConstraint
+
+from app.core.datetime import utc
+from app.db.utils import model_table
+from app.models.ledger import LogPartition, TransactionLog, transaction_log_archive
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default SQLITE_MAX_ATTACHED; every connection attaches all partitions
+SQLITE_MAX_PARTITIONS = 10
+
+# --- Period Arithmetic ---
+
+
+def period_start(moment: datetime, period: str) -> datetime:
+    """Start (UTC midnight) of the month or year containing `moment`."""
+    moment = utc(moment)
+    if period == "year":
+        return datetime(moment.year, 1, 1, tzinfo=UTC)
+    return datetime(moment.year, moment.month, 1, tzinfo=UTC)
+
+
+def next_period_start(start: datetime, period: str) -> datetime:
+    """Start of the period following the one that begins at `start`."""
+    if period == "year" or start.month == 12:
+        return datetime(start.year + 1, 1, 1, tzinfo=UTC)
+    return datetime(start.year, start.month + 1, 1, tzinfo=UTC)
+
+
+def partition_suffix(start: datetime, period: str) -> str:
+    """Name suffix of a period's partition (e.g., '2026_10' or '2026')."""
+    return f"{start.year}" if period == "year" else f"{start.year}_{start.month:02d}"
+
+
+def iter_periods(first: datetime, last: datetime, period: str) -> list[datetime]:
+    """Starts of every period from the one containing `first` through the one containing `last`."""
+    starts: list[datetime] = []
+    start = period_start(first, period)
+    while start <= utc(last):
+        starts.append(start)
+        start = next_period_start(start, period)
+    return starts
+
+
+# --- Partition-Aware Reads ---
+
+
+@dataclass(frozen=True)
+class AttachedPartition:
+    """A closed period of transaction_logs attached to a SQLite connection."""
+
+    name: str
+    period_start: datetime
+    period_end: datetime
+
+    def overlaps(self, since: datetime | None, until: datetime | None) -> bool:
+        return (until is None or self.period_start <= utc(until)) and (since is None or self.period_end > utc(since))
+
+
+# Partitions attached by the connections of each SQLite engine (refreshed on every new connection)
+_attached: WeakKeyDictionary[Engine, list[AttachedPartition]] = WeakKeyDictionary()
+_archive_metadata = MetaData()
+
+
+def log_source(
+    conn: AsyncConnection, since: datetime | None = None, until: datetime | None = None, include_archived: bool = False
+) -> Any:
+    """
+    Returns the ORM entity to read transaction logs from for logs created in [since, until]:
+    TransactionLog itself, or on partitioned SQLite an alias over the UNION ALL of the main
+    table and every attached partition overlapping the range.
+
+    With `include_archived`, settled logs moved to transaction_log_archive are included too
+    (see app.services.archive).
+
+    Callers must still filter on created_at themselves; the bounds only select partitions.
+    """
+    partitions = [p for p in _attached.get(conn.sync_engine, []) if p.overlaps(since, until)]
+    if not partitions and not include_archived:
+        return TransactionLog
+
+    main = model_table(TransactionLog)
+    sources = [select(main), *(select(archive_table(p.name)) for p in partitions)]
+    if include_archived:
+        sources.append(select(transaction_log_archive))
+    return aliased(TransactionLog, union_all(*sources).subquery(main.name))
+
+
+def has_attached_partitions(conn: AsyncConnection, until: datetime | None = None) -> bool:
+    """Whether any closed period up to `until` lives in an attached SQLite partition."""
+    return any(p.overlaps(None, until) for p in _attached.get(conn.sync_engine, []))
+
+
+def archive_table(schema: str) -> Table:
+    """The transaction_logs table inside an attached partition (same columns and indexes, no foreign keys)."""
+    key = f"{schema}.{TransactionLog.__tablename__}"
+    if key in _archive_metadata.tables:
+        return _archive_metadata.tables[key]
+
+    source = model_table(TransactionLog)
+    table = Table(
+        TransactionLog.__tablename__,
+        _archive_metadata,
+        *(Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in source.columns),
+        schema=schema,
+    )
+    for index in source.indexes:
+        Index(f"{schema}_{index.name}", *(table.c[c.name] for c in index.columns))
+    return table
+
+
+def install_log_partitions(engine: AsyncEngine) -> None:
+    """
+    Makes every new SQLite connection of `engine` attach the partitions listed in
+    log_partitions. No-op on other dialects and when already installed.
+    """
+    sync_engine = engine.sync_engine
+    if engine.dialect.name != "sqlite" or sync_engine in _attached:
+        return
+    _attached[sync_engine] = []
+
+    @event.listens_for(sync_engine, "connect")
+    def attach_partitions(dbapi_connection: Any, _connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (LogPartition.__tablename__,)
+            )
+            if cursor.fetchone() is None:
+                return
+            cursor.execute(f"SELECT name, period_start, period_end, path FROM {LogPartition.__tablename__}")
+            partitions: list[AttachedPartition] = []
+            for name, start, end, path in cursor.fetchall():
+                cursor.execute(f'ATTACH DATABASE ? AS "{name}"', (path,))
+                partitions.append(AttachedPartition(name, utc(_parse(start)), utc(_parse(end))))
+            _attached[sync_engine] = sorted(partitions, key=lambda p: p.period_start)
+        finally:
+            cursor.close()
+
+
+def _parse(value: str | datetime) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+# --- PostgreSQL: Native Partitioning ---
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    """Whether transaction_logs is already a partitioned table (PostgreSQL)."""
+    stmt = text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid))"
+    )
+    return bool(await conn.scalar(stmt, {"name": TransactionLog.__tablename__}))
+
+
+async def convert_to_partitioned(conn: AsyncConnection, period: str, months_ahead: int = 3) -> None:
+    """
+    One-off migration (PostgreSQL): rebuilds transaction_logs as a range-partitioned table,
+    copying every row, in the caller's transaction. Locks the table for the duration;
+    must not run while other workers are posting.
+    """
+    name = TransactionLog.__tablename__
+    old = f"{name}_unpartitioned"
+    await conn.execute(text(f'ALTER TABLE "{name}" RENAME TO "{old}"'))
+    sequence = await conn.scalar(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": old})
+
+    await conn.execute(
+        text(
+            f'CREATE TABLE "{name}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING COMMENTS) '
+            f"PARTITION BY RANGE (created_at)"
+        )
+    )
+    await conn.execute(text(f'CREATE TABLE "{name}_default" PARTITION OF "{name}" DEFAULT'))
+    first = await conn.scalar(text(f'SELECT MIN(created_at) FROM "{old}"'))
+    await ensure_partitions(conn, period, first or datetime.now(UTC), months_ahead)
+
+    await conn.execute(text(f'INSERT INTO "{name}" SELECT * FROM "{old}"'))
+    if sequence:
+        # The id sequence is owned by the old column and would be dropped with it.
+        await conn.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY "{name}".id'))
+    await conn.execute(text(f'DROP TABLE "{old}"'))
+
+    # Primary keys of partitioned tables must include the partition key.
+    await conn.execute(text(f'ALTER TABLE "{name}" ADD PRIMARY KEY (id, created_at)'))
+    table = model_table(TransactionLog)
+    for index in table.indexes:
+        await conn.run_sync(index.create)
+    for constraint in table.foreign_key_constraints:
+        await conn.execute(AddConstraint(constraint))
+
+
+async def ensure_partitions(
+    conn: AsyncConnection, period: str, since: datetime, months_ahead: int = 3, now: datetime | None = None
+) -> list[str]:
+    """
+    Creates the missing partitions (PostgreSQL) from the period containing `since` through
+    `months_ahead` months past `now`, so that inserts never fall into the DEFAULT partition.
+
+    Returns:
+        The names of the partitions that now cover that range.
+    """
+    horizon = period_start(now or datetime.now(UTC), "month")
+    for _ in range(months_ahead):
+        horizon = next_period_start(horizon, "month")
+    name = TransactionLog.__tablename__
+    created: list[str] = []
+    for start in iter_periods(since, horizon, period):
+        partition = f"{name}_p{partition_suffix(start, period)}"
+        await conn.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "{partition}" PARTITION OF "{name}" '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{next_period_start(start, period).isoformat()}')"
+            )
+        )
+        created.append(partition)
+    return created
+
+
+# --- SQLite: Attached Per-Period Files ---
+
+
+async def rotate_sqlite_partitions(
+    engine: AsyncEngine,
+    period: str,
+    directory: str | Path,
+    now: datetime | None = None,
+    max_partitions: int = SQLITE_MAX_PARTITIONS,
+) -> list[str]:
+    """
+    Moves every closed period (before the one containing `now`) out of the main SQLite
+    database into its own partition file, and registers it in log_partitions. When
+    `max_partitions` already exist, the oldest two are merged first (see DESIGN), and
+    periods already covered by a merged partition go into it.
+
+    Workers attach partitions when they open connections, so they must be restarted
+    (or their pools disposed) afterwards; run while no other workers are posting. Each
+    period moves in one transaction, which is atomic across files in rollback-journal
+    mode but not in WAL mode.
+
+    Returns:
+        The names of the partitions that received rows.
+
+    Raises:
+        ValueError: If `max_partitions` is below 2.
+    """
+    if max_partitions < 2:
+        raise ValueError("At least two partitions are needed to merge the oldest ones.")
+    boundary = period_start(now or datetime.now(UTC), period)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    main = model_table(TransactionLog)
+    moved: list[str] = []
+
+    async with engine.connect() as conn:
+        attached = set((await conn.exec_driver_sql("PRAGMA database_list")).scalars(1).all())
+        oldest = await conn.scalar(select(func.min(main.c.created_at)))
+        # SQLite reuses the highest rowid once it is deleted; the newest row always stays in main.
+        newest_id = await conn.scalar(select(func.max(main.c.id)))
+        await conn.commit()
+        if oldest is None:
+            return moved
+
+        for start in iter_periods(oldest, boundary, period):
+            if start >= boundary:
+                break
+            end = next_period_start(start, period)
+            partitions = await _registered_partitions(conn)
+            await conn.commit()
+            covering = next((p for p in partitions if p.period_start <= start < p.period_end), None)
+            if covering is not None:
+                name, path = covering.name, Path(covering.path)
+            else:
+                if len(partitions) >= max_partitions:
+                    cold, merged = await _merge_oldest_partitions(conn, partitions, attached)
+                    if merged in moved:
+                        moved = [p for p in moved if p != merged] + ([cold] if cold not in moved else [])
+                name = f"logs_{partition_suffix(start, period)}"
+                path = directory / f"transaction_logs_{partition_suffix(start, period)}.db"
+
+            if name not in attached:
+                # ATTACH is not allowed inside a transaction.
+                await conn.exec_driver_sql(f'ATTACH DATABASE ? AS "{name}"', (str(path),))
+                await conn.commit()
+                attached.add(name)
+            archive = archive_table(name)
+
+            async with conn.begin():
+                await conn.run_sync(functools.partial(archive.create, checkfirst=True))
+                in_period = (main.c.created_at >= start, main.c.created_at < end, main.c.id < newest_id)
+                rows = await conn.execute(
+                    insert(archive).from_select([c.name for c in main.columns], select(main).where(*in_period))
+                )
+                await conn.execute(delete(main).where(*in_period))
+                if await conn.scalar(select(LogPartition.name).where(LogPartition.name == name)) is None:
+                    await conn.execute(
+                        insert(LogPartition).values(name=name, period_start=start, period_end=end, path=str(path))
+                    )
+            if rows.rowcount:
+                logger.info(f"Moved {rows.rowcount} logs into partition {name} ({path}).")
+                moved.append(name)
+    return moved
+
+
+class _RegisteredPartition(NamedTuple):
+    name: str
+    period_start: datetime
+    period_end: datetime
+    path: str
+
+
+async def _registered_partitions(conn: AsyncConnection) -> list[_RegisteredPartition]:
+    stmt = select(LogPartition.name, LogPartition.period_start, LogPartition.period_end, LogPartition.path)
+    return [
+        _RegisteredPartition(name, utc(start), utc(end), path)
+        for name, start, end, path in await conn.execute(stmt.order_by(LogPartition.period_start))
+    ]
+
+
+async def _merge_oldest_partitions(
+    conn: AsyncConnection, partitions: list[_RegisteredPartition], attached: set[str]
+) -> tuple[str, str]:
+    """
+    Frees an attachment slot: moves the rows of the second-oldest partition into the oldest,
+    which then covers both periods, and drops the second-oldest file.
+
+    Returns:
+        The names of the partition kept and of the one merged into it.
+    """
+    cold, merged = partitions[0], partitions[1]
+    for partition in (cold, merged):
+        if partition.name not in attached:
+            await conn.exec_driver_sql(f'ATTACH DATABASE ? AS "{partition.name}"', (partition.path,))
+            await conn.commit()
+            attached.add(partition.name)
+
+    async with conn.begin():
+        cold_table, merged_table = archive_table(cold.name), archive_table(merged.name)
+        await conn.run_sync(lambda sync_conn: cold_table.create(sync_conn, checkfirst=True))
+        await conn.run_sync(lambda sync_conn: merged_table.create(sync_conn, checkfirst=True))
+        await conn.execute(insert(cold_table).from_select([c.name for c in cold_table.columns], select(merged_table)))
+        await conn.execute(
+            update(LogPartition)
+            .where(LogPartition.name == cold.name)
+            .values(period_end=max(cold.period_end, merged.period_end))
+        )
+        await conn.execute(delete(LogPartition).where(LogPartition.name == merged.name))
+
+    # DETACH is not allowed inside a transaction either.
+    await conn.exec_driver_sql(f'DETACH DATABASE "{merged.name}"')
+    await conn.commit()
+    attached.discard(merged.name)
+    Path(merged.path).unlink(missing_ok=True)
+    logger.info(f"Merged partition {merged.name} into {cold.name} ({cold.path}).")
+    return cold.name, merged.name
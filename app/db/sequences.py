@@ -0,0 +1,261 @@
+"""
+Block-Allocating ID Sequences 🔢
+
+This module hands out transaction_batch_id values without scanning the ledger.
+Each process reserves IDs from the database in blocks (hi/lo style) and serves
+them from memory until the block is exhausted.
+
+---
+DESIGN:
+- PostgreSQL: a native sequence; a block is fetched with one `nextval()` per ID
+  in a single `generate_series` round trip. Each process's first reservation
+  moves the sequence past the ledger's highest batch ID (under an advisory lock).
+- Other dialects: a counter row in `ledger_sequences`, advanced by the block size
+  with a single row-locking UPDATE.
+- Blocks are reserved on a dedicated connection and committed immediately, so a
+  rolled-back posting never returns its IDs to the pool. Gaps are acceptable;
+  duplicates are not.
+- SQLite is the exception: its single writer lock would deadlock a second
+  connection, so blocks are reserved inside the caller's transaction and only
+  shared with other sessions after that transaction commits.
+- One allocator per engine per process. An asyncio.Lock serializes concurrent
+  sessions of the same process; the database serializes separate processes. On
+  SQLite the lock is not used: the counter UPDATE waits for the database write
+  lock, and holding the asyncio.Lock meanwhile would deadlock against a session
+  that holds the write lock and waits for the allocator.
+"""
+
+import asyncio
+from collections import deque
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Engine, func, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.config import get_batch_id_block_size
+from app.db.engine import get_async_engine
+from app.db.events import on_commit, on_rollback
+from app.models.ledger import TRANSACTION_BATCH_ID_SEQUENCE, LedgerSequence, TransactionLog, transaction_log_archive
+
+BATCH_ID_SEQUENCE_NAME = "transaction_batch_id"
+
+
+class BatchIdAllocator:
+    """
+    Process-local cache of transaction_batch_id blocks reserved from the database.
+    """
+
+    def __init__(self, engine: AsyncEngine, block_size: int):
+        self._engine = engine
+        self._block_size = block_size
+        self._blocks: deque[range] = deque()
+        self._lock = asyncio.Lock()
+        self._sequence_seeded = False
+        # SQLite has a single database-wide writer: a reservation on a second connection would wait
+        # forever for the write lock held by the caller's own transaction.
+        self._reserves_in_caller_transaction = engine.dialect.name == "sqlite"
+
+    async def next_id(self, session: AsyncSession | None = None) -> int:
+        """Returns a single, never-before-issued batch ID."""
+        return (await self.reserve(1, session))[0]
+
+    async def reserve(self, count: int, session: AsyncSession | None = None) -> list[int]:
+        """
+        Returns `count` unique batch IDs.
+
+        Hits the database only when the cached blocks are exhausted; a request larger
+        than the block size is satisfied with one oversized reservation.
+
+        Args:
+            count: Number of IDs to hand out.
+            session: The caller's session. Required on SQLite, where new blocks are reserved
+                     inside the caller's transaction and only shared with other sessions once
+                     that transaction commits (they are discarded if it rolls back).
+        """
+        ids: list[int] = []
+        if self._reserves_in_caller_transaction:
+            if session is None:
+                raise RuntimeError("Batch ID allocation on SQLite requires the caller's session.")
+            # No self._lock here: the counter UPDATE waits for SQLite's write lock, which another session
+            # of this process may hold while it waits for the allocator. Pools are only touched between awaits.
+            session_blocks = self._session_blocks(session)
+            while len(ids) < count:
+                pool = session_blocks or self._blocks
+                if not pool:
+                    pool = session_blocks
+                    await self._reserve_in_caller_transaction(session, pool, max(self._block_size, count - len(ids)))
+                self._take(pool, count - len(ids), ids)
+            return ids
+
+        async with self._lock:
+            while len(ids) < count:
+                if not self._blocks:
+                    self._blocks.extend(await self._reserve_blocks(max(self._block_size, count - len(ids))))
+                self._take(self._blocks, count - len(ids), ids)
+        return ids
+
+    @staticmethod
+    def _take(pool: deque[range], needed: int, ids: list[int]) -> None:
+        """Moves up to `needed` IDs from the first block of `pool` into `ids`."""
+        block = pool.popleft()
+        ids.extend(block[:needed])
+        if len(block) > needed:
+            pool.appendleft(block[needed:])
+
+    def _session_blocks(self, session: AsyncSession) -> deque[range]:
+        """Blocks reserved inside the session's open transaction, private to that session until commit."""
+        key = ("divvy.batch_id_blocks", id(self))
+        blocks: deque[range] | None = session.info.get(key)
+        if blocks is None:
+            blocks = session.info[key] = deque[range]()
+        return blocks
+
+    async def _reserve_in_caller_transaction(self, session: AsyncSession, blocks: deque[range], size: int) -> None:
+        block = await self._reserve_from_counter(await session.connection(), size)
+        blocks.append(block)
+
+        def publish() -> None:
+            self._blocks.extend(blocks)
+            blocks.clear()
+
+        def discard() -> None:
+            # Blocks reserved before a rolled-back SAVEPOINT are still valid; only this one's counter update is undone.
+            kept = [pending for pending in blocks if pending[0] not in block]
+            blocks.clear()
+            blocks.extend(kept)
+
+        # A rollback undoes the counter update, so the block must never be handed out again.
+        on_commit(session, publish)
+        on_rollback(session, discard)
+
+    async def align_with_ledger(self) -> None:
+        """
+        Moves the sequence past the highest batch ID already present in the ledger
+        (e.g., IDs issued by the old MAX()+1 scheme). Reservations do this on first use,
+        so it is only needed to align a database ahead of time. Must not run while
+        other workers are posting.
+        """
+        async with self._engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                await self._seed_sequence(conn)
+            else:
+                high_water_mark = await self._ledger_high_water_mark(conn)
+                end = await self._advance_counter(conn, 0)
+                if end is None:
+                    await conn.execute(
+                        insert(LedgerSequence).values(name=BATCH_ID_SEQUENCE_NAME, next_value=high_water_mark + 1)
+                    )
+                elif end <= high_water_mark:
+                    await conn.execute(
+                        update(LedgerSequence)
+                        .where(LedgerSequence.name == BATCH_ID_SEQUENCE_NAME)
+                        .values(next_value=high_water_mark + 1)
+                    )
+        self._blocks.clear()
+
+    # --- Reservation Strategies ---
+
+    async def _reserve_blocks(self, size: int) -> list[range]:
+        """Reserves IDs on a dedicated connection that commits immediately."""
+        if self._engine.dialect.name == "postgresql":
+            return await self._reserve_from_sequence(size)
+
+        # Two attempts: the first may lose the race to seed a missing counter row.
+        for _ in range(2):
+            try:
+                async with self._engine.begin() as conn:
+                    return [await self._reserve_from_counter(conn, size)]
+            except IntegrityError:
+                continue
+        raise RuntimeError(f"Could not reserve a block from sequence '{BATCH_ID_SEQUENCE_NAME}'.")
+
+    async def _reserve_from_sequence(self, size: int) -> list[range]:
+        """Draws `size` values from the native sequence and groups them into contiguous ranges."""
+        stmt = select(TRANSACTION_BATCH_ID_SEQUENCE.next_value()).select_from(func.generate_series(1, size).alias("n"))
+        async with self._engine.begin() as conn:
+            if not self._sequence_seeded:
+                # First use in this process: seed past any IDs issued by the old MAX()+1 scheme.
+                await self._seed_sequence(conn)
+            values = sorted((await conn.scalars(stmt)).all())
+        self._sequence_seeded = True
+
+        # Concurrent workers may interleave nextval() calls, so values are not guaranteed contiguous.
+        ranges: list[range] = []
+        start = previous = values[0]
+        for value in values[1:]:
+            if value != previous + 1:
+                ranges.append(range(start, previous + 1))
+                start = value
+            previous = value
+        ranges.append(range(start, previous + 1))
+        return ranges
+
+    async def _seed_sequence(self, conn: AsyncConnection) -> None:
+        """
+        Moves the native sequence (PostgreSQL) past the ledger's highest batch ID unless it already is.
+        The advisory lock is held until `conn` commits, so a concurrent seeder that already drew values
+        in the same transaction is never rewound.
+        """
+        name = TRANSACTION_BATCH_ID_SEQUENCE.name
+        await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": name})
+        high_water_mark = await self._ledger_high_water_mark(conn)
+        # last_value has not been issued yet while is_called is false
+        await conn.execute(
+            text(
+                f"SELECT setval('{name}', :hwm) FROM {name} "
+                f"WHERE CASE WHEN is_called THEN last_value ELSE last_value - 1 END < :hwm"
+            ),
+            {"hwm": high_water_mark},
+        )
+
+    async def _reserve_from_counter(self, conn: AsyncConnection, size: int) -> range:
+        """Advances the ledger_sequences counter by `size` within `conn`'s transaction."""
+        end = await self._advance_counter(conn, size)
+        if end is None:
+            # First use on this database: seed past any IDs issued by the old MAX()+1 scheme.
+            start = await self._ledger_high_water_mark(conn) + 1
+            await conn.execute(insert(LedgerSequence).values(name=BATCH_ID_SEQUENCE_NAME, next_value=start + size))
+            return range(start, start + size)
+        return range(end - size, end)
+
+    @staticmethod
+    async def _advance_counter(conn: AsyncConnection, size: int) -> int | None:
+        """Increments the counter row (taking its row lock) and returns the new next_value, or None if missing."""
+        stmt = (
+            update(LedgerSequence)
+            .where(LedgerSequence.name == BATCH_ID_SEQUENCE_NAME)
+            .values(next_value=LedgerSequence.next_value + size)
+        )
+        if conn.dialect.update_returning:
+            return (await conn.execute(stmt.returning(LedgerSequence.next_value))).scalar_one_or_none()
+
+        # MySQL: no RETURNING, but the row lock taken by UPDATE makes the follow-up read consistent.
+        if (await conn.execute(stmt)).rowcount == 0:
+            return None
+        return await conn.scalar(select(LedgerSequence.next_value).where(LedgerSequence.name == BATCH_ID_SEQUENCE_NAME))
+
+    @staticmethod
+    async def _ledger_high_water_mark(conn: AsyncConnection) -> int:
+        # Archived batches keep their IDs, so they count too.
+        live = await conn.scalar(select(func.max(TransactionLog.transaction_batch_id))) or 0
+        archived = await conn.scalar(select(func.max(transaction_log_archive.c.transaction_batch_id))) or 0
+        return max(live, archived)
+
+
+# --- Process-wide Registry ---
+
+_allocators: WeakKeyDictionary[Engine, BatchIdAllocator] = WeakKeyDictionary()
+
+
+def get_batch_id_allocator(session: AsyncSession) -> BatchIdAllocator:
+    """
+    Returns the process-wide BatchIdAllocator for the engine the session is bound to,
+    creating it on first use.
+    """
+    engine = get_async_engine(session)
+    allocator = _allocators.get(engine.sync_engine)
+    if allocator is None:
+        allocator = BatchIdAllocator(engine, get_batch_id_block_size())
+        _allocators[engine.sync_engine] = allocator
+    return allocator
@@ -0,0 +1,178 @@
+"""
+Read-Replica Session Routing 🔀
+
+Sends the read-only repository methods to a replica engine (a streaming replica,
+or a separate read-only SQLite connection) while everything else stays on the
+primary, without changing how repositories receive their AsyncSession.
+
+---
+DESIGN:
+- Sessions from ReplicaRouter.session_factory() use RoutingSession, whose
+  get_bind() picks the engine per statement.
+- Repository methods decorated with @read_only (or code inside
+  `async with replica_reads(session)`) are routed to the replica. Everything
+  else, including flushes, DML and SELECT ... FOR UPDATE, goes to the primary.
+- Read-your-writes: once a session has written, it is pinned to the primary
+  until it closes, so a caller never reads around its own postings.
+- Staleness bound: the replica's lag is measured at most once per
+  `check_interval`; while it exceeds `max_lag` (or cannot be measured), reads
+  go to the primary.
+- Plain sessions (no router) ignore @read_only, so repositories work unchanged.
+"""
+
+import contextlib
+import functools
+import inspect
+import logging
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import Connection, Engine, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.config import get_replica_database_url, get_replica_max_lag
+from app.db.partitioning import install_log_partitions
+
+logger = logging.getLogger(__name__)
+
+_ROUTER_KEY = "divvy.replica_router"
+_READ_ONLY_KEY = "divvy.read_only_depth"
+_PINNED_KEY = "divvy.pinned_to_primary"
+
+
+class ReplicaRouter:
+    """Primary and replica engines of one database, and the replica's last measured lag."""
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replica: AsyncEngine,
+        max_lag: timedelta | None = None,
+        check_interval: timedelta = timedelta(seconds=1),
+    ):
+        self.primary = primary
+        self.replica = replica
+        self._max_lag = (max_lag if max_lag is not None else get_replica_max_lag()).total_seconds()
+        self._check_interval = check_interval.total_seconds()
+        self._lag: float | None = None
+        self._checked_at = float("-inf")
+        # Closed log partitions must be readable through the replica's connections too.
+        install_log_partitions(replica)
+
+    def session_factory(self, **kwargs: Any) -> async_sessionmaker[AsyncSession]:
+        """A sessionmaker whose sessions route @read_only methods to the replica."""
+        return async_sessionmaker(self.primary, sync_session_class=RoutingSession, info={_ROUTER_KEY: self}, **kwargs)
+
+    @property
+    def replica_usable(self) -> bool:
+        """Whether the replica's last measured lag is within the staleness bound."""
+        return self._lag is not None and self._lag <= self._max_lag
+
+    async def check_replica(self) -> bool:
+        """Measures the replica's lag unless it was measured within the last `check_interval`."""
+        if time.monotonic() - self._checked_at >= self._check_interval:
+            self._checked_at = time.monotonic()
+            try:
+                self._lag = await self._measure_lag()
+            except Exception as exc:
+                logger.warning(f"Could not measure replica lag ({exc!r}); reading from the primary.")
+                self._lag = None
+        return self.replica_usable
+
+    async def _measure_lag(self) -> float | None:
+        """Seconds the replica is behind its primary (0 if it is not a streaming replica), or None if unknown."""
+        async with self.replica.connect() as conn:
+            match conn.dialect.name:
+                case "postgresql":
+                    return await conn.scalar(
+                        text(
+                            "SELECT CASE WHEN NOT pg_is_in_recovery() "
+                            "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                            "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                        )
+                    )
+                case "mysql" | "mariadb":
+                    row = (await conn.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+                    if row is None:
+                        return 0.0
+                    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+                    return None if lag is None else float(lag)
+                case _:
+                    # A read-only connection to the same file (SQLite) never lags.
+                    return 0.0
+
+
+class RoutingSession(Session):
+    """Sync Session behind AsyncSession that picks the primary or the replica per statement."""
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Engine | Connection:
+        router: ReplicaRouter | None = self.info.get(_ROUTER_KEY)
+        if router is None:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+
+        if self._flushing or getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None) is not None:
+            self.info[_PINNED_KEY] = True
+        if self.info.get(_READ_ONLY_KEY) and not self.info.get(_PINNED_KEY) and router.replica_usable:
+            return router.replica.sync_engine
+        return router.primary.sync_engine
+
+
+@contextlib.asynccontextmanager
+async def replica_reads(session: AsyncSession) -> AsyncGenerator[None]:
+    """Routes the session's queries inside the block to the replica, if it has one and it is fresh enough."""
+    info = session.sync_session.info
+    router: ReplicaRouter | None = info.get(_ROUTER_KEY)
+    if router is None or info.get(_PINNED_KEY) or not await router.check_replica():
+        yield
+        return
+
+    info[_READ_ONLY_KEY] = info.get(_READ_ONLY_KEY, 0) + 1
+    try:
+        yield
+    finally:
+        info[_READ_ONLY_KEY] -= 1
+
+
+def read_only[F: Callable[..., Any]](method: F) -> F:
+    """
+    Marks a repository method (coroutine or async generator) as safe to serve from
+    the replica. The repository must keep its AsyncSession in `self.session`.
+    """
+    if inspect.isasyncgenfunction(method):
+
+        @functools.wraps(method)
+        async def stream_from_replica(self: Any, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+            async with replica_reads(self.session):
+                async for item in method(self, *args, **kwargs):
+                    yield item
+
+        return stream_from_replica  # type: ignore[return-value]
+
+    @functools.wraps(method)
+    async def read_from_replica(self: Any, *args: Any, **kwargs: Any) -> Any:
+        async with replica_reads(self.session):
+            return await method(self, *args, **kwargs)
+
+    return read_from_replica  # type: ignore[return-value]
+
+
+def create_session_factory(
+    url: str, replica_url: str | None = None, **kwargs: Any
+) -> tuple[async_sessionmaker[AsyncSession], list[AsyncEngine]]:
+    """
+    Creates the engines for `url` (and `replica_url`, default: DIVVY_REPLICA_DATABASE_URL)
+    and a sessionmaker that routes read-only methods to the replica when there is one.
+
+    Returns:
+        The sessionmaker and the engines to dispose of on shutdown.
+    """
+    primary = create_async_engine(url)
+    replica_url = replica_url or get_replica_database_url()
+    if replica_url is None:
+        return async_sessionmaker(primary, **kwargs), [primary]
+
+    replica = create_async_engine(replica_url)
+    return ReplicaRouter(primary, replica).session_factory(**kwargs), [primary, replica]
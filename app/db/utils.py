@@ -1,5 +1,8 @@
 from typing import Any
 
+from sqlalchemy import Table
+from sqlalchemy.orm import DeclarativeBase
+
 
 def apply_dict_updates[T](entity: object, update_data: dict[str, Any], excluded_attrs: set[str] | None) -> None:
     """
@@ -18,3 +21,11 @@ def apply_dict_updates[T](entity: object, update_data: dict[str, Any], excluded_
 
         if hasattr(entity, key):
             setattr(entity, key, value)
+
+
+def model_table(model: type[DeclarativeBase]) -> Table:
+    """
+    Returns the Table a declarative model is mapped to, typed as such (`Model.__table__` is
+    typed as a FromClause, which insert() and delete() do not accept).
+    """
+    return model.metadata.tables[model.__tablename__]
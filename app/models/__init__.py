@@ -1,4 +1,13 @@
+from . import catalog_closure as catalog_closure  # Registers the closure table maintenance listeners
 from .definitions import User
-from .ledger import Account, AccountEntity, AccountSubType, AccountType, ExpenseCatalog
+from .ledger import Account, AccountEntity, AccountSubType, AccountType, ExpenseCatalog, ExpenseCatalogClosure
 
-__all__ = ["User", "Account", "AccountEntity", "AccountSubType", "AccountType", "ExpenseCatalog"]
+__all__ = [
+    "User",
+    "Account",
+    "AccountEntity",
+    "AccountSubType",
+    "AccountType",
+    "ExpenseCatalog",
+    "ExpenseCatalogClosure",
+]
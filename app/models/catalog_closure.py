@@ -0,0 +1,101 @@
+"""
+Expense Catalog Closure Maintenance 🌳
+
+Keeps expense_catalog_closure in step with ExpenseCatalog through mapper events,
+so every ORM change (repositories, seeding, admin scripts) updates it within the
+same flush and transaction. Imported by app.models for its side effects.
+
+Catalogs written with Core statements bypass these events; run
+AccountRepository.rebuild_expense_catalog_closure() afterwards.
+"""
+
+from typing import Any
+
+from sqlalchemy import Connection, delete, event, insert, inspect, literal, select, true
+from sqlalchemy.orm import Mapper, aliased, object_session
+
+from app.core.catalog_tree import invalidate_catalog_tree
+from app.db.events import on_commit
+from app.db.utils import model_table
+
+from .ledger import ExpenseCatalog, ExpenseCatalogClosure
+
+_closure = model_table(ExpenseCatalogClosure)
+
+
+def _invalidate_on_commit(target: ExpenseCatalog) -> None:
+    session = object_session(target)
+    if session is not None:
+        on_commit(session, invalidate_catalog_tree)
+
+
+@event.listens_for(ExpenseCatalog, "after_insert")
+def _link_new_catalog(_mapper: Mapper[Any], connection: Connection, target: ExpenseCatalog) -> None:
+    """The new catalog is its own depth-0 ancestor and one level below each ancestor of its parent."""
+    connection.execute(insert(_closure).values(ancestor_id=target.id, descendant_id=target.id, depth=0))
+    if target.parent_id is not None:
+        connection.execute(
+            insert(_closure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(_closure.c.ancestor_id, literal(target.id), _closure.c.depth + 1).where(
+                    _closure.c.descendant_id == target.parent_id
+                ),
+            )
+        )
+    _invalidate_on_commit(target)
+
+
+@event.listens_for(ExpenseCatalog, "after_update")
+def _relink_moved_catalog(_mapper: Mapper[Any], connection: Connection, target: ExpenseCatalog) -> None:
+    """
+    Moves the catalog's subtree under its new parent: drops the links from the old
+    ancestors into the subtree, then links every new ancestor to every subtree member.
+
+    Raises:
+        ValueError: If the new parent is the catalog itself or one of its descendants.
+    """
+    _invalidate_on_commit(target)
+    if not inspect(target).attrs.parent_id.history.has_changes():
+        return
+
+    subtree = (
+        connection.execute(select(_closure.c.descendant_id).where(_closure.c.ancestor_id == target.id)).scalars().all()
+    )
+    if target.parent_id in subtree:
+        raise ValueError(f"ExpenseCatalog {target.id} cannot be moved under itself or one of its descendants.")
+    old_ancestors = (
+        connection.execute(
+            select(_closure.c.ancestor_id).where(
+                _closure.c.descendant_id == target.id, _closure.c.ancestor_id != target.id
+            )
+        )
+        .scalars()
+        .all()
+    )
+
+    # Id lists are read first: MySQL cannot delete from a table its own subquery reads.
+    if old_ancestors:
+        connection.execute(
+            delete(_closure).where(_closure.c.descendant_id.in_(subtree), _closure.c.ancestor_id.in_(old_ancestors))
+        )
+    if target.parent_id is not None:
+        above = aliased(_closure)
+        below = aliased(_closure)
+        connection.execute(
+            insert(_closure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                # Every new ancestor x every subtree member: an intended cross join.
+                select(above.c.ancestor_id, below.c.descendant_id, above.c.depth + below.c.depth + 1)
+                .select_from(above.join(below, true()))
+                .where(above.c.descendant_id == target.parent_id, below.c.ancestor_id == target.id),
+            )
+        )
+
+
+@event.listens_for(ExpenseCatalog, "before_delete")
+def _unlink_deleted_catalog(_mapper: Mapper[Any], connection: Connection, target: ExpenseCatalog) -> None:
+    """Removes the catalog's links before its row goes (its children must be removed or moved first)."""
+    connection.execute(
+        delete(_closure).where((_closure.c.descendant_id == target.id) | (_closure.c.ancestor_id == target.id))
+    )
+    _invalidate_on_commit(target)
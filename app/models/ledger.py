@@ -1,10 +1,27 @@
+from datetime import date, datetime
+from decimal import Decimal
 from enum import Enum as PyEnum
-
-from sqlalchemy import DECIMAL, ForeignKey, Integer, String
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from typing import ClassVar
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    Sequence,
+    String,
+    Table,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import Mapped, declared_attr, mapped_column, relationship
 
 from .base import AuditMixin, Base, TimestampMixin
 from .definitions import User
+from .types import Money
 
 
 class AccountType(str, PyEnum):
@@ -90,6 +107,29 @@ class ExpenseCatalog(Base, AuditMixin):
     parent = relationship("ExpenseCatalog", remote_side=[id], backref="children")
 
 
+class ExpenseCatalogClosure(Base):
+    """
+    The Expense Catalog Closure Table (T_ExpenseCatalogClosure).
+    One row per (ancestor, descendant) pair of the catalog tree, including each
+    catalog paired with itself at depth 0, so subtree roll-ups are a single join
+    instead of recursive queries. Maintained on catalog changes (see
+    app.models.catalog_closure).
+    """
+
+    __tablename__ = "expense_catalog_closure"
+    __table_args__ = (Index("ix_expense_catalog_closure_descendant", "descendant_id", "ancestor_id"),)
+
+    ancestor_id: Mapped[int] = mapped_column(
+        ForeignKey(ExpenseCatalog.id), primary_key=True, comment="The ancestor catalog (or the catalog itself)."
+    )
+    descendant_id: Mapped[int] = mapped_column(
+        ForeignKey(ExpenseCatalog.id), primary_key=True, comment="The descendant catalog (or the catalog itself)."
+    )
+    depth: Mapped[int] = mapped_column(
+        Integer, nullable=False, comment="Number of levels between ancestor and descendant (0 for itself)."
+    )
+
+
 # --- 2. CORE FINANCIAL FACTS AND STATE MODELS (Facts & State) ---
 
 
@@ -116,16 +156,40 @@ class AccountEntity(Base, AuditMixin):
     )
 
     # State field: Cached Balance (must be updated atomically with transactions)
-    current_balance: Mapped[float] = mapped_column(
-        DECIMAL(14, 4),
+    current_balance: Mapped[Decimal] = mapped_column(
+        Money(),
         nullable=False,
-        default=0.00,
+        default=0,
         comment="Cached current balance, derived from aggregating TransactionLogs. Precision is 4 decimal places.",
     )
+    currency: Mapped[None | str] = mapped_column(
+        String(3), nullable=True, comment="ISO 4217 code of the entity's balance (NULL: the ledger's base currency)."
+    )
 
     # Relationships
     account_type = relationship("Account", backref="entities")
-    owner = relationship("User", backref="account_entities")
+    owner = relationship("User", foreign_keys=[owner_id], backref="account_entities")
+
+
+class AccountEntityBalanceShard(Base):
+    """
+    The Balance Shard Table (T_AccountEntityBalanceShard).
+    Splits the balance cache of a hot AccountEntity (e.g., a household's shared
+    SHARED_COST or SETTLEMENT entity) into N counters, so concurrent postings update
+    different rows instead of queuing on one row lock.
+
+    A sharded entity's balance is its current_balance plus the sum of its shards.
+    """
+
+    __tablename__ = "account_entity_balance_shards"
+
+    account_entity_id: Mapped[int] = mapped_column(
+        ForeignKey(AccountEntity.id), primary_key=True, comment="The sharded entity."
+    )
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True, comment="Shard number, from 0 to N - 1.")
+    balance: Mapped[Decimal] = mapped_column(
+        Money(), nullable=False, default=0, comment="Part of the entity's balance (Debits - Credits)."
+    )
 
 
 class TransactionLog(Base, AuditMixin):
@@ -136,6 +200,11 @@ class TransactionLog(Base, AuditMixin):
     """
 
     __tablename__ = "transaction_logs"
+    __table_args__ = (
+        # Composite (entity, id) indexes serve both entity lookups and keyset-paginated history scans.
+        Index("ix_transaction_logs_debit_entity_id_id", "debit_account_entity_id", "id"),
+        Index("ix_transaction_logs_credit_entity_id_id", "credit_account_entity_id", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, comment="Unique Log ID.")
     transaction_batch_id: Mapped[int] = mapped_column(
@@ -149,17 +218,18 @@ class TransactionLog(Base, AuditMixin):
     debit_account_entity_id: Mapped[int] = mapped_column(
         ForeignKey(AccountEntity.id),
         nullable=False,
-        index=True,
         comment="The entity ID receiving the debit (increase in asset/expense, decrease in liability/equity).",
     )
     credit_account_entity_id: Mapped[int] = mapped_column(
         ForeignKey(AccountEntity.id),
         nullable=False,
-        index=True,
         comment="The entity ID receiving the credit (increase in liability/equity, decrease in asset/expense).",
     )
-    amount: Mapped[float] = mapped_column(
-        DECIMAL(14, 4), nullable=False, comment="The transaction amount (must be positive)."
+    amount: Mapped[Decimal] = mapped_column(
+        Money(), nullable=False, comment="The transaction amount (must be positive)."
+    )
+    currency: Mapped[None | str] = mapped_column(
+        String(3), nullable=True, comment="ISO 4217 code of the amount (NULL: the ledger's base currency)."
     )
 
     # --- Business Tracking Fields ---
@@ -185,3 +255,416 @@ class TransactionLog(Base, AuditMixin):
     credit_entity = relationship("AccountEntity", foreign_keys=[credit_account_entity_id], backref="credit_logs")
     counterparty = relationship("AccountEntity", foreign_keys=[counterparty_entity_id], backref="counterparty_logs")
     expense_catalog_ref = relationship("ExpenseCatalog")
+
+
+class BalanceSnapshot(Base, TimestampMixin):
+    """
+    The Balance Snapshot Table (T_BalanceSnapshot).
+    A periodic checkpoint of an AccountEntity's balance derived from the TransactionLog,
+    so historical balances can be answered as "snapshot + logs since" instead of by
+    re-aggregating the ledger from the beginning.
+
+    A snapshot row covers every log with id <= last_log_id, and all of those logs were
+    created at or before covered_until.
+    """
+
+    __tablename__ = "balance_snapshots"
+    __table_args__ = (Index("ix_balance_snapshots_entity_covered_until", "account_entity_id", "covered_until"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, comment="Unique Snapshot ID.")
+    account_entity_id: Mapped[int] = mapped_column(
+        ForeignKey(AccountEntity.id), nullable=False, comment="The entity whose balance was captured."
+    )
+    balance: Mapped[Decimal] = mapped_column(
+        Money(), nullable=False, comment="Balance (Debits - Credits) over all covered logs."
+    )
+    last_log_id: Mapped[int] = mapped_column(
+        Integer, nullable=False, index=True, comment="Highest TransactionLog ID included in the balance."
+    )
+    covered_until: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, comment="Latest created_at among the covered logs."
+    )
+
+
+class IdempotencyKey(Base):
+    """
+    The Idempotency Key Table (T_IdempotencyKey).
+    Remembers which batch a client-supplied idempotency key produced, so a retried
+    submission returns the original batch instead of posting it again. Written in
+    the same transaction as the batch; swept in bulk once expired.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(
+        String(128), primary_key=True, comment="Client-supplied key, unique per logical submission."
+    )
+    transaction_batch_id: Mapped[int] = mapped_column(
+        Integer, nullable=False, comment="The batch posted for the key's first submission."
+    )
+    fingerprint: Mapped[str] = mapped_column(
+        String(64), nullable=False, comment="SHA-256 of the submitted logs, to reject a key reused for other content."
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True, comment="After this, the key may be swept and reused."
+    )
+
+
+# --- 3. DERIVED STATUS MODELS (Maintained Incrementally From the Log) ---
+
+
+class CashStatus(Base):
+    """
+    The Cash Balance Table (T_Cash_Status).
+    Running balance of each CASH entity, updated in the same transaction as every
+    posting that touches it.
+    """
+
+    __tablename__ = "cash_status"
+
+    account_entity_id: Mapped[int] = mapped_column(
+        ForeignKey(AccountEntity.id), primary_key=True, comment="The CASH entity this balance belongs to."
+    )
+    current_balance: Mapped[Decimal] = mapped_column(
+        Money(), nullable=False, default=0, comment="Net balance (Debits - Credits)."
+    )
+    last_transaction_batch_id: Mapped[int] = mapped_column(
+        Integer, nullable=False, comment="Most recent batch that changed this balance."
+    )
+    last_updated: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, comment="Timestamp of the last balance update."
+    )
+
+
+class CounterpartyStatusMixin:
+    """
+    Shared key columns of the per-counterparty status lists (AR, AP, UR): one row per
+    (owning entity, counterparty entity) pair.
+    """
+
+    __tablename__: ClassVar[str]
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, comment="Unique status item ID.")
+    account_entity_id: Mapped[int] = mapped_column(
+        ForeignKey(AccountEntity.id), nullable=False, comment="The AR/AP/UR entity holding the claim or liability."
+    )
+    counterparty_entity_id: Mapped[int] = mapped_column(
+        ForeignKey(AccountEntity.id), nullable=False, index=True, comment="The other party of the claim or liability."
+    )
+    last_transaction_batch_id: Mapped[int] = mapped_column(
+        Integer, nullable=False, comment="Most recent batch that changed this item (RelatedTransactionID)."
+    )
+    last_updated: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, comment="Timestamp of the last update."
+    )
+
+    @declared_attr.directive
+    @classmethod
+    def __table_args__(cls) -> tuple[UniqueConstraint]:
+        # Also serves as the upsert conflict target and the O(1) (entity, counterparty) lookup index.
+        return (UniqueConstraint("account_entity_id", "counterparty_entity_id", name=f"uq_{cls.__tablename__}_pair"),)
+
+
+class ARStatus(Base, CounterpartyStatusMixin):
+    """
+    The Accounts Receivable List (T_AR_Status).
+    Net amount each counterparty currently owes the AR entity's owner.
+    """
+
+    __tablename__ = "ar_status"
+
+    amount_owed: Mapped[Decimal] = mapped_column(
+        Money(), nullable=False, default=0, comment="Net amount the counterparty currently owes."
+    )
+
+
+class APStatus(Base, CounterpartyStatusMixin):
+    """
+    The Accounts Payable List (T_AP_Status).
+    Net amount the AP entity's owner currently owes each counterparty.
+    """
+
+    __tablename__ = "ap_status"
+
+    amount_due: Mapped[Decimal] = mapped_column(
+        Money(), nullable=False, default=0, comment="Net amount currently owed to the counterparty."
+    )
+
+
+class URStatus(Base, CounterpartyStatusMixin):
+    """
+    The Unearned Revenue List (T_UR_Status).
+    Prepayments received from each counterparty and how much of them has been used.
+    """
+
+    __tablename__ = "ur_status"
+
+    amount_prepaid: Mapped[Decimal] = mapped_column(
+        Money(), nullable=False, default=0, comment="Total prepaid by the counterparty (UR credits)."
+    )
+    settled_amount: Mapped[Decimal] = mapped_column(
+        Money(), nullable=False, default=0, comment="Prepayment already offset or refunded (UR debits)."
+    )
+
+
+# --- 4. SYSTEM SEQUENCES ---
+
+# Native sequence backing transaction_batch_id on databases that support it (PostgreSQL).
+# Ignored by create_all() on dialects without sequences, which use LedgerSequence instead.
+TRANSACTION_BATCH_ID_SEQUENCE = Sequence("transaction_batch_id_seq", metadata=Base.metadata)
+
+
+class LedgerSequence(Base):
+    """
+    The Ledger Sequence Table (T_LedgerSequence).
+    Portable counter used to reserve blocks of IDs on databases without native
+    sequences (SQLite, MySQL). Each row holds the next value that has not yet been
+    handed out to any worker process.
+    """
+
+    __tablename__ = "ledger_sequences"
+
+    name: Mapped[str] = mapped_column(
+        String(50), primary_key=True, comment="Name of the sequence (e.g., 'transaction_batch_id')."
+    )
+    next_value: Mapped[int] = mapped_column(
+        Integer, nullable=False, comment="First value not yet reserved by any allocator."
+    )
+
+
+class LogPartition(Base):
+    """
+    The Log Partition Catalog (T_LogPartition).
+    On SQLite, closed periods of transaction_logs are moved into per-period database
+    files that every connection attaches under `name`. This catalog lists them.
+    PostgreSQL uses native partitions instead and does not need it.
+    """
+
+    __tablename__ = "log_partitions"
+
+    name: Mapped[str] = mapped_column(
+        String(50), primary_key=True, comment="Schema name the partition is attached as (e.g., 'logs_2026_10')."
+    )
+    period_start: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, comment="Inclusive lower bound of created_at in the partition."
+    )
+    period_end: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, comment="Exclusive upper bound of created_at in the partition."
+    )
+    path: Mapped[str] = mapped_column(String(500), nullable=False, comment="Path of the partition database file.")
+
+
+# --- 5. COLD STORAGE (Archived Ledger History) ---
+
+
+class OpeningBalance(Base):
+    """
+    The Opening Balance Table (T_OpeningBalance).
+    Net of every log archived out of transaction_logs for an AccountEntity, so that
+    "opening balance + remaining logs" still equals the entity's full ledger balance.
+    Archival takes all of a settled user's logs before a cutoff at once, so the
+    archived logs of an entity are exactly its logs created before archived_until.
+    """
+
+    __tablename__ = "opening_balances"
+
+    account_entity_id: Mapped[int] = mapped_column(
+        ForeignKey(AccountEntity.id), primary_key=True, comment="The entity whose archived logs are summarized."
+    )
+    balance: Mapped[Decimal] = mapped_column(
+        Money(), nullable=False, default=0, comment="Net (Debits - Credits) of the archived logs."
+    )
+    log_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, comment="Number of archived logs.")
+    last_log_id: Mapped[int] = mapped_column(Integer, nullable=False, comment="Highest archived TransactionLog ID.")
+    last_transaction_batch_id: Mapped[int] = mapped_column(
+        Integer, nullable=False, comment="Highest archived batch ID."
+    )
+    archived_until: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, comment="Cutoff of the latest archival (exclusive)."
+    )
+
+
+# Archived logs keep their IDs and columns; only the (entity, id) history indexes are carried over.
+transaction_log_archive = Table(
+    "transaction_log_archive",
+    Base.metadata,
+    *(
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, comment=c.comment)
+        for c in TransactionLog.__table__.columns
+    ),
+    Index("ix_transaction_log_archive_debit_entity_id_id", "debit_account_entity_id", "id"),
+    Index("ix_transaction_log_archive_credit_entity_id_id", "credit_account_entity_id", "id"),
+    Index("ix_transaction_log_archive_transaction_batch_id", "transaction_batch_id"),
+    comment="Cold storage for settled TransactionLogs moved out of transaction_logs (T_TransactionLogArchive).",
+)
+
+
+# --- 6. STATEMENT IMPORT (Bank Statement Checkpoints and Deduplication) ---
+
+
+class StatementImport(Base):
+    """
+    The Statement Import Table (T_StatementImport).
+    Progress of each imported bank statement file: every posted chunk of statement
+    lines advances byte_offset in the same transaction, so a restarted import resumes
+    after the last posted line and never posts a line twice.
+    """
+
+    __tablename__ = "statement_imports"
+
+    source_key: Mapped[str] = mapped_column(
+        String(64), primary_key=True, comment="SHA-256 identifying the file (see app.core.statements)."
+    )
+    owner_id: Mapped[int] = mapped_column(
+        ForeignKey(User.id), nullable=False, index=True, comment="The user whose account the statement belongs to."
+    )
+    source_name: Mapped[str] = mapped_column(String(500), nullable=False, comment="File name as last imported.")
+    byte_offset: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, comment="End of the last posted statement line in the file."
+    )
+    lines_posted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lines_duplicate: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, comment="Lines skipped because they were already imported."
+    )
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    completed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, comment="When the whole file had been imported."
+    )
+
+
+class ImportedStatementLine(Base):
+    """
+    The Imported Statement Line Table (T_ImportedStatementLine).
+    One row per bank transaction ever imported, keyed by its fingerprint, so the same
+    transaction arriving again (e.g., in an overlapping statement) is not posted twice.
+    """
+
+    __tablename__ = "imported_statement_lines"
+
+    fingerprint: Mapped[str] = mapped_column(
+        String(64), primary_key=True, comment="SHA-256 of the owner and the transaction (see app.core.statements)."
+    )
+    transaction_batch_id: Mapped[int] = mapped_column(
+        Integer, nullable=False, comment="The batch the transaction was posted as."
+    )
+    imported_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+# --- 7. RECURRING EXPENSES (Schedules Materialized Into Batches) ---
+
+
+class RecurringExpense(Base, AuditMixin):
+    """
+    The Recurring Expense Table (T_RecurringExpense).
+    A shared expense that repeats on a schedule (e.g., monthly rent). The scheduler
+    posts every due occurrence as a batch and advances next_occurrence/next_due_on
+    in the same transaction, so the due schedules are one indexed range scan.
+    """
+
+    __tablename__ = "recurring_expenses"
+    __table_args__ = (Index("ix_recurring_expenses_due", "is_active", "next_due_on"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, comment="Recurring Expense ID.")
+    payer_id: Mapped[int] = mapped_column(ForeignKey(User.id), nullable=False, index=True, comment="Who pays.")
+    amount: Mapped[Decimal] = mapped_column(Money(), nullable=False, comment="Amount of every occurrence.")
+    split_method: Mapped[str] = mapped_column(
+        String(20), nullable=False, default="equal", comment="How the amount is split (see app.core.split)."
+    )
+    expense_catalog_id: Mapped[None | int] = mapped_column(ForeignKey(ExpenseCatalog.id), nullable=True)
+    narrative: Mapped[None | str] = mapped_column(String(200), nullable=True)
+    interval_unit: Mapped[str] = mapped_column(
+        String(10), nullable=False, comment="'day', 'week', 'month' or 'year' (see app.core.recurrence)."
+    )
+    interval_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, comment="Units between occurrences."
+    )
+    starts_on: Mapped[date] = mapped_column(Date, nullable=False, comment="Date of occurrence 0.")
+    ends_on: Mapped[None | date] = mapped_column(Date, nullable=True, comment="Last date an occurrence may fall on.")
+    next_occurrence: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, comment="Number of the first occurrence not posted yet."
+    )
+    next_due_on: Mapped[date] = mapped_column(Date, nullable=False, comment="Date of next_occurrence.")
+    is_active: Mapped[bool] = mapped_column(
+        default=True, comment="False once the schedule ended (or was stopped); inactive schedules are never due."
+    )
+
+    participants = relationship(
+        "RecurringExpenseParticipant", order_by="RecurringExpenseParticipant.position", cascade="all, delete-orphan"
+    )
+
+
+class RecurringExpenseParticipant(Base):
+    """
+    The Recurring Expense Participant Table (T_RecurringExpenseParticipant).
+    Who shares a recurring expense, in split order, with their split value for
+    weighted, percentage and fixed splits.
+    """
+
+    __tablename__ = "recurring_expense_participants"
+
+    recurring_expense_id: Mapped[int] = mapped_column(ForeignKey(RecurringExpense.id), primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, primary_key=True, comment="Order of the participant in the split.")
+    user_id: Mapped[int] = mapped_column(ForeignKey(User.id), nullable=False, index=True)
+    split_value: Mapped[None | Decimal] = mapped_column(
+        Numeric(20, 6), nullable=True, comment="Weight, percentage or fixed amount (NULL for equal splits)."
+    )
+
+
+class RecurringExpenseOccurrence(Base):
+    """
+    The Recurring Expense Occurrence Table (T_RecurringExpenseOccurrence).
+    One row per posted occurrence, written in the same transaction as its batch. Its
+    primary key makes posting idempotent per occurrence: a rerun or a concurrent
+    scheduler cannot post the same occurrence twice.
+    """
+
+    __tablename__ = "recurring_expense_occurrences"
+
+    recurring_expense_id: Mapped[int] = mapped_column(ForeignKey(RecurringExpense.id), primary_key=True)
+    occurrence: Mapped[int] = mapped_column(Integer, primary_key=True, comment="Occurrence number (0 = starts_on).")
+    due_on: Mapped[date] = mapped_column(Date, nullable=False)
+    transaction_batch_id: Mapped[int] = mapped_column(Integer, nullable=False, comment="The batch posted for it.")
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+# --- 8. FX RATES (As-Of Exchange Rates) ---
+
+
+class FxRate(Base):
+    """
+    The FX Rate Table (T_FxRate).
+    Exchange rates by currency pair, each valid from effective_at until the pair's
+    next rate. The primary key doubles as the (pair, effective_at) index that as-of
+    lookups and the in-memory rate table (app.core.fx) are loaded through.
+    """
+
+    __tablename__ = "fx_rates"
+
+    base_currency: Mapped[str] = mapped_column(String(3), primary_key=True, comment="ISO 4217 code, e.g., EUR.")
+    quote_currency: Mapped[str] = mapped_column(String(3), primary_key=True, comment="ISO 4217 code, e.g., USD.")
+    effective_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, comment="When the rate takes effect."
+    )
+    rate: Mapped[Decimal] = mapped_column(
+        Numeric(24, 12), nullable=False, comment="Units of quote_currency per unit of base_currency."
+    )
+
+
+# --- 9. CHANGE FEED (Durable Consumer Cursors) ---
+
+
+class ChangeFeedCursor(Base):
+    """
+    The Change Feed Cursor Table (T_ChangeFeedCursor).
+    How far each named change feed consumer has handled the ledger. TransactionLog IDs
+    only increase, so the highest handled ID is enough to resume after a restart.
+    """
+
+    __tablename__ = "change_feed_cursors"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True, comment="The consumer's unique name.")
+    last_log_id: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, comment="Highest TransactionLog ID the consumer has handled."
+    )
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
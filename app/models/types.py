@@ -0,0 +1,50 @@
+"""
+Custom column types shared by the models.
+"""
+
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import BigInteger, ColumnElement, Dialect, type_coerce
+from sqlalchemy.orm import QueryableAttribute
+from sqlalchemy.sql import operators
+from sqlalchemy.types import TypeDecorator
+
+from app.core.amounts import from_minor_units, to_minor_units
+
+
+class Money(TypeDecorator[Decimal]):
+    """
+    A monetary amount stored as a BIGINT count of minor units (see app.core.amounts)
+    and exposed to Python as an exact Decimal.
+
+    Integer storage keeps SUM() and balance arithmetic exact and cheap on every dialect
+    (SQLite sums DECIMAL columns as floats) and avoids per-row decimal conversions in
+    the drivers. Python values bound against a Money expression (comparisons, `+`,
+    CASE results typed by the column) are amounts and converted at the boundary;
+    sums and differences of Money expressions stay Money.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    class Comparator(TypeDecorator.Comparator[Decimal]):
+        def _adapt_expression(self, op: Any, other_comparator: Any) -> tuple[Any, Any]:
+            # Without this, `balance + delta` would be typed (and returned) as the raw BIGINT.
+            if op in (operators.add, operators.sub):
+                return op, self.type
+            return super()._adapt_expression(op, other_comparator)
+
+    # SQLAlchemy's documented override; 2.1 declares the hook as a memoized property.
+    comparator_factory = Comparator  # type: ignore[assignment]
+
+    def process_bind_param(self, value: Decimal | float | int | None, dialect: Dialect) -> int | None:
+        return None if value is None else to_minor_units(value)
+
+    def process_result_value(self, value: int | Decimal | None, dialect: Dialect) -> Decimal | None:
+        return None if value is None else from_minor_units(value)
+
+
+def minor_units(expression: ColumnElement[Decimal] | QueryableAttribute[Decimal]) -> ColumnElement[int]:
+    """Reads a Money expression as its raw integer minor units, for aggregation in plain Python ints."""
+    return type_coerce(expression, BigInteger)
@@ -1,5 +1,28 @@
 from .acount import AccountRepository
+from .archive import ArchivedTotals, LedgerArchiveRepository
+from .change_feed import ChangeFeedCursorRepository
+from .fx import FxRateRepository
+from .idempotency import IdempotencyRecord, IdempotencyRepository
 from .ledger import LedgerRepository
+from .recurring import DueRecurringExpense, RecurringExpenseRepository
+from .snapshot import BalanceSnapshotRepository
+from .statement_import import StatementImportRepository
+from .status import StatusRepository
 from .user import UserRepository
 
-__all__ = ["AccountRepository", "LedgerRepository", "UserRepository"]
+__all__ = [
+    "AccountRepository",
+    "ArchivedTotals",
+    "BalanceSnapshotRepository",
+    "ChangeFeedCursorRepository",
+    "DueRecurringExpense",
+    "FxRateRepository",
+    "IdempotencyRecord",
+    "IdempotencyRepository",
+    "LedgerArchiveRepository",
+    "LedgerRepository",
+    "RecurringExpenseRepository",
+    "StatementImportRepository",
+    "StatusRepository",
+    "UserRepository",
+]
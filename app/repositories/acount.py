@@ -1,10 +1,81 @@
-from collections.abc import Sequence
+import functools
+import random
+import threading
+import time
+from collections.abc import Iterable, Mapping, Sequence
+from decimal import Decimal
+from weakref import WeakKeyDictionary
 
-from sqlalchemy import select, update
+from sqlalchemy import ColumnElement, Engine, Subquery, case, delete, func, insert, inspect, select, tuple_, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.models.ledger import Account, AccountEntity, AccountSubType, ExpenseCatalog
+from app.config import get_balance_shard_count, get_balance_shard_hot_rate, get_base_currency
+from app.core.amounts import sum_to_decimal, to_decimal, to_minor_units
+from app.core.catalog_tree import CatalogNode, CatalogTree, cache_catalog_tree, get_cached_catalog_tree
+from app.core.hot_entities import HotEntityDetector
+from app.core.ledger import TransactionLogLike, net_balance_deltas
+from app.core.report_cache import balance_report_cache
+from app.db.engine import get_async_engine
+from app.db.events import on_commit
+from app.db.utils import model_table
+from app.models.ledger import (
+    Account,
+    AccountEntity,
+    AccountEntityBalanceShard,
+    AccountSubType,
+    AccountType,
+    ExpenseCatalog,
+    ExpenseCatalogClosure,
+)
+
+
+class _ShardDirectory:
+    """Per-process view of which entities have balance shards (and how many), re-read once a minute."""
+
+    _REFRESH_SECONDS = 60.0
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._shard_counts: dict[int, int] = {}
+        self._loaded_at = float("-inf")
+
+    @property
+    def stale(self) -> bool:
+        return time.monotonic() - self._loaded_at >= self._REFRESH_SECONDS
+
+    def replace(self, shard_counts: dict[int, int]) -> None:
+        with self._lock:
+            self._shard_counts = shard_counts
+            self._loaded_at = time.monotonic()
+
+    def add(self, entity_ids: Iterable[int], shard_count: int) -> None:
+        with self._lock:
+            self._shard_counts.update(dict.fromkeys(entity_ids, shard_count))
+
+    def get(self, entity_id: int) -> int:
+        return self._shard_counts.get(entity_id, 0)
+
+
+# One directory per database per process
+_shard_directories: WeakKeyDictionary[Engine, _ShardDirectory] = WeakKeyDictionary()
+
+
+@functools.cache
+def _hot_entity_detector() -> HotEntityDetector:
+    return HotEntityDetector(get_balance_shard_hot_rate())
+
+
+def _shard_totals() -> Subquery:
+    """Sum of each sharded entity's shards; LEFT JOIN it and add it to current_balance for the full balance."""
+    shard = AccountEntityBalanceShard
+    return (
+        select(shard.account_entity_id, func.sum(shard.balance).label("balance"))
+        .group_by(shard.account_entity_id)
+        .subquery("shard_totals")
+    )
 
 
 class AccountRepository:
@@ -22,6 +93,11 @@ class AccountRepository:
         AccountSubType.SHARED_COST,
     ]
 
+    # Upper bound on entities per CASE-based UPDATE (keeps statements well under bind-parameter limits)
+    _BALANCE_UPDATE_CHUNK_SIZE = 500
+    # Upper bound on entity IDs per IN (...) lookup
+    _ENTITY_CHUNK_SIZE = 500
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -29,15 +105,75 @@ class AccountRepository:
 
     async def get_entity_by_id(self, entity_id: int) -> AccountEntity | None:
         """Retrieves an AccountEntity by its ID."""
-        return await self.session.get(AccountEntity, entity_id)
+        entities = await self._load_entities(AccountEntity.id == entity_id)
+        return entities[0] if entities else None
 
     async def get_user_entities(self, user_id: int) -> Sequence[AccountEntity]:
         """
         Retrieves all AccountEntity records owned by a specific user.
         Used to build a user's personal balance sheet.
         """
-        stmt = select(AccountEntity).where(AccountEntity.owner_id == user_id).order_by(AccountEntity.account_type_id)
-        return (await self.session.scalars(stmt)).all()
+        return await self._load_entities(AccountEntity.owner_id == user_id)
+
+    async def _load_entities(self, *criteria: ColumnElement[bool]) -> Sequence[AccountEntity]:
+        """
+        Loads the entities matching `criteria`, ordered by account type, with current_balance
+        including their balance shards, if any, so callers see one balance whether or not
+        the entity is sharded.
+        """
+        stmt = select(AccountEntity).where(*criteria).order_by(AccountEntity.account_type_id)
+        entities = (await self.session.scalars(stmt.execution_options(populate_existing=True))).all()
+        if entities:
+            shard = AccountEntityBalanceShard
+            totals = (
+                select(shard.account_entity_id, func.sum(shard.balance))
+                .where(shard.account_entity_id.in_([entity.id for entity in entities]))
+                .group_by(shard.account_entity_id)
+            )
+            shard_balances = {
+                entity_id: sum_to_decimal(total) for entity_id, total in await self.session.execute(totals)
+            }
+            for entity in entities:
+                if entity.id in shard_balances:
+                    balance = to_decimal(entity.current_balance) + shard_balances[entity.id]
+                    set_committed_value(entity, "current_balance", balance)
+        return entities
+
+    async def sample_entity_ids(self, count: int) -> list[int]:
+        """
+        Returns up to `count` random AccountEntity IDs without scanning the table:
+        IDs are probed uniformly over [min(id), max(id)], so gaps yield fewer hits.
+        """
+        # An empty table yields the empty range [0, -1].
+        bounds = select(func.coalesce(func.min(AccountEntity.id), 0), func.coalesce(func.max(AccountEntity.id), -1))
+        min_id, max_id = (await self.session.execute(bounds)).one()
+        if max_id < min_id:
+            return []
+        probes = random.sample(range(min_id, max_id + 1), min(count, max_id - min_id + 1))
+        stmt = select(AccountEntity.id).where(AccountEntity.id.in_(probes))
+        return list((await self.session.scalars(stmt)).all())
+
+    async def get_entity_dimensions(self, entity_ids: Iterable[int]) -> list[tuple[int, int, AccountType]]:
+        """Returns (entity ID, owner ID, account type) for each of the given entities that exists."""
+        stmt = (
+            select(AccountEntity.id, AccountEntity.owner_id, Account.account_type)
+            .join(Account, Account.id == AccountEntity.account_type_id)
+            .where(AccountEntity.id.in_(list(entity_ids)))
+        )
+        return [
+            (entity_id, owner_id, AccountType(account_type))
+            for entity_id, owner_id, account_type in await self.session.execute(stmt)
+        ]
+
+    async def get_entity_currencies(self, entity_ids: Iterable[int]) -> dict[int, str | None]:
+        """Returns the currency (None: the base currency) of each of the given entities that exists."""
+        entity_ids = list(entity_ids)
+        currencies: dict[int, str | None] = {}
+        for start in range(0, len(entity_ids), self._ENTITY_CHUNK_SIZE):
+            chunk = entity_ids[start : start + self._ENTITY_CHUNK_SIZE]
+            stmt = select(AccountEntity.id, AccountEntity.currency).where(AccountEntity.id.in_(chunk))
+            currencies.update((await self.session.execute(stmt)).tuples().all())
+        return currencies
 
     async def create_initial_entities(self, user_id: int) -> None:
         """
@@ -63,6 +199,31 @@ class AccountRepository:
         # 3. Add to Session (Relies on caller's transaction boundary)
         self.session.add_all(entities_to_create)
         await self.session.flush()
+        on_commit(self.session, lambda: balance_report_cache.users_changed([user_id]))
+
+    async def get_or_create_user_entities(self, user_ids: Iterable[int], sub_type: AccountSubType) -> dict[int, int]:
+        """
+        Maps each user to their AccountEntity ID of the given sub-type, creating the
+        entities that do not exist yet (e.g., SETTLEMENT, which is not part of the
+        initial set). Relies on the caller's transaction boundary.
+        """
+        user_ids = set(user_ids)
+        account = await self.get_account_by_sub_type(sub_type)
+        stmt = select(AccountEntity.owner_id, AccountEntity.id).where(
+            AccountEntity.owner_id.in_(user_ids), AccountEntity.account_type_id == account.id
+        )
+        entity_ids: dict[int, int] = dict((await self.session.execute(stmt)).tuples().all())
+
+        missing = [
+            AccountEntity(owner_id=user_id, account_type_id=account.id, current_balance=0)
+            for user_id in sorted(user_ids - entity_ids.keys())
+        ]
+        if missing:
+            self.session.add_all(missing)
+            on_commit(self.session, lambda: balance_report_cache.users_changed(e.owner_id for e in missing))
+            await self.session.flush()
+            entity_ids.update({entity.owner_id: entity.id for entity in missing})
+        return entity_ids
 
     async def _fetch_account_ids_by_sub_types(self, sub_types: list[AccountSubType]) -> dict[AccountSubType, int]:
         """
@@ -77,7 +238,7 @@ class AccountRepository:
         # Map the results back from (id, 'sub_type_string') to {AccountSubType.ENUM: id}
         return {AccountSubType(sub_type_str): id for id, sub_type_str in result.all()}
 
-    async def update_balance_cache(self, entity_id: int, amount_delta: float) -> AccountEntity:
+    async def update_balance_cache(self, entity_id: int, amount_delta: Decimal) -> AccountEntity:
         """
         CRITICAL: Atomically updates the current_balance cache for a specific AccountEntity.
         This must be called immediately after a TransactionLog batch is successfully committed.
@@ -89,21 +250,260 @@ class AccountRepository:
         Raises:
             NoResultFound: If the entity ID does not exist.
         """
-        # SQLAlchemy 2.0 style UPDATE statement for efficiency and atomicity
-        stmt = (
-            update(AccountEntity)
-            .where(AccountEntity.id == entity_id)
-            .values(current_balance=AccountEntity.current_balance + amount_delta)
-            .returning(AccountEntity)  # Return the updated object
+        # Goes through the shared path so hot entities update one of their shards instead of the row.
+        await self._update_balances({entity_id: to_decimal(amount_delta)}, relative=True)
+        updated_entity = await self.get_entity_by_id(entity_id)
+        if not updated_entity:
+            raise NoResultFound(f"AccountEntity with ID {entity_id} not found for balance update.")
+        return updated_entity
+
+    async def apply_log_deltas(self, logs: Iterable[TransactionLogLike]) -> dict[int, Decimal]:
+        """
+        CRITICAL: Nets the balance impact of one or many posted batches per AccountEntity
+        and applies it with apply_balance_deltas().
+        Must be called in the same transaction that records the logs.
+
+        Returns:
+            The netted delta applied to each entity.
+        """
+        deltas = net_balance_deltas(logs)
+        await self.apply_balance_deltas(deltas)
+        return deltas
+
+    async def apply_balance_deltas(self, deltas: Mapping[int, Decimal]) -> None:
+        """
+        CRITICAL: Atomically applies pre-netted balance changes to many AccountEntity rows
+        with a single `UPDATE ... SET current_balance = current_balance + CASE id ... END`
+        per chunk of entities, instead of one UPDATE per entity per log.
+
+        Entities are updated in ascending ID order so concurrent postings lock rows in a
+        consistent order. Like update_balance_cache(), this relies on the caller's
+        transaction: the balances commit or roll back together with the logs.
+
+        With DIVVY_BALANCE_SHARDS set, entities updated often enough are promoted to
+        sharded counters, and from then on each posting adds its delta to one random
+        shard (see AccountEntityBalanceShard) instead of the entity's row.
+
+        Args:
+            deltas: Mapping of AccountEntity ID to the change in balance.
+
+        Raises:
+            NoResultFound: If any of the entity IDs does not exist.
+        """
+        await self._update_balances({entity_id: delta for entity_id, delta in deltas.items() if delta}, relative=True)
+
+    async def set_balances(self, balances: Mapping[int, Decimal]) -> None:
+        """
+        Overwrites the current_balance cache of many AccountEntity rows with absolute values
+        (e.g., balances recomputed from the ledger), one CASE-based UPDATE per chunk. The
+        shards of sharded entities are reset to zero.
+
+        Raises:
+            NoResultFound: If any of the entity IDs does not exist.
+        """
+        await self._update_balances(balances, relative=False)
+
+    async def _update_balances(self, values: Mapping[int, Decimal], relative: bool) -> None:
+        """
+        Writes `values` (added to the cache if `relative`, replacing it otherwise) in ascending ID order.
+        Shard rows are always written before entity rows, so concurrent postings lock in one order.
+        """
+        entity_ids = sorted(values)
+        if relative:
+            applied = await self._update_shards({entity_id: values[entity_id] for entity_id in entity_ids})
+            row_ids = [entity_id for entity_id in entity_ids if entity_id not in applied]
+        else:
+            await self._reset_shards(entity_ids)
+            row_ids = entity_ids
+
+        for start in range(0, len(row_ids), self._BALANCE_UPDATE_CHUNK_SIZE):
+            chunk = row_ids[start : start + self._BALANCE_UPDATE_CHUNK_SIZE]
+            # Minor units: the CASE is BIGINT, so the values are bound as integers, not converted by Money.
+            new_balance = case(
+                {entity_id: to_minor_units(values[entity_id]) for entity_id in chunk}, value=AccountEntity.id
+            )
+            if relative:
+                new_balance = AccountEntity.current_balance + new_balance
+            stmt = (
+                update(AccountEntity)
+                .where(AccountEntity.id.in_(chunk))
+                .values(current_balance=new_balance)
+                .returning(AccountEntity)  # Refreshes entities already loaded in the session
+                .execution_options(populate_existing=True)
+            )
+
+            updated_entities = (await self.session.scalars(stmt)).all()
+            if len(updated_entities) != len(chunk):
+                raise NoResultFound(f"One or more AccountEntity IDs in {chunk} not found for balance update.")
+
+        if entity_ids:
+            on_commit(self.session, lambda: balance_report_cache.entities_changed(entity_ids))
+
+    # --- Sharded Balance Counters ---
+
+    async def _update_shards(self, deltas: Mapping[int, Decimal]) -> set[int]:
+        """
+        Adds each sharded entity's delta to one of its shards, chosen at random, promoting
+        entities that just became hot first.
+
+        Returns:
+            The entities whose delta was applied to a shard; the rest must update their row.
+        """
+        shard_counts = await self._get_shard_counts(deltas)
+        targets = sorted((entity_id, random.randrange(count)) for entity_id, count in shard_counts.items())
+        shard = AccountEntityBalanceShard
+        applied: set[int] = set()
+
+        for start in range(0, len(targets), self._BALANCE_UPDATE_CHUNK_SIZE):
+            chunk = targets[start : start + self._BALANCE_UPDATE_CHUNK_SIZE]
+            delta = case(
+                {entity_id: to_minor_units(deltas[entity_id]) for entity_id, _ in chunk}, value=shard.account_entity_id
+            )
+            stmt = (
+                update(shard)
+                .where(tuple_(shard.account_entity_id, shard.shard).in_(chunk))
+                .values(balance=shard.balance + delta)
+                .returning(shard.account_entity_id)
+                .execution_options(synchronize_session=False)
+            )
+            applied.update((await self.session.scalars(stmt)).all())
+
+        # Entities already loaded in the session keep showing their full balance.
+        mapper = inspect(AccountEntity)
+        for entity_id in applied:
+            entity = self.session.identity_map.get(mapper.identity_key_from_primary_key((entity_id,)))
+            if entity is not None:
+                balance = to_decimal(entity.current_balance) + deltas[entity_id]
+                set_committed_value(entity, "current_balance", balance)
+        return applied
+
+    async def _get_shard_counts(self, deltas: Mapping[int, Decimal]) -> dict[int, int]:
+        """Maps the entities among `deltas` that are (or have just been made) sharded to their shard count."""
+        shard_count = get_balance_shard_count()
+        if shard_count <= 0:
+            return {}
+
+        engine = get_async_engine(self.session).sync_engine
+        if engine not in _shard_directories:
+            _shard_directories[engine] = _ShardDirectory()
+        directory = _shard_directories[engine]
+        if directory.stale:
+            shard = AccountEntityBalanceShard
+            stmt = select(shard.account_entity_id, func.count()).group_by(shard.account_entity_id)
+            directory.replace(dict((await self.session.execute(stmt)).tuples().all()))
+
+        hot = [entity_id for entity_id in _hot_entity_detector().record(deltas) if not directory.get(entity_id)]
+        if hot:
+            await self._create_shards(hot, shard_count)
+            on_commit(self.session, lambda: directory.add(hot, shard_count))
+
+        shard_counts = {entity_id: directory.get(entity_id) for entity_id in deltas if directory.get(entity_id)}
+        shard_counts.update(dict.fromkeys(hot, shard_count))
+        return shard_counts
+
+    async def _create_shards(self, entity_ids: list[int], shard_count: int) -> None:
+        """Adds `shard_count` zero-balance shards to each entity, skipping shards that already exist."""
+        table = model_table(AccountEntityBalanceShard)
+        rows = [
+            {"account_entity_id": entity_id, "shard": shard, "balance": 0}
+            for entity_id in sorted(entity_ids)
+            for shard in range(shard_count)
+        ]
+        conn = await self.session.connection()
+        dialect = conn.dialect.name
+
+        if dialect in ("postgresql", "sqlite"):
+            stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table).on_conflict_do_nothing()
+        elif dialect == "mysql":
+            stmt = mysql.insert(table).prefix_with("IGNORE")
+        else:
+            existing = select(table.c.account_entity_id, table.c.shard).where(table.c.account_entity_id.in_(entity_ids))
+            taken = set((await conn.execute(existing)).tuples().all())
+            rows = [row for row in rows if (row["account_entity_id"], row["shard"]) not in taken]
+            if not rows:
+                return
+            stmt = insert(table)
+        await conn.execute(stmt, rows)
+
+    async def _reset_shards(self, entity_ids: Sequence[int]) -> None:
+        """Zeroes the shards of the given entities (before their rows are overwritten with full balances)."""
+        shard = AccountEntityBalanceShard
+        for start in range(0, len(entity_ids), self._BALANCE_UPDATE_CHUNK_SIZE):
+            chunk = entity_ids[start : start + self._BALANCE_UPDATE_CHUNK_SIZE]
+            await self.session.execute(
+                update(shard)
+                .where(shard.account_entity_id.in_(chunk), shard.balance != 0)
+                .values(balance=0)
+                .execution_options(synchronize_session=False)
+            )
+
+    # --- Reporting ---
+
+    async def get_all_balances(self) -> list[tuple[int, Decimal]]:
+        """Returns (entity ID, cached balance including shards) for every AccountEntity."""
+        shards = _shard_totals()
+        stmt = select(AccountEntity.id, AccountEntity.current_balance + func.coalesce(shards.c.balance, 0)).outerjoin(
+            shards, shards.c.account_entity_id == AccountEntity.id
         )
+        return [(entity_id, sum_to_decimal(balance)) for entity_id, balance in await self.session.execute(stmt)]
 
-        result = await self.session.execute(stmt)
-        updated_entity = result.scalar_one_or_none()
+    async def get_user_balances_by_account(self, user_id: int) -> list[tuple[int, Account, str, Decimal]]:
+        """
+        Returns (entity ID, account, currency, cached balance) for every entity of the user,
+        with the Account loaded by the same joined query (no per-entity lazy loads).
+        Balances are Debits - Credits, in the entity's currency (the base one if it has none).
+        """
+        shards = _shard_totals()
+        stmt = (
+            select(
+                AccountEntity.id,
+                Account,
+                func.coalesce(AccountEntity.currency, get_base_currency()),
+                AccountEntity.current_balance + func.coalesce(shards.c.balance, 0),
+            )
+            .join(Account, Account.id == AccountEntity.account_type_id)
+            .outerjoin(shards, shards.c.account_entity_id == AccountEntity.id)
+            .where(AccountEntity.owner_id == user_id)
+            .order_by(Account.id, AccountEntity.id)
+        )
+        return [
+            (entity_id, account, currency, sum_to_decimal(balance))
+            for entity_id, account, currency, balance in await self.session.execute(stmt)
+        ]
 
-        if not updated_entity:
-            raise NoResultFound(f"AccountEntity with ID {entity_id} not found for balance update.")
+    async def get_trial_balance_totals(self) -> list[tuple[Account, str, Decimal, Decimal]]:
+        """
+        Returns (account, currency, debit total, credit total) per Account and currency over
+        all entities, in one joined GROUP BY: entities with a positive balance (Debits -
+        Credits) add to the debit column, negative ones to the credit column. Entities
+        without a currency count in the base currency; currencies are never added together.
 
-        return updated_entity
+        Always reads the primary: the result is cached (app.services.reporting) and a lagging
+        replica would keep serving balances from before the postings that invalidated it.
+        """
+        shards = _shard_totals()
+        balance = AccountEntity.current_balance + func.coalesce(shards.c.balance, 0)
+        totals = (
+            select(
+                AccountEntity.account_type_id.label("account_id"),
+                AccountEntity.currency,
+                func.sum(case((balance > 0, balance), else_=0)).label("debit_total"),
+                func.sum(case((balance < 0, -balance), else_=0)).label("credit_total"),
+            )
+            .outerjoin(shards, shards.c.account_entity_id == AccountEntity.id)
+            .group_by(AccountEntity.account_type_id, AccountEntity.currency)
+            .subquery()
+        )
+        currency = func.coalesce(totals.c.currency, get_base_currency())
+        stmt = (
+            select(Account, currency, totals.c.debit_total, totals.c.credit_total)
+            .join(totals, totals.c.account_id == Account.id)
+            .order_by(Account.id, currency)
+        )
+        return [
+            (account, currency, sum_to_decimal(debit_total), sum_to_decimal(credit_total))
+            for account, currency, debit_total, credit_total in await self.session.execute(stmt)
+        ]
 
     # --- 2. Account (Configuration) Methods ---
 
@@ -125,3 +525,43 @@ class AccountRepository:
         """Retrieves an ExpenseCatalog by name."""
         stmt = select(ExpenseCatalog).where(ExpenseCatalog.catalog_name == name)
         return (await self.session.scalars(stmt)).one_or_none()
+
+    async def get_expense_catalog_tree(self) -> CatalogTree:
+        """
+        Returns the whole catalog hierarchy from the process-wide cache, loading it with
+        one query on first use or after a catalog change committed.
+        """
+        tree, generation = get_cached_catalog_tree()
+        if tree is None:
+            stmt = select(ExpenseCatalog.id, ExpenseCatalog.catalog_name, ExpenseCatalog.parent_id)
+            tree = CatalogTree(CatalogNode(*row) for row in await self.session.execute(stmt))
+            cache_catalog_tree(tree, generation)
+        return tree
+
+    async def rebuild_expense_catalog_closure(self) -> int:
+        """
+        Recomputes expense_catalog_closure from the parent_id links, e.g., after catalogs
+        were written with Core statements that bypass the maintenance listeners.
+        Relies on the caller's transaction boundary.
+
+        Returns:
+            The number of closure rows written.
+        """
+        stmt = select(ExpenseCatalog.id, ExpenseCatalog.catalog_name, ExpenseCatalog.parent_id)
+        tree = CatalogTree(CatalogNode(*row) for row in await self.session.execute(stmt))
+        rows: list[dict[str, int]] = []
+        for catalog_id in (node_id for root in tree.roots for node_id in tree.descendant_ids(root.id)):
+            ancestor_depth = tree.depth(catalog_id)
+            rows.extend(
+                {
+                    "ancestor_id": catalog_id,
+                    "descendant_id": descendant_id,
+                    "depth": tree.depth(descendant_id) - ancestor_depth,
+                }
+                for descendant_id in tree.descendant_ids(catalog_id)
+            )
+
+        await self.session.execute(delete(ExpenseCatalogClosure))
+        if rows:
+            await self.session.execute(insert(ExpenseCatalogClosure), rows)
+        return len(rows)
@@ -0,0 +1,180 @@
+from collections.abc import AsyncIterator, Iterable, Mapping, Sequence
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, NamedTuple
+
+from sqlalchemy import delete, func, insert, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.amounts import sum_to_decimal, to_decimal
+from app.core.datetime import utc
+from app.db.utils import model_table
+from app.models.ledger import (
+    Account,
+    AccountEntity,
+    AccountSubType,
+    OpeningBalance,
+    TransactionLog,
+    transaction_log_archive,
+)
+
+# Sub-types that hold debts between users; a user with any of them outstanding is not settled.
+_DEBT_SUB_TYPES = (AccountSubType.AR, AccountSubType.AP, AccountSubType.UR)
+
+
+class ArchivedTotals(NamedTuple):
+    """What one archival chunk moved for one entity."""
+
+    balance: Decimal
+    log_count: int
+    last_log_id: int
+    last_transaction_batch_id: int
+
+
+class LedgerArchiveRepository:
+    """
+    Manages cold storage of settled ledger history: moves TransactionLogs into
+    transaction_log_archive and keeps the per-entity OpeningBalance summaries that
+    stand in for them. Reads only the main transaction_logs table.
+    """
+
+    # Upper bound on entity IDs per IN (...) lookup
+    _ENTITY_CHUNK_SIZE = 500
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    # --- 1. PLANNING ---
+
+    async def get_unsettled_user_ids(self, cutoff: datetime) -> set[int]:
+        """Users with a non-zero AR, AP or UR balance as of `cutoff` (opening balance + logs before it)."""
+        logs = TransactionLog
+        amounts = union_all(
+            select(logs.debit_account_entity_id.label("entity_id"), logs.amount.label("amount")).where(
+                logs.created_at < cutoff
+            ),
+            select(logs.credit_account_entity_id.label("entity_id"), (-logs.amount).label("amount")).where(
+                logs.created_at < cutoff
+            ),
+            select(OpeningBalance.account_entity_id.label("entity_id"), OpeningBalance.balance.label("amount")),
+        ).subquery()
+        stmt = (
+            select(AccountEntity.owner_id, func.sum(amounts.c.amount))
+            .join(AccountEntity, AccountEntity.id == amounts.c.entity_id)
+            .join(Account, Account.id == AccountEntity.account_type_id)
+            .where(Account.sub_type.in_([sub_type.value for sub_type in _DEBT_SUB_TYPES]))
+            .group_by(AccountEntity.owner_id, amounts.c.entity_id)
+        )
+        return {owner_id for owner_id, total in await self.session.execute(stmt) if sum_to_decimal(total) != 0}
+
+    async def stream_batch_owners(
+        self, cutoff: datetime, max_log_id: int | None, yield_per: int = 10_000
+    ) -> AsyncIterator[Sequence[Sequence[Any]]]:
+        """
+        Yields (batch ID, debit owner, credit owner, pinned) for every log created before
+        `cutoff`, in chunks, ordered by batch. `pinned` marks logs past `max_log_id` that
+        must stay hot.
+        """
+        debit = aliased(AccountEntity)
+        credit = aliased(AccountEntity)
+        logs = TransactionLog
+        pinned = logs.id > max_log_id if max_log_id is not None else literal(False)
+        stmt = (
+            select(logs.transaction_batch_id, debit.owner_id, credit.owner_id, pinned)
+            .join(debit, debit.id == logs.debit_account_entity_id)
+            .join(credit, credit.id == logs.credit_account_entity_id)
+            .where(logs.created_at < cutoff)
+            .order_by(logs.transaction_batch_id)
+            .execution_options(yield_per=yield_per)
+        )
+        async for partition in (await self.session.stream(stmt)).partitions():
+            yield partition
+
+    # --- 2. MOVING ---
+
+    async def get_log_chunk(
+        self, cutoff: datetime, after_id: int, limit: int
+    ) -> Sequence[tuple[int, int, int, int, Decimal, int]]:
+        """
+        Returns (log ID, batch ID, debit entity, credit entity, amount, debit owner) for
+        the next `limit` logs created before `cutoff` with id > after_id, in ID order.
+        """
+        logs = TransactionLog
+        stmt = (
+            select(
+                logs.id,
+                logs.transaction_batch_id,
+                logs.debit_account_entity_id,
+                logs.credit_account_entity_id,
+                logs.amount,
+                AccountEntity.owner_id,
+            )
+            .join(AccountEntity, AccountEntity.id == logs.debit_account_entity_id)
+            .where(logs.created_at < cutoff, logs.id > after_id)
+            .order_by(logs.id)
+            .limit(limit)
+        )
+        return (await self.session.execute(stmt)).tuples().all()
+
+    async def move_logs(self, log_ids: Sequence[int]) -> None:
+        """Copies the logs into transaction_log_archive and deletes them from transaction_logs."""
+        source = model_table(TransactionLog)
+        columns = [column.name for column in transaction_log_archive.columns]
+        for start in range(0, len(log_ids), self._ENTITY_CHUNK_SIZE):
+            chunk = log_ids[start : start + self._ENTITY_CHUNK_SIZE]
+            await self.session.execute(
+                insert(transaction_log_archive).from_select(
+                    columns, select(*(source.c[name] for name in columns)).where(source.c.id.in_(chunk))
+                )
+            )
+            await self.session.execute(delete(source).where(source.c.id.in_(chunk)))
+
+    async def add_opening_balances(self, totals: Mapping[int, ArchivedTotals], archived_until: datetime) -> None:
+        """Adds one chunk's archived totals to the entities' opening balances. Single writer only."""
+        entity_ids = list(totals)
+        for start in range(0, len(entity_ids), self._ENTITY_CHUNK_SIZE):
+            chunk = entity_ids[start : start + self._ENTITY_CHUNK_SIZE]
+            stmt = select(OpeningBalance).where(OpeningBalance.account_entity_id.in_(chunk))
+            existing = {row.account_entity_id: row for row in (await self.session.scalars(stmt)).all()}
+            for entity_id in chunk:
+                added = totals[entity_id]
+                row = existing.get(entity_id)
+                if row is None:
+                    self.session.add(
+                        OpeningBalance(
+                            account_entity_id=entity_id,
+                            balance=added.balance,
+                            log_count=added.log_count,
+                            last_log_id=added.last_log_id,
+                            last_transaction_batch_id=added.last_transaction_batch_id,
+                            archived_until=archived_until,
+                        )
+                    )
+                    continue
+                row.balance = to_decimal(row.balance) + added.balance
+                row.log_count += added.log_count
+                row.last_log_id = max(row.last_log_id, added.last_log_id)
+                row.last_transaction_batch_id = max(row.last_transaction_batch_id, added.last_transaction_batch_id)
+                row.archived_until = max(utc(row.archived_until), utc(archived_until))
+        await self.session.flush()
+
+    # --- 3. LOOKUPS ---
+
+    async def get_opening_balance(self, entity_id: int) -> OpeningBalance | None:
+        """Retrieves the entity's opening balance, if any of its logs were archived."""
+        return await self.session.get(OpeningBalance, entity_id)
+
+    async def get_opening_balances(self, entity_ids: Iterable[int] | None = None) -> dict[int, Decimal]:
+        """Maps each entity with archived logs (optionally only among `entity_ids`) to its opening balance."""
+        stmt = select(OpeningBalance.account_entity_id, OpeningBalance.balance)
+        if entity_ids is None:
+            return {entity_id: to_decimal(balance) for entity_id, balance in await self.session.execute(stmt)}
+
+        balances: dict[int, Decimal] = {}
+        entity_ids = list(entity_ids)
+        for start in range(0, len(entity_ids), self._ENTITY_CHUNK_SIZE):
+            chunk = entity_ids[start : start + self._ENTITY_CHUNK_SIZE]
+            rows = await self.session.execute(stmt.where(OpeningBalance.account_entity_id.in_(chunk)))
+            balances.update({entity_id: to_decimal(balance) for entity_id, balance in rows})
+        return balances
@@ -0,0 +1,29 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.datetime import utc_now
+from app.models.ledger import ChangeFeedCursor
+
+
+class ChangeFeedCursorRepository:
+    """
+    Manages the durable cursors of change feed consumers. Relies on the caller's
+    transaction boundary: a consumer's side effects and its cursor must commit together.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_cursor(self, name: str) -> int:
+        """Returns the highest TransactionLog ID the consumer has handled (0 if it never ran)."""
+        cursor = await self.session.get(ChangeFeedCursor, name)
+        return cursor.last_log_id if cursor else 0
+
+    async def save_cursor(self, name: str, last_log_id: int) -> None:
+        """Moves the consumer's cursor forward to `last_log_id` (never back), creating it on first use."""
+        cursor = await self.session.get(ChangeFeedCursor, name, with_for_update=True)
+        if cursor is None:
+            self.session.add(ChangeFeedCursor(name=name, last_log_id=last_log_id, updated_at=utc_now()))
+        elif last_log_id > cursor.last_log_id:
+            cursor.last_log_id = last_log_id
+            cursor.updated_at = utc_now()
+        await self.session.flush()
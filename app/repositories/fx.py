@@ -0,0 +1,73 @@
+from collections.abc import Iterable
+from itertools import batched
+from typing import Any
+
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_base_currency
+from app.core.fx import FxQuote, FxRates, cache_fx_rates, get_cached_fx_rates, invalidate_fx_rates
+from app.db.events import on_commit
+from app.db.utils import model_table
+from app.models.ledger import FxRate
+
+
+class FxRateRepository:
+    """
+    Manages exchange rates. Lookups are served from the process-wide FxRates cache;
+    the fx_rates table is the source of truth.
+    """
+
+    # Upper bound on rates written per statement
+    _WRITE_CHUNK_SIZE = 1000
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_rates(self) -> FxRates:
+        """
+        Returns every loaded rate from the process-wide cache, loading them with one query
+        (in (pair, effective_at) index order) on first use or after rates were loaded.
+        """
+        rates, generation = get_cached_fx_rates()
+        if rates is None:
+            stmt = select(FxRate.base_currency, FxRate.quote_currency, FxRate.effective_at, FxRate.rate).order_by(
+                FxRate.base_currency, FxRate.quote_currency, FxRate.effective_at
+            )
+            rates = FxRates((FxQuote(*row) for row in await self.session.execute(stmt)), get_base_currency())
+            cache_fx_rates(rates, generation)
+        return rates
+
+    async def add_rates(self, quotes: Iterable[FxQuote]) -> int:
+        """
+        Writes the rates in the caller's transaction, replacing the rate of a pair that
+        already has one at the same effective_at. The cache is dropped once it commits.
+
+        Returns:
+            The number of rates written.
+        """
+        written = 0
+        for chunk in batched(quotes, self._WRITE_CHUNK_SIZE, strict=False):
+            await self._upsert([quote._asdict() for quote in chunk])
+            written += len(chunk)
+        on_commit(self.session, invalidate_fx_rates)
+        return written
+
+    async def _upsert(self, rows: list[dict[str, Any]]) -> None:
+        table = model_table(FxRate)
+        conn = await self.session.connection()
+        dialect = conn.dialect.name
+
+        if dialect in ("postgresql", "sqlite"):
+            stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+            stmt = stmt.on_conflict_do_update(index_elements=list(table.primary_key), set_={"rate": stmt.excluded.rate})
+        elif dialect == "mysql":
+            stmt = mysql.insert(table)
+            stmt = stmt.on_duplicate_key_update({"rate": stmt.inserted.rate})
+        else:
+            # Portable fallback: replace the existing rows, then insert all.
+            keys = [(row["base_currency"], row["quote_currency"], row["effective_at"]) for row in rows]
+            await conn.execute(delete(table).where(tuple_(*table.primary_key).in_(keys)))
+            stmt = insert(table)
+        await conn.execute(stmt, rows)
@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import NamedTuple
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Engine, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_idempotency_cache_size
+from app.core.datetime import utc, utc_now
+from app.db.engine import get_async_engine
+from app.db.events import on_commit
+from app.models.ledger import IdempotencyKey
+
+
+class IdempotencyRecord(NamedTuple):
+    """The batch an idempotency key produced, and what it was produced from."""
+
+    transaction_batch_id: int
+    fingerprint: str
+    expires_at: datetime
+
+
+class _RecentKeys:
+    """Thread-safe LRU of committed idempotency keys (keys are immutable once committed)."""
+
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._records: OrderedDict[str, IdempotencyRecord] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> IdempotencyRecord | None:
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None:
+                self._records.move_to_end(key)
+            return record
+
+    def put(self, key: str, record: IdempotencyRecord) -> None:
+        if self._capacity <= 0:
+            return
+        with self._lock:
+            self._records[key] = record
+            self._records.move_to_end(key)
+            while len(self._records) > self._capacity:
+                self._records.popitem(last=False)
+
+
+# One cache per database per process
+_recent_keys: WeakKeyDictionary[Engine, _RecentKeys] = WeakKeyDictionary()
+
+
+class IdempotencyRepository:
+    """
+    Manages client-supplied idempotency keys for posting. Hot keys are served from a
+    per-process LRU; the idempotency_keys table is the source of truth.
+    """
+
+    # Upper bound on keys deleted per statement when sweeping
+    _SWEEP_CHUNK_SIZE = 1000
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        engine = get_async_engine(session).sync_engine
+        if engine not in _recent_keys:
+            _recent_keys[engine] = _RecentKeys(get_idempotency_cache_size())
+        self._cache = _recent_keys[engine]
+
+    async def get(self, key: str, now: datetime | None = None) -> IdempotencyRecord | None:
+        """Returns the key's record, or None if the key is unknown or expired."""
+        now = utc(now or utc_now())
+        record = self._cache.get(key)
+        if record is None:
+            stmt = select(IdempotencyKey.transaction_batch_id, IdempotencyKey.fingerprint, IdempotencyKey.expires_at)
+            row = (await self.session.execute(stmt.where(IdempotencyKey.key == key))).one_or_none()
+            if row is None:
+                return None
+            record = IdempotencyRecord(row.transaction_batch_id, row.fingerprint, utc(row.expires_at))
+            self._cache.put(key, record)
+        return record if record.expires_at > now else None
+
+    async def add(self, key: str, batch_id: int, fingerprint: str, ttl: timedelta) -> IdempotencyRecord:
+        """
+        Inserts the key in the caller's transaction; it is cached once that commits. An
+        expired row for the key that has not been swept yet is replaced.
+
+        Raises:
+            IntegrityError: If the key already exists and has not expired (possibly inserted
+                            by a concurrent transaction that committed first).
+        """
+        now = utc_now()
+        record = IdempotencyRecord(batch_id, fingerprint, now + ttl)
+        await self.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+        )
+        await self.session.execute(
+            insert(IdempotencyKey).values(
+                key=key, transaction_batch_id=batch_id, fingerprint=fingerprint, created_at=now, expires_at=now + ttl
+            )
+        )
+        on_commit(self.session, lambda: self._cache.put(key, record))
+        return record
+
+    async def delete_expired(self, now: datetime | None = None) -> int:
+        """
+        Deletes every key that expired before `now`, in chunks of primary keys read
+        through the expires_at index. Relies on the caller's transaction boundary.
+
+        Returns:
+            The number of keys deleted.
+        """
+        now = utc(now or utc_now())
+        deleted = 0
+        while True:
+            stmt = select(IdempotencyKey.key).where(IdempotencyKey.expires_at < now).limit(self._SWEEP_CHUNK_SIZE)
+            keys = (await self.session.scalars(stmt)).all()
+            if keys:
+                await self.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(keys)))
+                deleted += len(keys)
+            if len(keys) < self._SWEEP_CHUNK_SIZE:
+                return deleted
@@ -1,9 +1,50 @@
-from collections.abc import Sequence
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
 
-from sqlalchemy import func, or_, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import ColumnElement, Select, case, func, insert, literal, or_, select, union_all
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.orm import QueryableAttribute
 
-from app.models.ledger import TransactionLog
+from app.config import get_base_currency
+from app.core.amounts import sum_to_decimal, to_decimal, to_minor_units
+from app.core.change_feed import LedgerChange, ledger_change_feed
+from app.core.datetime import utc_now
+from app.core.ledger import TransactionLogLike, check_currencies, log_value
+from app.db.events import on_commit
+from app.db.partitioning import log_source
+from app.db.sequences import get_batch_id_allocator
+from app.db.session import read_only
+from app.db.utils import model_table
+from app.exceptions import BusinessRuleError
+from app.models.ledger import (
+    Account,
+    AccountEntity,
+    AccountEntityBalanceShard,
+    AccountType,
+    ExpenseCatalog,
+    ExpenseCatalogClosure,
+    OpeningBalance,
+    TransactionLog,
+)
+from app.repositories.acount import AccountRepository
+from app.repositories.status import StatusRepository
+
+# Columns written by the bulk posting path (id is generated by the database).
+_BULK_COLUMNS = (
+    "transaction_batch_id",
+    "debit_account_entity_id",
+    "credit_account_entity_id",
+    "amount",
+    "currency",
+    "counterparty_entity_id",
+    "expense_catalog_id",
+    "narrative",
+    "created_at",
+    "created_by",
+)
 
 
 class LedgerRepository:
@@ -19,18 +60,18 @@ class LedgerRepository:
 
     async def get_next_batch_id(self) -> int:
         """
-        Retrieves the next available transaction_batch_id by finding the maximum
-        existing ID and incrementing it.
+        Allocates the next transaction_batch_id from the process-wide block allocator.
+        IDs are unique across concurrent sessions and worker processes, and increase
+        within a process, but are not gap-free (see app.db.sequences).
         This is critical for enforcing atomic batches across all logs.
         """
-        stmt = select(func.max(TransactionLog.transaction_batch_id))
-        max_id = await self.session.scalar(stmt)
-        return (max_id or 0) + 1
+        return await get_batch_id_allocator(self.session).next_id(self.session)
 
     async def record_batch(self, logs: list[TransactionLog]) -> int:
         """
         CORE METHOD: Records a list of TransactionLog records atomically under a
-        single new batch ID.
+        single new batch ID, and folds them into the derived status tables. The batch
+        is published to the ledger change feed once the transaction commits.
 
         Args:
             logs: A list of pre-validated TransactionLog objects (Debit = Credit check
@@ -38,7 +79,12 @@ class LedgerRepository:
 
         Returns:
             The transaction_batch_id under which the logs were recorded.
+
+        Raises:
+            BusinessRuleError: If a log's currency differs from one of its entities' currencies.
         """
+        entity_ids = self._entity_ids(logs)
+        await self._check_currencies(logs, entity_ids)
         batch_id = await self.get_next_batch_id()
 
         for log in logs:
@@ -46,32 +92,369 @@ class LedgerRepository:
             self.session.add(log)
 
         await self.session.flush()
+        await StatusRepository(self.session).apply_logs(logs)
+        self._publish_on_commit([batch_id], entity_ids, len(logs))
         return batch_id
 
+    async def record_batches(
+        self, batches: Sequence[Sequence[TransactionLogLike]], batch_ids: Sequence[int] | None = None
+    ) -> list[int]:
+        """
+        BULK METHOD: Records many atomic batches in the caller's transaction, each under
+        its own new batch ID, bypassing the ORM unit of work. The derived status tables
+        are updated with one upsert per table for all batches together, and all batches
+        are published to the ledger change feed as one change once the transaction commits.
+
+        All batch IDs are reserved in one allocator call and all rows are written in a
+        single bulk statement: COPY on asyncpg, a driver-level executemany elsewhere
+        (aiomysql rewrites it into multi-row INSERTs). Logs passed as ORM objects are
+        NOT added to the session and do not receive their generated IDs.
+
+        Args:
+            batches: Pre-validated batches of logs (Debit = Credit is checked by the Service Layer).
+            batch_ids: IDs already obtained from get_next_batch_id(), one per batch
+                       (default: reserved here).
+
+        Returns:
+            The transaction_batch_id of each batch, in input order.
+
+        Raises:
+            ValueError: If batch_ids does not have one ID per batch.
+            BusinessRuleError: If a log's currency differs from one of its entities' currencies.
+        """
+        if batch_ids is None:
+            batch_ids = await get_batch_id_allocator(self.session).reserve(len(batches), self.session)
+        elif len(batch_ids) != len(batches):
+            raise ValueError(f"Expected {len(batches)} batch IDs, got {len(batch_ids)}.")
+        batch_ids = list(batch_ids)
+
+        now = utc_now()
+        rows = [
+            self._to_bulk_row(log, batch_id, now)
+            for batch_id, logs in zip(batch_ids, batches, strict=True)
+            for log in logs
+        ]
+        if not rows:
+            return batch_ids
+        entity_ids = self._entity_ids(rows)
+        await self._check_currencies(rows, entity_ids)
+
+        conn = await self.session.connection()
+        if conn.dialect.driver == "asyncpg":
+            await self._copy_rows(conn, rows)
+        else:
+            await conn.execute(insert(model_table(TransactionLog)), rows)
+        await StatusRepository(self.session).apply_logs(rows)
+        self._publish_on_commit(batch_ids, entity_ids, len(rows))
+        return batch_ids
+
+    @staticmethod
+    def _entity_ids(logs: Sequence[TransactionLogLike]) -> frozenset[int]:
+        """The entities on either side of the logs."""
+        return frozenset(
+            entity_id
+            for log in logs
+            for entity_id in (log_value(log, "debit_account_entity_id"), log_value(log, "credit_account_entity_id"))
+        )
+
+    async def _check_currencies(self, logs: Sequence[TransactionLogLike], entity_ids: frozenset[int]) -> None:
+        """Rejects logs whose currency differs from their entities' (one lookup per 500 entities)."""
+        currencies = await AccountRepository(self.session).get_entity_currencies(entity_ids)
+        try:
+            check_currencies(logs, currencies, get_base_currency())
+        except ValueError as exc:
+            raise BusinessRuleError(str(exc)) from exc
+
+    def _publish_on_commit(self, batch_ids: Sequence[int], entity_ids: frozenset[int], log_count: int) -> None:
+        """Publishes the recorded batches to the ledger change feed after the caller's transaction commits."""
+        change = LedgerChange(tuple(batch_ids), entity_ids, log_count)
+        on_commit(self.session, lambda: ledger_change_feed.publish(change))
+
+    @staticmethod
+    def _to_bulk_row(log: TransactionLogLike, batch_id: int, now: datetime) -> dict[str, Any]:
+        """Flattens a TransactionLog-like object into a column mapping for the bulk insert."""
+        row = {column: log_value(log, column) for column in _BULK_COLUMNS}
+        row["transaction_batch_id"] = batch_id
+        row["amount"] = to_decimal(row["amount"])
+        row["created_at"] = row["created_at"] or now
+        return row
+
+    @staticmethod
+    async def _copy_rows(conn: AsyncConnection, rows: list[dict[str, Any]]) -> None:
+        """Streams rows into transaction_logs with PostgreSQL COPY on the session's own connection."""
+        driver_connection = (await conn.get_raw_connection()).driver_connection
+        if driver_connection is None:
+            raise RuntimeError("The session's connection has been invalidated.")
+        if not driver_connection.is_in_transaction():
+            # The asyncpg adapter opens its transaction lazily on the first statement;
+            # COPY must not run in autocommit outside the caller's transaction.
+            await conn.execute(select(literal(1)))
+
+        # COPY bypasses the Money column type: amounts are written as minor units here.
+        records = [
+            tuple(to_minor_units(row[column]) if column == "amount" else row[column] for column in _BULK_COLUMNS)
+            for row in rows
+        ]
+        await driver_connection.copy_records_to_table(
+            TransactionLog.__tablename__, records=records, columns=list(_BULK_COLUMNS)
+        )
+
     # --- 2. AUDIT AND RETRIEVAL ---
 
-    async def get_logs_by_batch_id(self, batch_id: int) -> Sequence[TransactionLog]:
+    @read_only
+    async def get_logs_by_batch_id(self, batch_id: int, include_archived: bool = False) -> Sequence[TransactionLog]:
         """
         Retrieves all logs belonging to a specific atomic transaction batch.
         Used for viewing a single transaction (e.g., A paid for B).
+        `include_archived` also looks in cold storage (see app.services.archive).
         """
-        stmt = select(TransactionLog).where(TransactionLog.transaction_batch_id == batch_id)
+        logs = log_source(await self.session.connection(), include_archived=include_archived)
+        stmt = select(logs).where(logs.transaction_batch_id == batch_id)
         return (await self.session.scalars(stmt)).all()
 
-    async def get_logs_for_entity(self, entity_id: int, limit: int = 50) -> Sequence[TransactionLog]:
+    @read_only
+    async def get_logs_for_entity(
+        self,
+        entity_id: int,
+        limit: int = 50,
+        before_id: int | None = None,
+        after_id: int | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        include_archived: bool = False,
+    ) -> Sequence[TransactionLog]:
         """
-        Retrieves recent transaction logs where the specified entity was either
-        the debit or the credit party.
+        Retrieves one page of transaction logs where the specified entity was either
+        the debit or the credit party, newest first.
+
+        Keyset pagination: pass the smallest log ID of the current page as `before_id`
+        to page back through history, or the largest as `after_id` to fetch newer logs.
+        Each side is a range scan over a composite (entity_id, id) index, combined with
+        UNION ALL, so deep pages cost the same as the first one.
+
+        Optional `since` (inclusive) / `until` (exclusive) bounds on created_at restrict
+        the scan to the partitions covering that range (see app.db.partitioning).
+        `include_archived` also reads the history moved to cold storage.
+
+        Raises:
+            ValueError: If both before_id and after_id are given.
         """
-        stmt = (
-            select(TransactionLog)
-            .where(
-                or_(
-                    TransactionLog.debit_account_entity_id == entity_id,
-                    TransactionLog.credit_account_entity_id == entity_id,
-                )
+        if before_id is not None and after_id is not None:
+            raise ValueError("Pass either before_id or after_id, not both.")
+
+        logs = log_source(await self.session.connection(), since, until, include_archived)
+        newest_first = after_id is None
+        order = logs.id.desc() if newest_first else logs.id.asc()
+
+        def side(entity_column: QueryableAttribute[int]) -> Select[tuple[int]]:
+            stmt = select(logs.id).where(entity_column == entity_id)
+            if before_id is not None:
+                stmt = stmt.where(logs.id < before_id)
+            if after_id is not None:
+                stmt = stmt.where(logs.id > after_id)
+            if since is not None:
+                stmt = stmt.where(logs.created_at >= since)
+            if until is not None:
+                stmt = stmt.where(logs.created_at < until)
+            return stmt.order_by(order).limit(limit)
+
+        # Self-transfers (debit = credit entity) are only taken from the debit side.
+        credit_side = side(logs.credit_account_entity_id).where(logs.debit_account_entity_id != entity_id)
+        debit_ids = side(logs.debit_account_entity_id).subquery()
+        credit_ids = credit_side.subquery()
+        page_ids = union_all(select(debit_ids.c.id), select(credit_ids.c.id)).subquery()
+
+        stmt = select(logs).join(page_ids, logs.id == page_ids.c.id).order_by(order).limit(limit)
+        page = (await self.session.scalars(stmt)).all()
+        return page if newest_first else page[::-1]
+
+    @read_only
+    async def get_logs_between(self, since: datetime, until: datetime) -> Sequence[TransactionLog]:
+        """
+        Retrieves every log created in [since, until), oldest first. Date-bounded reports
+        should read through this so only the partitions covering the range are scanned.
+        """
+        logs = log_source(await self.session.connection(), since, until)
+        stmt = select(logs).where(logs.created_at >= since, logs.created_at < until).order_by(logs.id)
+        return (await self.session.scalars(stmt)).all()
+
+    @read_only
+    async def stream_logs(
+        self,
+        columns: Sequence[str],
+        user_id: int | None = None,
+        entity_id: int | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        expense_catalog_id: int | None = None,
+        after_id: int | None = None,
+        yield_per: int = 10_000,
+    ) -> AsyncIterator[Sequence[Sequence[Any]]]:
+        """
+        Streams the selected columns of the matching logs, oldest first, in chunks of
+        `yield_per` rows. Rows are plain tuples (no ORM objects) fetched through a
+        server-side cursor where the driver has one, so memory stays bounded by one
+        chunk whatever the ledger size.
+
+        Filters combine with AND: `user_id` / `entity_id` match logs where the user's
+        entities / the entity are on either side; `since` (inclusive) / `until`
+        (exclusive) bound created_at; `after_id` skips logs already read (id <= after_id).
+        """
+        logs = log_source(await self.session.connection(), since, until)
+        stmt = select(*(getattr(logs, column) for column in columns)).order_by(logs.id)
+        if user_id is not None:
+            owned = select(AccountEntity.id).where(AccountEntity.owner_id == user_id)
+            stmt = stmt.where(or_(logs.debit_account_entity_id.in_(owned), logs.credit_account_entity_id.in_(owned)))
+        if entity_id is not None:
+            stmt = stmt.where(
+                or_(logs.debit_account_entity_id == entity_id, logs.credit_account_entity_id == entity_id)
             )
-            .order_by(TransactionLog.id.desc())
+        if since is not None:
+            stmt = stmt.where(logs.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(logs.created_at < until)
+        if expense_catalog_id is not None:
+            stmt = stmt.where(logs.expense_catalog_id == expense_catalog_id)
+        if after_id is not None:
+            stmt = stmt.where(logs.id > after_id)
+
+        result = await self.session.stream(stmt.execution_options(yield_per=yield_per))
+        async for chunk in result.partitions():
+            yield chunk
+
+    async def get_logs_after(self, columns: Sequence[str], after_id: int, limit: int) -> Sequence[Sequence[Any]]:
+        """
+        Returns the selected columns of up to `limit` logs with id greater than `after_id`,
+        oldest first (a primary-key range scan). Always reads the primary: change feed
+        consumers call it right after a commit, which a replica may not have applied yet.
+        """
+        logs = log_source(await self.session.connection())
+        stmt = (
+            select(*(getattr(logs, column) for column in columns))
+            .where(logs.id > after_id)
+            .order_by(logs.id)
             .limit(limit)
         )
-        return (await self.session.scalars(stmt)).all()
+        return (await self.session.execute(stmt)).all()
+
+    async def get_recently_touched_entity_ids(self, log_count: int) -> list[int]:
+        """Returns the distinct entities on either side of the latest `log_count` logs (a PK range scan)."""
+        recent = select(TransactionLog.id).order_by(TransactionLog.id.desc()).limit(log_count).subquery()
+        stmt = select(TransactionLog.debit_account_entity_id, TransactionLog.credit_account_entity_id).join(
+            recent, TransactionLog.id == recent.c.id
+        )
+        entity_ids: dict[int, None] = {}
+        for debit_id, credit_id in await self.session.execute(stmt):
+            entity_ids[debit_id] = entity_ids[credit_id] = None
+        return list(entity_ids)
+
+    # --- 3. CATALOG ROLL-UPS ---
+
+    @read_only
+    async def get_catalog_spending(
+        self, catalog_id: int, user_id: int | None = None, since: datetime | None = None, until: datetime | None = None
+    ) -> Decimal:
+        """
+        Net spending (expense debits - refunds) booked on a catalog and all of its
+        sub-catalogs, optionally for one user's expense entities and a created_at range.
+        One indexed join through expense_catalog_closure; no hierarchy walk.
+        """
+        totals = await self._spending_by_catalog(user_id, since, until, catalog_id=catalog_id)
+        return totals.get(catalog_id, Decimal(0))
+
+    @read_only
+    async def get_spending_by_top_level_catalog(
+        self, user_id: int | None = None, since: datetime | None = None, until: datetime | None = None
+    ) -> dict[int, Decimal]:
+        """Net spending per top-level catalog, each including all of its sub-catalogs (one statement)."""
+        return await self._spending_by_catalog(user_id, since, until, top_level_only=True)
+
+    async def _spending_by_catalog(
+        self,
+        user_id: int | None,
+        since: datetime | None,
+        until: datetime | None,
+        catalog_id: int | None = None,
+        top_level_only: bool = False,
+    ) -> dict[int, Decimal]:
+        """
+        Net expense amount per ancestor catalog (only `catalog_id`, or only top-level
+        catalogs, if given), over the logs booked on any of its descendants.
+        """
+        logs = log_source(await self.session.connection(), since, until)
+        expense_entities = (
+            select(AccountEntity.id)
+            .join(Account, Account.id == AccountEntity.account_type_id)
+            .where(Account.account_type == AccountType.EXPENSE)
+        )
+        if user_id is not None:
+            expense_entities = expense_entities.where(AccountEntity.owner_id == user_id)
+
+        signed_amount: ColumnElement[Any] = case(
+            (logs.debit_account_entity_id.in_(expense_entities), logs.amount), else_=0
+        ) - case((logs.credit_account_entity_id.in_(expense_entities), logs.amount), else_=0)
+        stmt = (
+            select(ExpenseCatalogClosure.ancestor_id, func.sum(signed_amount))
+            .select_from(logs)
+            .join(ExpenseCatalogClosure, ExpenseCatalogClosure.descendant_id == logs.expense_catalog_id)
+            .group_by(ExpenseCatalogClosure.ancestor_id)
+        )
+        if catalog_id is not None:
+            stmt = stmt.where(ExpenseCatalogClosure.ancestor_id == catalog_id)
+        if top_level_only:
+            stmt = stmt.join(ExpenseCatalog, ExpenseCatalog.id == ExpenseCatalogClosure.ancestor_id).where(
+                ExpenseCatalog.parent_id.is_(None)
+            )
+        if since is not None:
+            stmt = stmt.where(logs.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(logs.created_at < until)
+        return {ancestor_id: sum_to_decimal(total) for ancestor_id, total in await self.session.execute(stmt)}
+
+    # --- 4. RECONCILIATION ---
+
+    async def get_cached_balance_and_log_delta(self, entity_id: int, after_log_id: int = 0) -> tuple[Decimal, Decimal]:
+        """
+        Reads an entity's cached current_balance (plus its balance shards, if sharded)
+        together with the net (Debits - Credits) of its logs with id > after_log_id,
+        counting its opening balance if any of those logs were archived.
+
+        Both come from ONE statement, so they reflect the same committed state even while
+        postings run (on PostgreSQL's READ COMMITTED, separate statements would not).
+        Amounts are summed as Decimal in Python, not with SQL SUM().
+
+        Raises:
+            NoResultFound: If the entity does not exist.
+        """
+
+        logs = log_source(await self.session.connection())
+
+        def side(entity_column: QueryableAttribute[int], sign: int):
+            return select(literal(sign).label("sign"), logs.amount.label("amount")).where(
+                entity_column == entity_id, logs.id > after_log_id
+            )
+
+        cached = select(literal(0).label("sign"), AccountEntity.current_balance.label("amount")).where(
+            AccountEntity.id == entity_id
+        )
+        shards = select(literal(0).label("sign"), AccountEntityBalanceShard.balance.label("amount")).where(
+            AccountEntityBalanceShard.account_entity_id == entity_id
+        )
+        # Archived logs past after_log_id are only in the entity's opening balance.
+        opening = select(literal(1).label("sign"), OpeningBalance.balance.label("amount")).where(
+            OpeningBalance.account_entity_id == entity_id, OpeningBalance.last_log_id > after_log_id
+        )
+        stmt = union_all(
+            cached, shards, opening, side(logs.debit_account_entity_id, 1), side(logs.credit_account_entity_id, -1)
+        )
+
+        cached_balance: Decimal | None = None
+        log_delta = Decimal(0)
+        for sign, amount in await self.session.execute(stmt):
+            if sign == 0:
+                cached_balance = (cached_balance or Decimal(0)) + to_decimal(amount)
+            else:
+                log_delta += sign * to_decimal(amount)
+        if cached_balance is None:
+            raise NoResultFound(f"AccountEntity with ID {entity_id} not found.")
+        return cached_balance, log_delta
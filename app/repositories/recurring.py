@@ -0,0 +1,116 @@
+from collections.abc import Iterable, Mapping, Sequence
+from datetime import date
+from decimal import Decimal
+from itertools import groupby
+from typing import Any, NamedTuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.ledger import RecurringExpense, RecurringExpenseOccurrence, RecurringExpenseParticipant
+
+
+class DueRecurringExpense(NamedTuple):
+    """A recurring expense with at least one occurrence due, and its participants in split order."""
+
+    id: int
+    payer_id: int
+    amount: Decimal
+    split_method: str
+    expense_catalog_id: int | None
+    narrative: str | None
+    interval_unit: str
+    interval_count: int
+    starts_on: date
+    ends_on: date | None
+    next_occurrence: int
+    participant_ids: tuple[int, ...]
+    split_values: tuple[Decimal, ...]
+
+
+class RecurringExpenseRepository:
+    """
+    Manages recurring expense schedules and their posted occurrences.
+    Relies on the caller's transaction boundary.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add(self, expense: RecurringExpense) -> RecurringExpense:
+        """Adds a schedule (with its participants) and flushes it to obtain its ID."""
+        self.session.add(expense)
+        await self.session.flush()
+        return expense
+
+    async def get_by_id(self, expense_id: int) -> RecurringExpense | None:
+        return await self.session.get(RecurringExpense, expense_id)
+
+    async def get_due(self, until: date, limit: int | None = None) -> list[DueRecurringExpense]:
+        """
+        Returns the active schedules with an occurrence due on or before `until`, with their
+        participants, in ONE query (the due-range scan joined with the participants), ordered
+        by next due date. The schedule rows are locked FOR UPDATE where supported, skipping
+        rows another scheduler has locked.
+
+        Args:
+            limit: Most schedules to return (default: all).
+        """
+        due = (
+            select(RecurringExpense.id)
+            .where(RecurringExpense.is_active.is_(True), RecurringExpense.next_due_on <= until)
+            .order_by(RecurringExpense.next_due_on, RecurringExpense.id)
+            .limit(limit)
+            .subquery()
+        )
+        stmt = (
+            select(
+                RecurringExpense.id,
+                RecurringExpense.payer_id,
+                RecurringExpense.amount,
+                RecurringExpense.split_method,
+                RecurringExpense.expense_catalog_id,
+                RecurringExpense.narrative,
+                RecurringExpense.interval_unit,
+                RecurringExpense.interval_count,
+                RecurringExpense.starts_on,
+                RecurringExpense.ends_on,
+                RecurringExpense.next_occurrence,
+                RecurringExpenseParticipant.user_id,
+                RecurringExpenseParticipant.split_value,
+            )
+            .join(due, due.c.id == RecurringExpense.id)
+            .join(RecurringExpenseParticipant, RecurringExpenseParticipant.recurring_expense_id == RecurringExpense.id)
+            .order_by(RecurringExpense.next_due_on, RecurringExpense.id, RecurringExpenseParticipant.position)
+            .with_for_update(of=RecurringExpense, skip_locked=True)
+        )
+        rows = (await self.session.execute(stmt)).all()
+
+        schedules: list[DueRecurringExpense] = []
+        for _, group in groupby(rows, key=lambda row: row.id):
+            participants = list(group)
+            first = participants[0]
+            user_ids = tuple(row.user_id for row in participants)
+            # Equal splits store no values; the others store one per participant.
+            split_values = tuple(row.split_value for row in participants if row.split_value is not None)
+            schedules.append(DueRecurringExpense._make((*first[:11], user_ids, split_values)))
+        return schedules
+
+    async def add_occurrences(self, occurrences: Sequence[Mapping[str, Any]]) -> None:
+        """
+        Records posted occurrences with one bulk insert.
+
+        Raises:
+            IntegrityError: If an occurrence was already posted (e.g., by a concurrent scheduler).
+        """
+        if occurrences:
+            await self.session.execute(insert(RecurringExpenseOccurrence), list(occurrences))
+
+    async def advance(self, schedules: Iterable[Mapping[str, Any]]) -> None:
+        """
+        Moves schedules past their posted occurrences with one bulk UPDATE by primary key.
+        Each mapping holds `id`, `next_occurrence`, `next_due_on` and `is_active`.
+        """
+        schedules = list(schedules)
+        if schedules:
+            await self.session.execute(update(RecurringExpense), schedules)
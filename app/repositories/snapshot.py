@@ -0,0 +1,176 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import func, insert, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import QueryableAttribute
+
+from app.core.amounts import to_decimal
+from app.core.datetime import utc
+from app.core.ledger import LogIdGaps
+from app.db.partitioning import log_source
+from app.models.ledger import BalanceSnapshot, OpeningBalance
+
+
+class BalanceSnapshotRepository:
+    """
+    Manages periodic AccountEntity balance snapshots and historical (as-of) balance queries.
+    Snapshots are derived from the TransactionLog only, never from the current_balance cache.
+    """
+
+    # Upper bound on entity IDs per IN (...) lookup
+    _ENTITY_CHUNK_SIZE = 500
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    # --- 1. SNAPSHOT WRITING ---
+
+    async def get_last_snapshot_log_id(self) -> int:
+        """Returns the highest TransactionLog ID covered by any snapshot (0 if none exist)."""
+        return await self.session.scalar(select(func.max(BalanceSnapshot.last_log_id))) or 0
+
+    async def count_batches_since_last_snapshot(self) -> int:
+        """Counts the batches posted after the latest snapshot's high-water mark."""
+        logs = log_source(await self.session.connection())
+        stmt = select(func.count(func.distinct(logs.transaction_batch_id))).where(
+            logs.id > await self.get_last_snapshot_log_id()
+        )
+        return await self.session.scalar(stmt) or 0
+
+    async def take_snapshot(self, gaps: LogIdGaps) -> int:
+        """
+        Writes a new snapshot row for every entity touched since the previous snapshot.
+
+        Only the logs after the previous high-water mark are read (a primary-key range
+        scan), so the cost is bounded by the snapshot interval, not by ledger size.
+        The new mark stops before the first missing log ID that `gaps` has not seen
+        missing for its settle delay: it may belong to a transaction that has not
+        committed yet, which a later snapshot could no longer include.
+
+        Returns:
+            The number of snapshot rows written.
+        """
+        previous_log_id = await self.get_last_snapshot_log_id()
+        logs = log_source(await self.session.connection())
+        stmt = (
+            select(logs.id, logs.debit_account_entity_id, logs.credit_account_entity_id, logs.amount, logs.created_at)
+            .where(logs.id > previous_log_id)
+            .order_by(logs.id)
+        )
+        rows = (await self.session.execute(stmt)).all()
+        rows = rows[: gaps.settled(previous_log_id, [row[0] for row in rows])]
+        if not rows:
+            return 0
+        high_water_mark: int = rows[-1][0]
+
+        deltas: defaultdict[int, Decimal] = defaultdict(Decimal)
+        # Every covered log, including those of earlier snapshots, must be at or before covered_until.
+        covered_until: datetime | None = await self.session.scalar(
+            select(func.max(BalanceSnapshot.covered_until)).where(BalanceSnapshot.last_log_id == previous_log_id)
+        )
+        covered_until = utc(covered_until) if covered_until else None
+        for _, debit_id, credit_id, amount, created_at in rows:
+            amount = to_decimal(amount)
+            deltas[debit_id] += amount
+            deltas[credit_id] -= amount
+            created_at = utc(created_at)
+            covered_until = created_at if covered_until is None else max(covered_until, created_at)
+
+        previous_balances = await self._latest_balances(list(deltas))
+        # An entity first snapshotted after its history was archived starts from its opening balance.
+        for opening in await self._opening_balances(
+            [entity_id for entity_id in deltas if entity_id not in previous_balances]
+        ):
+            previous_balances[opening.account_entity_id] = to_decimal(opening.balance)
+            archived_until = utc(opening.archived_until)
+            covered_until = archived_until if covered_until is None else max(covered_until, archived_until)
+        await self.session.execute(
+            insert(BalanceSnapshot),
+            [
+                {
+                    "account_entity_id": entity_id,
+                    "balance": previous_balances.get(entity_id, Decimal(0)) + delta,
+                    "last_log_id": high_water_mark,
+                    "covered_until": covered_until,
+                }
+                for entity_id, delta in deltas.items()
+            ],
+        )
+        return len(deltas)
+
+    async def _latest_balances(self, entity_ids: list[int]) -> dict[int, Decimal]:
+        """Balance from each entity's most recent snapshot."""
+        balances: dict[int, Decimal] = {}
+        for start in range(0, len(entity_ids), self._ENTITY_CHUNK_SIZE):
+            chunk = entity_ids[start : start + self._ENTITY_CHUNK_SIZE]
+            latest_ids = (
+                select(func.max(BalanceSnapshot.id))
+                .where(BalanceSnapshot.account_entity_id.in_(chunk))
+                .group_by(BalanceSnapshot.account_entity_id)
+            )
+            stmt = select(BalanceSnapshot.account_entity_id, BalanceSnapshot.balance).where(
+                BalanceSnapshot.id.in_(latest_ids)
+            )
+            balances.update({entity_id: to_decimal(balance) for entity_id, balance in await self.session.execute(stmt)})
+        return balances
+
+    async def _opening_balances(self, entity_ids: list[int]) -> list[OpeningBalance]:
+        """Opening balances (archived history) of the given entities."""
+        openings: list[OpeningBalance] = []
+        for start in range(0, len(entity_ids), self._ENTITY_CHUNK_SIZE):
+            chunk = entity_ids[start : start + self._ENTITY_CHUNK_SIZE]
+            stmt = select(OpeningBalance).where(OpeningBalance.account_entity_id.in_(chunk))
+            openings.extend((await self.session.scalars(stmt)).all())
+        return openings
+
+    # --- 2. HISTORICAL QUERIES ---
+
+    async def get_latest_snapshot(self, entity_id: int) -> BalanceSnapshot | None:
+        """Retrieves the entity's most recent snapshot, if any."""
+        stmt = (
+            select(BalanceSnapshot)
+            .where(BalanceSnapshot.account_entity_id == entity_id)
+            .order_by(BalanceSnapshot.id.desc())
+            .limit(1)
+        )
+        return (await self.session.scalars(stmt)).first()
+
+    async def as_of(self, entity_id: int, timestamp: datetime) -> Decimal:
+        """
+        Returns the entity's balance (Debits - Credits) over all logs created at or before `timestamp`.
+
+        Starts from the latest snapshot that is entirely at or before `timestamp` and adds the
+        logs posted after it, read through the (entity_id, id) indexes; work is bounded by the
+        entity's activity within one snapshot interval. Falls back to reading archived logs
+        when some of the entity's logs after that snapshot were archived.
+        """
+        timestamp = utc(timestamp)
+        snapshot = (
+            await self.session.scalars(
+                select(BalanceSnapshot)
+                .where(BalanceSnapshot.account_entity_id == entity_id, BalanceSnapshot.covered_until <= timestamp)
+                .order_by(BalanceSnapshot.covered_until.desc(), BalanceSnapshot.id.desc())
+                .limit(1)
+            )
+        ).first()
+
+        balance = to_decimal(snapshot.balance) if snapshot else Decimal(0)
+        after_log_id = snapshot.last_log_id if snapshot else 0
+
+        archived_log_id = await self.session.scalar(
+            select(OpeningBalance.last_log_id).where(OpeningBalance.account_entity_id == entity_id)
+        )
+        include_archived = archived_log_id is not None and archived_log_id > after_log_id
+        logs = log_source(await self.session.connection(), until=timestamp, include_archived=include_archived)
+
+        def side(entity_column: QueryableAttribute[int], sign: int):
+            return select(literal(sign).label("sign"), logs.amount).where(
+                entity_column == entity_id, logs.id > after_log_id, logs.created_at <= timestamp
+            )
+
+        stmt = union_all(side(logs.debit_account_entity_id, 1), side(logs.credit_account_entity_id, -1))
+        for sign, amount in await self.session.execute(stmt):
+            balance += sign * to_decimal(amount)
+        return balance
@@ -0,0 +1,76 @@
+from collections.abc import Collection, Mapping
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.datetime import utc_now
+from app.models.ledger import ImportedStatementLine, StatementImport
+
+
+class StatementImportRepository:
+    """
+    Manages the checkpoints and fingerprints of bank statement imports. Relies on the
+    caller's transaction boundary: a chunk's logs, fingerprints and checkpoint must
+    commit together.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_checkpoint(self, source_key: str) -> StatementImport | None:
+        """Returns the import progress of a statement file, or None if it was never imported."""
+        return await self.session.get(StatementImport, source_key)
+
+    async def save_checkpoint(
+        self,
+        source_key: str,
+        owner_id: int,
+        source_name: str,
+        byte_offset: int,
+        posted: int = 0,
+        duplicates: int = 0,
+        completed: bool = False,
+    ) -> StatementImport:
+        """Moves a file's checkpoint to `byte_offset` and adds to its line counts, creating it on first use."""
+        now = utc_now()
+        checkpoint = await self.get_checkpoint(source_key)
+        if checkpoint is None:
+            checkpoint = StatementImport(
+                source_key=source_key, owner_id=owner_id, lines_posted=0, lines_duplicate=0, completed_at=None
+            )
+            self.session.add(checkpoint)
+        checkpoint.source_name = source_name
+        checkpoint.byte_offset = byte_offset
+        checkpoint.lines_posted += posted
+        checkpoint.lines_duplicate += duplicates
+        checkpoint.updated_at = now
+        if completed:
+            checkpoint.completed_at = now
+        await self.session.flush()
+        return checkpoint
+
+    async def get_imported_fingerprints(self, fingerprints: Collection[str]) -> set[str]:
+        """Returns which of the fingerprints belong to statement lines imported before."""
+        if not fingerprints:
+            return set()
+        stmt = select(ImportedStatementLine.fingerprint).where(ImportedStatementLine.fingerprint.in_(fingerprints))
+        return set((await self.session.scalars(stmt)).all())
+
+    async def add_fingerprints(self, batch_ids: Mapping[str, int]) -> None:
+        """
+        Records imported statement lines (fingerprint -> posted batch ID).
+
+        Raises:
+            IntegrityError: If a fingerprint already exists (e.g., the same statement
+                            is being imported concurrently by another process).
+        """
+        if not batch_ids:
+            return
+        now = utc_now()
+        await self.session.execute(
+            insert(ImportedStatementLine),
+            [
+                {"fingerprint": fingerprint, "transaction_batch_id": batch_id, "imported_at": now}
+                for fingerprint, batch_id in batch_ids.items()
+            ],
+        )
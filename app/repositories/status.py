@@ -0,0 +1,322 @@
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import Table, delete, func, insert, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.amounts import to_decimal
+from app.core.datetime import utc_now
+from app.core.ledger import TransactionLogLike, log_value
+from app.db.partitioning import log_source
+from app.db.utils import model_table
+from app.models.ledger import (
+    Account,
+    AccountEntity,
+    AccountSubType,
+    APStatus,
+    ARStatus,
+    CashStatus,
+    OpeningBalance,
+    URStatus,
+)
+
+# Status table, amount column and sign applied when an entity of the given sub-type is on
+# the debit / credit side of a log. Assets grow with debits; liabilities grow with credits.
+# UR keeps prepayments (credits) and their consumption (debits) in separate columns.
+_DEBIT_RULES: dict[AccountSubType, tuple[Table, str, int]] = {
+    AccountSubType.CASH: (model_table(CashStatus), "current_balance", 1),
+    AccountSubType.AR: (model_table(ARStatus), "amount_owed", 1),
+    AccountSubType.AP: (model_table(APStatus), "amount_due", -1),
+    AccountSubType.UR: (model_table(URStatus), "settled_amount", 1),
+}
+_CREDIT_RULES: dict[AccountSubType, tuple[Table, str, int]] = {
+    AccountSubType.CASH: (model_table(CashStatus), "current_balance", -1),
+    AccountSubType.AR: (model_table(ARStatus), "amount_owed", -1),
+    AccountSubType.AP: (model_table(APStatus), "amount_due", 1),
+    AccountSubType.UR: (model_table(URStatus), "amount_prepaid", 1),
+}
+_AMOUNT_COLUMNS: dict[Table, tuple[str, ...]] = {
+    model_table(CashStatus): ("current_balance",),
+    model_table(ARStatus): ("amount_owed",),
+    model_table(APStatus): ("amount_due",),
+    model_table(URStatus): ("amount_prepaid", "settled_amount"),
+}
+_KEY_COLUMNS: dict[Table, tuple[str, ...]] = {
+    model_table(CashStatus): ("account_entity_id",),
+    model_table(ARStatus): ("account_entity_id", "counterparty_entity_id"),
+    model_table(APStatus): ("account_entity_id", "counterparty_entity_id"),
+    model_table(URStatus): ("account_entity_id", "counterparty_entity_id"),
+}
+
+
+class StatusRepository:
+    """
+    Maintains the derived status tables (T_Cash_Status, T_AR_Status, T_AP_Status,
+    T_UR_Status) incrementally from posted TransactionLogs, and serves O(1) lookups on them.
+    """
+
+    # Logs read per round trip during a full rebuild
+    _REBUILD_CHUNK_SIZE = 10_000
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    # --- 1. INCREMENTAL MAINTENANCE ---
+
+    async def apply_logs(self, logs: Iterable[TransactionLogLike]) -> None:
+        """
+        CRITICAL: Folds newly posted logs into the status tables with one upsert per table.
+        Must be called in the same transaction that records the logs.
+
+        AR/AP/UR items are keyed by the log's counterparty_entity_id; logs without one
+        cannot be attributed to a counterparty and only affect T_Cash_Status.
+        """
+        logs = list(logs)
+        if not logs:
+            return
+
+        entity_ids = {
+            log_value(log, column) for log in logs for column in ("debit_account_entity_id", "credit_account_entity_id")
+        }
+        sub_types = await self._fetch_sub_types(entity_ids)
+
+        # (table, key) -> accumulated amount column deltas, plus the latest batch touching the key
+        deltas: defaultdict[tuple[Table, tuple[int, ...]], defaultdict[str, Decimal]] = defaultdict(
+            lambda: defaultdict(Decimal)
+        )
+        last_batch_ids: dict[tuple[Table, tuple[int, ...]], int] = {}
+
+        for log in logs:
+            amount = to_decimal(log_value(log, "amount"))
+            counterparty_id = log_value(log, "counterparty_entity_id")
+            batch_id = log_value(log, "transaction_batch_id")
+            for column, rules in (
+                ("debit_account_entity_id", _DEBIT_RULES),
+                ("credit_account_entity_id", _CREDIT_RULES),
+            ):
+                entity_id = log_value(log, column)
+                sub_type = sub_types.get(entity_id)
+                rule = rules.get(sub_type) if sub_type is not None else None
+                if rule is None:
+                    continue
+                table, amount_column, sign = rule
+                if table is model_table(CashStatus):
+                    key: tuple[int, ...] = (entity_id,)
+                elif counterparty_id is not None:
+                    key = (entity_id, counterparty_id)
+                else:
+                    continue
+                deltas[table, key][amount_column] += sign * amount
+                last_batch_ids[table, key] = max(batch_id, last_batch_ids.get((table, key), batch_id))
+
+        now = utc_now()
+        rows_by_table: defaultdict[Table, list[dict[str, Any]]] = defaultdict(list)
+        # Sorted keys make concurrent postings take row locks in a consistent order.
+        for table, key in sorted(deltas, key=lambda table_key: (table_key[0].name, table_key[1])):
+            changes = deltas[table, key]
+            if not any(changes.values()):
+                continue
+            row: dict[str, Any] = dict(zip(_KEY_COLUMNS[table], key, strict=True))
+            row.update({column: changes[column] for column in _AMOUNT_COLUMNS[table]})
+            row["last_transaction_batch_id"] = last_batch_ids[table, key]
+            row["last_updated"] = now
+            rows_by_table[table].append(row)
+
+        for table, rows in rows_by_table.items():
+            await self._upsert_increments(table, rows)
+
+    async def _fetch_sub_types(self, entity_ids: Iterable[int]) -> dict[int, AccountSubType]:
+        """Maps each AccountEntity ID to the sub-type of its Account classification."""
+        stmt = (
+            select(AccountEntity.id, Account.sub_type)
+            .join(Account, AccountEntity.account_type_id == Account.id)
+            .where(AccountEntity.id.in_(entity_ids))
+        )
+        return {entity_id: AccountSubType(sub_type) for entity_id, sub_type in await self.session.execute(stmt)}
+
+    async def _upsert_increments(self, table: Table, rows: list[dict[str, Any]]) -> None:
+        """
+        Inserts each row, or adds its amount columns to the existing row with the same key,
+        in a single executemany round trip where the dialect has a native upsert.
+        """
+        amount_columns = _AMOUNT_COLUMNS[table]
+        conn = await self.session.connection()
+        dialect = conn.dialect.name
+
+        if dialect in ("postgresql", "sqlite"):
+            stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+            greatest = func.greatest if dialect == "postgresql" else func.max  # SQLite's scalar max(x, y)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(_KEY_COLUMNS[table]),
+                set_={
+                    **{column: table.c[column] + stmt.excluded[column] for column in amount_columns},
+                    "last_transaction_batch_id": greatest(
+                        table.c.last_transaction_batch_id, stmt.excluded.last_transaction_batch_id
+                    ),
+                    "last_updated": stmt.excluded.last_updated,
+                },
+            )
+            await conn.execute(stmt, rows)
+        elif dialect == "mysql":
+            stmt = mysql.insert(table)
+            stmt = stmt.on_duplicate_key_update(
+                {
+                    **{column: table.c[column] + stmt.inserted[column] for column in amount_columns},
+                    "last_transaction_batch_id": func.greatest(
+                        table.c.last_transaction_batch_id, stmt.inserted.last_transaction_batch_id
+                    ),
+                    "last_updated": stmt.inserted.last_updated,
+                }
+            )
+            await conn.execute(stmt, rows)
+        else:
+            # Portable fallback: UPDATE first, INSERT the rows that did not exist yet.
+            for row in rows:
+                key_clause = [table.c[column] == row[column] for column in _KEY_COLUMNS[table]]
+                stmt = (
+                    update(table)
+                    .where(*key_clause)
+                    .values(
+                        {column: table.c[column] + row[column] for column in amount_columns},
+                        last_transaction_batch_id=row["last_transaction_batch_id"],
+                        last_updated=row["last_updated"],
+                    )
+                )
+                if (await conn.execute(stmt)).rowcount == 0:
+                    await conn.execute(insert(table).values(row))
+
+    # --- 2. FULL REBUILD ---
+
+    async def rebuild(self) -> int:
+        """
+        Discards and recomputes every status table from the TransactionLog, streaming
+        the log in primary-key chunks through the same rules as apply_logs().
+        Runs in the caller's transaction; must not run while other workers are posting.
+        Items that net to zero within a chunk (e.g., settled debts) are not recreated.
+
+        CASH balances start from the opening balances of archived history; archived users
+        were settled, so they have no AR/AP/UR items to restore (see app.services.archive).
+
+        Returns:
+            The number of logs replayed.
+        """
+        for model in (CashStatus, ARStatus, APStatus, URStatus):
+            await self.session.execute(delete(model))
+
+        openings = (
+            select(OpeningBalance.account_entity_id, OpeningBalance.balance, OpeningBalance.last_transaction_batch_id)
+            .join(AccountEntity, AccountEntity.id == OpeningBalance.account_entity_id)
+            .join(Account, Account.id == AccountEntity.account_type_id)
+            .where(Account.sub_type == AccountSubType.CASH.value, OpeningBalance.balance != 0)
+        )
+        now = utc_now()
+        cash_rows = [
+            {
+                "account_entity_id": entity_id,
+                "current_balance": to_decimal(balance),
+                "last_transaction_batch_id": batch_id,
+                "last_updated": now,
+            }
+            for entity_id, balance, batch_id in await self.session.execute(openings)
+        ]
+        if cash_rows:
+            await self.session.execute(insert(model_table(CashStatus)), cash_rows)
+
+        source = log_source(await self.session.connection())
+        columns = (
+            source.id,
+            source.transaction_batch_id,
+            source.debit_account_entity_id,
+            source.credit_account_entity_id,
+            source.amount,
+            source.counterparty_entity_id,
+        )
+        replayed = 0
+        last_id = 0
+        while True:
+            stmt = select(*columns).where(source.id > last_id).order_by(source.id).limit(self._REBUILD_CHUNK_SIZE)
+            logs = (await self.session.execute(stmt)).mappings().all()
+            if not logs:
+                return replayed
+            await self.apply_logs(logs)
+            replayed += len(logs)
+            last_id = logs[-1]["id"]
+
+    # --- 3. LOOKUPS ---
+
+    async def get_cash_status(self, cash_entity_id: int) -> CashStatus | None:
+        """Retrieves the running balance of a CASH entity."""
+        return await self.session.get(CashStatus, cash_entity_id)
+
+    async def get_amount_owed(self, ar_entity_id: int, counterparty_entity_id: int) -> Decimal:
+        """Net amount the counterparty currently owes the owner of the AR entity (0 if none)."""
+        stmt = select(ARStatus.amount_owed).where(
+            ARStatus.account_entity_id == ar_entity_id, ARStatus.counterparty_entity_id == counterparty_entity_id
+        )
+        return to_decimal(await self.session.scalar(stmt) or 0)
+
+    async def get_amount_due(self, ap_entity_id: int, counterparty_entity_id: int) -> Decimal:
+        """Net amount the owner of the AP entity currently owes the counterparty (0 if none)."""
+        stmt = select(APStatus.amount_due).where(
+            APStatus.account_entity_id == ap_entity_id, APStatus.counterparty_entity_id == counterparty_entity_id
+        )
+        return to_decimal(await self.session.scalar(stmt) or 0)
+
+    async def get_receivables(self, ar_entity_id: int) -> Sequence[ARStatus]:
+        """Open claims of an AR entity: every counterparty with a non-zero amount owed."""
+        stmt = select(ARStatus).where(ARStatus.account_entity_id == ar_entity_id, ARStatus.amount_owed != 0)
+        return (await self.session.scalars(stmt)).all()
+
+    async def get_payables(self, ap_entity_id: int) -> Sequence[APStatus]:
+        """Open liabilities of an AP entity: every counterparty with a non-zero amount due."""
+        stmt = select(APStatus).where(APStatus.account_entity_id == ap_entity_id, APStatus.amount_due != 0)
+        return (await self.session.scalars(stmt)).all()
+
+    async def get_prepayments(self, ur_entity_id: int) -> Sequence[URStatus]:
+        """Prepayments received by a UR entity that are not fully settled yet."""
+        stmt = select(URStatus).where(
+            URStatus.account_entity_id == ur_entity_id, URStatus.amount_prepaid != URStatus.settled_amount
+        )
+        return (await self.session.scalars(stmt)).all()
+
+    async def get_receivables_within(self, user_ids: Iterable[int]) -> list[tuple[ARStatus, int, int]]:
+        """
+        Open AR items whose holder and counterparty are both owned by the given users.
+
+        Returns:
+            (item, holder user ID, counterparty user ID) for every non-zero item.
+        """
+        holder, counterparty = aliased(AccountEntity), aliased(AccountEntity)
+        user_ids = list(user_ids)
+        stmt = (
+            select(ARStatus, holder.owner_id, counterparty.owner_id)
+            .join(holder, ARStatus.account_entity_id == holder.id)
+            .join(counterparty, ARStatus.counterparty_entity_id == counterparty.id)
+            .where(holder.owner_id.in_(user_ids), counterparty.owner_id.in_(user_ids), ARStatus.amount_owed != 0)
+        )
+        return [
+            (item, holder_id, counterparty_id) for item, holder_id, counterparty_id in await self.session.execute(stmt)
+        ]
+
+    async def get_payables_within(self, user_ids: Iterable[int]) -> list[tuple[APStatus, int, int]]:
+        """
+        Open AP items whose holder and counterparty are both owned by the given users.
+
+        Returns:
+            (item, holder user ID, counterparty user ID) for every non-zero item.
+        """
+        holder, counterparty = aliased(AccountEntity), aliased(AccountEntity)
+        user_ids = list(user_ids)
+        stmt = (
+            select(APStatus, holder.owner_id, counterparty.owner_id)
+            .join(holder, APStatus.account_entity_id == holder.id)
+            .join(counterparty, APStatus.counterparty_entity_id == counterparty.id)
+            .where(holder.owner_id.in_(user_ids), counterparty.owner_id.in_(user_ids), APStatus.amount_due != 0)
+        )
+        return [
+            (item, holder_id, counterparty_id) for item, holder_id, counterparty_id in await self.session.execute(stmt)
+        ]
@@ -0,0 +1,339 @@
+"""
+Columnar Ledger Analytics 📊
+
+Answers spending reports (by catalog, month, counterparty or user) from an
+in-memory, column-oriented copy of transaction_logs instead of aggregating rows
+one at a time. Requires the optional NumPy dependency (`pip install divvy[analytics]`).
+
+---
+DESIGN:
+- Every log is held as NumPy columns: int64 IDs (-1 for NULL), epoch-second
+  timestamps and amounts as their stored integer minor units, so sums stay exact.
+- Spending is the SSD balance formula applied to EXPENSE entities: a debit to an
+  expense entity adds to its owner's spending, a credit (refund) subtracts. These
+  signed "expense postings" are derived once, when logs are loaded; an entity's
+  owner and type never change, so they stay valid.
+- refresh() appends only the logs with id greater than the last one loaded;
+  follow() calls it whenever the ledger change feed reports committed postings,
+  so callers do not have to poll.
+- Reports are a boolean mask plus a sort-and-reduceat group-by over int64 columns.
+- Multi-currency: each posting keeps its log's currency as a small integer code.
+  Reports are converted into one currency in bulk: per source currency, the rates
+  in effect at every posting's timestamp are found with one vectorized search over
+  the pair's sorted rate history (app.core.fx), then applied with one multiply.
+  Ledgers in a single currency skip conversion entirely.
+"""
+
+import asyncio
+import logging
+from collections.abc import Callable, Sequence
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_base_currency, get_change_feed_queue_size, get_change_feed_resync_interval
+from app.core.amounts import from_minor_units, to_minor_units
+from app.core.change_feed import ledger_change_feed
+from app.core.datetime import utc
+from app.core.fx import FxRates
+from app.models.ledger import AccountType
+from app.repositories import AccountRepository, FxRateRepository, LedgerRepository
+
+logger = logging.getLogger(__name__)
+
+# Marker for NULL IDs in the int64 columns.
+NULL_ID = -1
+
+SPENDING_GROUPS = ("catalog", "month", "counterparty", "user")
+
+Int64Array = NDArray[np.int64]
+Float64Array = NDArray[np.float64]
+
+_LOADED_COLUMNS = (
+    "id",
+    "debit_account_entity_id",
+    "credit_account_entity_id",
+    "amount",
+    "counterparty_entity_id",
+    "expense_catalog_id",
+    "created_at",
+    "currency",
+)
+
+
+def _empty() -> Int64Array:
+    return np.empty(0, dtype=np.int64)
+
+
+def _months(epoch_seconds: Int64Array) -> Int64Array:
+    """Months since 1970-01 (UTC) of epoch-second timestamps."""
+    return epoch_seconds.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+
+
+class LedgerAnalytics:
+    """
+    In-memory columnar view of the ledger for vectorized spending reports.
+
+    Call refresh() before reporting to pick up new logs, or run follow() in the
+    background; reports themselves never touch the database.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], chunk_size: int = 50_000):
+        self._session_factory = session_factory
+        self._chunk_size = chunk_size
+        self._refresh_lock = asyncio.Lock()
+        self._last_log_id = 0
+        self._log_count = 0
+        self._base_currency = get_base_currency()
+        self._fx: FxRates | None = None
+        self._rate_arrays: dict[tuple[str, str], tuple[Float64Array, Float64Array]] = {}
+
+        # Currency dimension: code of every currency seen in a loaded log (NULL is the base currency)
+        self._currency_codes: dict[str, int] = {self._base_currency: 0}
+        self._currency_names: list[str] = [self._base_currency]
+
+        # Entity dimension: owner and EXPENSE flag of every entity seen in a loaded log
+        self._entity_owner: dict[int, int] = {}
+        self._expense_entities: set[int] = set()
+
+        # Expense postings (one per expense side of a log), column by column
+        self._owner: Int64Array = _empty()
+        self._amount: Int64Array = _empty()
+        self._catalog: Int64Array = _empty()
+        self._counterparty_owner: Int64Array = _empty()
+        self._created_at: Int64Array = _empty()
+        self._month: Int64Array = _empty()
+        self._currency: Int64Array = _empty()
+
+    @property
+    def last_log_id(self) -> int:
+        """Highest TransactionLog ID loaded so far."""
+        return self._last_log_id
+
+    @property
+    def log_count(self) -> int:
+        """Number of logs loaded so far."""
+        return self._log_count
+
+    # --- 1. LOADING ---
+
+    async def refresh(self) -> int:
+        """
+        Appends the logs posted since the last refresh.
+
+        Returns:
+            The number of logs loaded.
+        """
+        async with self._refresh_lock, self._session_factory() as session:
+            loaded = 0
+            # Only advanced together with the columns, so a refresh that fails midway reloads its chunks.
+            last_log_id = self._last_log_id
+            ledger_repo = LedgerRepository(session)
+            account_repo = AccountRepository(session)
+            self._fx = await FxRateRepository(session).get_rates()
+            self._rate_arrays = {}
+            parts: list[tuple[Int64Array, ...]] = []
+            async for chunk in ledger_repo.stream_logs(
+                _LOADED_COLUMNS, after_id=last_log_id, yield_per=self._chunk_size
+            ):
+                await self._load_entities(account_repo, chunk)
+                parts.append(self._expense_postings(chunk))
+                last_log_id = chunk[-1][0]
+                loaded += len(chunk)
+
+        if parts:
+            columns = zip(
+                (self._owner, self._amount, self._catalog, self._counterparty_owner, self._created_at, self._currency),
+                *parts,
+                strict=True,
+            )
+            (
+                self._owner,
+                self._amount,
+                self._catalog,
+                self._counterparty_owner,
+                self._created_at,
+                self._currency,
+            ) = (np.concatenate(column) for column in columns)
+            self._month = _months(self._created_at)
+        self._last_log_id = last_log_id
+        self._log_count += loaded
+        return loaded
+
+    async def follow(self, stop: asyncio.Event, resync_interval: timedelta | None = None) -> None:
+        """
+        Background loop: refreshes once, then again whenever the ledger change feed reports
+        committed postings, and every `resync_interval` (default: the change feed's) for
+        postings made by other processes. Runs until `stop` is set.
+        """
+        timeout = (resync_interval or get_change_feed_resync_interval()).total_seconds()
+        with ledger_change_feed.subscribe(get_change_feed_queue_size()) as subscription:
+            while not stop.is_set():
+                try:
+                    await self.refresh()
+                except Exception:
+                    logger.exception("Analytics refresh failed; retrying on the next change.")
+                await subscription.wait(stop, timeout)
+
+    async def _load_entities(self, account_repo: AccountRepository, chunk: Sequence[Sequence[Any]]) -> None:
+        """Fetches owner and type of the entities in `chunk` that have not been seen yet."""
+        unseen = {entity_id for row in chunk for entity_id in (row[1], row[2], row[4]) if entity_id is not None}
+        unseen -= self._entity_owner.keys()
+        if not unseen:
+            return
+        for entity_id, owner_id, account_type in await account_repo.get_entity_dimensions(unseen):
+            self._entity_owner[entity_id] = owner_id
+            if account_type == AccountType.EXPENSE:
+                self._expense_entities.add(entity_id)
+
+    def _expense_postings(self, chunk: Sequence[Sequence[Any]]) -> tuple[Int64Array, ...]:
+        """
+        Columns (owner, signed amount, catalog, counterparty owner, epoch seconds, currency code)
+        of a chunk's expense sides.
+        """
+        owner: list[int] = []
+        amount: list[int] = []
+        catalog: list[int] = []
+        counterparty_owner: list[int] = []
+        created_at: list[int] = []
+        currency: list[int] = []
+        for _, debit_id, credit_id, value, counterparty_id, catalog_id, timestamp, code in chunk:
+            for entity_id, sign in ((debit_id, 1), (credit_id, -1)):
+                if entity_id not in self._expense_entities:
+                    continue
+                owner.append(self._entity_owner[entity_id])
+                amount.append(sign * to_minor_units(value))
+                catalog.append(NULL_ID if catalog_id is None else catalog_id)
+                counterparty_owner.append(self._entity_owner.get(counterparty_id, NULL_ID))
+                created_at.append(int(utc(timestamp).timestamp()))
+                currency.append(self._currency_code(code or self._base_currency))
+        return tuple(
+            np.array(column, dtype=np.int64)
+            for column in (owner, amount, catalog, counterparty_owner, created_at, currency)
+        )
+
+    def _currency_code(self, currency: str) -> int:
+        code = self._currency_codes.get(currency)
+        if code is None:
+            code = self._currency_codes[currency] = len(self._currency_names)
+            self._currency_names.append(currency)
+        return code
+
+    # --- 2. REPORTS ---
+
+    def spending(
+        self,
+        group_by: str,
+        user_id: int | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        catalog_id: int | None = None,
+        currency: str | None = None,
+    ) -> dict[Any, Decimal]:
+        """
+        Net spending (expense debits - refunds) per group, over the loaded logs, in
+        `currency` (default: the base currency). Postings in other currencies are
+        converted at the rate in effect when they were created.
+
+        Groups: "catalog" (expense_catalog_id, None if unset), "month" ("YYYY-MM", UTC),
+        "counterparty" (counterparty's user ID, None if unset) or "user" (spender).
+        Filters combine with AND; `since` is inclusive and `until` exclusive.
+
+        Raises:
+            ValueError: If `group_by` is unknown, or a posting has no exchange rate into
+                        `currency` at its creation time.
+        """
+        keys, labels = self._group_keys(group_by)
+        mask = np.ones(len(self._amount), dtype=bool)
+        if user_id is not None:
+            mask &= self._owner == user_id
+        if since is not None:
+            mask &= self._created_at >= int(utc(since).timestamp())
+        if until is not None:
+            mask &= self._created_at < int(utc(until).timestamp())
+        if catalog_id is not None:
+            mask &= self._catalog == catalog_id
+
+        amounts = self._converted(mask, (currency or self._base_currency).upper())
+        group_keys, sums = _group_sum(keys[mask], amounts)
+        return {labels(key): from_minor_units(int(total)) for key, total in zip(group_keys, sums, strict=True)}
+
+    def total_spending(
+        self,
+        user_id: int | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        currency: str | None = None,
+    ) -> Decimal:
+        """Net spending over the loaded logs, with the same filters and currency as spending()."""
+        return sum(self.spending("user", user_id, since, until, currency=currency).values(), Decimal(0))
+
+    def _converted(self, mask: NDArray[np.bool_], currency: str) -> Int64Array:
+        """The masked postings' amounts (minor units) in `currency`, rounded half to even."""
+        amounts = self._amount[mask]
+        codes = self._currency[mask]
+        foreign = codes != self._currency_codes.get(currency, NULL_ID)
+        if not foreign.any():
+            return amounts
+
+        amounts = amounts.copy()
+        created_at = self._created_at[mask]
+        foreign_codes: list[int] = np.unique(codes[foreign]).tolist()
+        for code in foreign_codes:
+            rows = codes == code
+            rates = self._rates_at(self._currency_names[code], currency, created_at[rows])
+            amounts[rows] = np.rint(amounts[rows] * rates).astype(np.int64)
+        return amounts
+
+    def _rates_at(self, base: str, quote: str, timestamps: Int64Array) -> Float64Array:
+        """Rates of a pair in effect at each timestamp: one searchsorted() over the pair's history."""
+        if base == quote:
+            return np.ones(len(timestamps))
+        arrays = self._rate_arrays.get((base, quote))
+        if arrays is None:
+            series = self._fx.series(base, quote) if self._fx is not None else None
+            if series is None:
+                pivot = self._base_currency
+                if pivot in (base, quote):
+                    raise ValueError(f"No {base}/{quote} exchange rates loaded.")
+                return self._rates_at(base, pivot, timestamps) * self._rates_at(pivot, quote, timestamps)
+            arrays = self._rate_arrays[(base, quote)] = (
+                np.array(series[0], dtype=np.float64),
+                np.array(series[1], dtype=np.float64),
+            )
+        times, rates = arrays
+        index = np.searchsorted(times, timestamps, side="right") - 1
+        if (index < 0).any():
+            earliest = np.datetime64(int(timestamps[index < 0].min()), "s")
+            raise ValueError(f"No {base}/{quote} exchange rate in effect at {earliest}.")
+        return rates[index]
+
+    def _group_keys(self, group_by: str) -> tuple[Int64Array, Callable[[Any], Any]]:
+        """The int64 key column for a grouping and the function turning a key into its report label."""
+        if group_by == "catalog":
+            return self._catalog, _nullable_id
+        if group_by == "counterparty":
+            return self._counterparty_owner, _nullable_id
+        if group_by == "user":
+            return self._owner, int
+        if group_by == "month":
+            return self._month, lambda key: str(np.datetime64(int(key), "M"))
+        raise ValueError(f"Unknown grouping '{group_by}'; expected one of: {', '.join(SPENDING_GROUPS)}.")
+
+
+def _nullable_id(key: Any) -> int | None:
+    return None if key == NULL_ID else int(key)
+
+
+def _group_sum(keys: Int64Array, values: Int64Array) -> tuple[Int64Array, Int64Array]:
+    """Exact int64 sums of `values` per distinct key (sort, then reduce each run of equal keys)."""
+    if not len(keys):
+        return _empty(), _empty()
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(sorted_keys)) + 1))
+    return sorted_keys[starts], np.add.reduceat(values[order], starts)
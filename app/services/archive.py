@@ -0,0 +1,177 @@
+"""
+Ledger Archival 🧊
+
+Moves settled history out of transaction_logs into transaction_log_archive, so the
+hot table (and every index on it) is bounded by the active window rather than by
+the age of the ledger.
+
+---
+DESIGN:
+- A user is archivable at a cutoff if all of their AR, AP and UR balances were
+  zero at that point. Archival takes ALL of such a user's logs created before
+  the cutoff, never a subset, so each entity's archived logs form one prefix of
+  its history.
+- Users who share a batch are archived together or not at all: batches are never
+  split. A group with any unsettled user stays hot as a whole.
+- When balance snapshots exist, logs past the latest snapshot's high-water mark
+  stay hot, so every archived log is already covered by a snapshot.
+- Each moved entity's net is added to its OpeningBalance in the same transaction
+  that moves the logs. "Opening balance + remaining logs" stays equal to the full
+  ledger, so balance rebuilds, drift checks, snapshots and status rebuilds stay
+  correct.
+- Archived history remains readable on demand through
+  `log_source(..., include_archived=True)` and the repositories'
+  `include_archived` flags.
+- Archival reads only the main table. On SQLite, closed periods that were moved
+  into attached partition files (app.db.partitioning) are already cold storage
+  and are not archived again.
+"""
+
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.amounts import to_decimal
+from app.core.datetime import utc, utc_now
+from app.db.partitioning import has_attached_partitions
+from app.repositories import ArchivedTotals, BalanceSnapshotRepository, LedgerArchiveRepository
+
+logger = logging.getLogger(__name__)
+
+_NO_TOTALS = ArchivedTotals(Decimal(0), 0, 0, 0)
+
+
+class ArchivePlan(NamedTuple):
+    """Which users' history before `cutoff` can move to cold storage."""
+
+    cutoff: datetime
+    user_ids: frozenset[int]
+    blocked_user_ids: frozenset[int]  # Unsettled, or sharing batches with unsettled users
+
+
+class ArchiveStats(NamedTuple):
+    users: int
+    logs: int
+    entities: int
+
+
+class _UserGroups:
+    """Union-find over users: users that appear in the same batch end up in one group."""
+
+    def __init__(self) -> None:
+        self._parent: dict[int, int] = {}
+
+    def find(self, user_id: int) -> int:
+        root = self._parent.setdefault(user_id, user_id)
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while user_id != root:  # Path compression
+            self._parent[user_id], user_id = root, self._parent[user_id]
+        return root
+
+    def union(self, first: int, second: int) -> None:
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self._parent[second] = first
+
+    def members(self) -> set[int]:
+        return set(self._parent)
+
+
+class LedgerArchiveService:
+    """Plans and runs the archival of settled ledger history. Must not run concurrently with itself."""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], chunk_size: int = 5_000):
+        self._session_factory = session_factory
+        self._chunk_size = chunk_size
+
+    async def plan(self, cutoff: datetime) -> ArchivePlan:
+        """
+        Finds the users whose history before `cutoff` can be archived.
+
+        Raises:
+            ValueError: If the cutoff is in the future or falls into periods already moved
+                        to attached SQLite partitions.
+        """
+        cutoff = utc(cutoff)
+        if cutoff > utc_now():
+            raise ValueError("The archival cutoff must not be in the future.")
+
+        async with self._session_factory() as session:
+            if has_attached_partitions(await session.connection(), until=cutoff):
+                raise ValueError("Logs before the cutoff were moved to attached partitions; archive those instead.")
+
+            repo = LedgerArchiveRepository(session)
+            unsettled = await repo.get_unsettled_user_ids(cutoff)
+            snapshot_log_id = await BalanceSnapshotRepository(session).get_last_snapshot_log_id()
+
+            groups = _UserGroups()
+            pinned: set[int] = set()
+            current_batch, batch_owner = None, 0
+            async for rows in repo.stream_batch_owners(cutoff, snapshot_log_id or None, self._chunk_size):
+                for batch_id, debit_owner, credit_owner, is_pinned in rows:
+                    # Rows arrive in batch order: linking every log to the batch's first owner joins the batch's users.
+                    if batch_id != current_batch:
+                        current_batch, batch_owner = batch_id, debit_owner
+                    groups.union(batch_owner, debit_owner)
+                    groups.union(batch_owner, credit_owner)
+                    if is_pinned:
+                        pinned.add(debit_owner)
+
+        users = groups.members()
+        blocked_groups = {groups.find(user_id) for user_id in (unsettled | pinned) & users}
+        archivable = {user_id for user_id in users if groups.find(user_id) not in blocked_groups}
+        return ArchivePlan(cutoff, frozenset(archivable), frozenset(users - archivable))
+
+    async def archive(self, cutoff: datetime, dry_run: bool = False) -> ArchiveStats:
+        """
+        Moves the archivable users' logs created before `cutoff` into cold storage, one
+        transaction per chunk of logs. An interrupted run leaves balances correct; running
+        it again with the same cutoff finishes the move.
+
+        Returns:
+            How many users, logs and entities were (or, with `dry_run`, would be) archived.
+        """
+        plan = await self.plan(cutoff)
+        logger.info(
+            f"Archiving history before {plan.cutoff.isoformat()} for {len(plan.user_ids)} users "
+            f"({len(plan.blocked_user_ids)} users kept hot)."
+        )
+
+        moved_logs = 0
+        entities: set[int] = set()
+        after_id = 0
+        while True:
+            async with self._session_factory() as session, session.begin():
+                repo = LedgerArchiveRepository(session)
+                rows = await repo.get_log_chunk(plan.cutoff, after_id, self._chunk_size)
+                if not rows:
+                    break
+                after_id = rows[-1][0]
+
+                log_ids: list[int] = []
+                totals: dict[int, ArchivedTotals] = {}
+                for log_id, batch_id, debit_id, credit_id, amount, debit_owner in rows:
+                    if debit_owner not in plan.user_ids:
+                        continue
+                    log_ids.append(log_id)
+                    amount = to_decimal(amount)
+                    for entity_id, signed in ((debit_id, amount), (credit_id, -amount)):
+                        previous = totals.get(entity_id, _NO_TOTALS)
+                        totals[entity_id] = ArchivedTotals(
+                            previous.balance + signed,
+                            previous.log_count + 1,
+                            max(previous.last_log_id, log_id),
+                            max(previous.last_transaction_batch_id, batch_id),
+                        )
+
+                if log_ids and not dry_run:
+                    await repo.move_logs(log_ids)
+                    await repo.add_opening_balances(totals, plan.cutoff)
+                moved_logs += len(log_ids)
+                entities.update(totals)
+
+        return ArchiveStats(users=len(plan.user_ids), logs=moved_logs, entities=len(entities))
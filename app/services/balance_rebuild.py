@@ -0,0 +1,189 @@
+"""
+Ledger Replay Balance Rebuild ♻️
+
+Recomputes every AccountEntity balance from the TransactionLog (Debits - Credits)
+and repairs the current_balance cache where it drifted.
+
+---
+DESIGN:
+- The log's primary-key range is split into slices that a process pool sums in
+  parallel. Each worker streams its slice in id-ordered keyset chunks (a PK range
+  scan) and returns per-entity partial sums; the parent merges them. The ledger is
+  read exactly once in total, whatever the entity distribution.
+- Accumulation runs on the stored integer minor units (exact, and much cheaper
+  than Decimal); sums are converted to Decimal once, at the end.
+- Only drifted entities are written back, with CASE-based bulk UPDATEs.
+- Postings must be paused while a rebuild runs: the sums and the cache are read
+  at different moments and cannot be compared under concurrent writes.
+"""
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import NamedTuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.core.amounts import from_minor_units, to_decimal, to_minor_units
+from app.db.partitioning import install_log_partitions, log_source
+from app.models.types import minor_units
+from app.repositories import AccountRepository, LedgerArchiveRepository
+
+logger = logging.getLogger(__name__)
+
+
+class BalanceDrift(NamedTuple):
+    """An entity whose cached balance disagrees with the ledger."""
+
+    entity_id: int
+    cached_balance: Decimal
+    ledger_balance: Decimal
+
+    @property
+    def difference(self) -> Decimal:
+        return self.ledger_balance - self.cached_balance
+
+
+# --- Worker Process Side ---
+
+
+async def _sum_log_range(url: str, first_id: int, last_id: int, chunk_size: int) -> dict[int, int]:
+    """Per-entity balance deltas, in minor units, of the logs with first_id <= id <= last_id."""
+    engine = create_async_engine(url)
+    install_log_partitions(engine)
+    balances: defaultdict[int, int] = defaultdict(int)
+    try:
+        async with engine.connect() as conn:
+            logs = log_source(conn)
+            cursor = first_id - 1
+            while cursor < last_id:
+                stmt = (
+                    select(
+                        logs.id, logs.debit_account_entity_id, logs.credit_account_entity_id, minor_units(logs.amount)
+                    )
+                    .where(logs.id > cursor, logs.id <= last_id)
+                    .order_by(logs.id)
+                    .limit(chunk_size)
+                )
+                rows = (await conn.execute(stmt)).all()
+                if not rows:
+                    break
+                for _, debit_id, credit_id, amount in rows:
+                    balances[debit_id] += amount
+                    balances[credit_id] -= amount
+                cursor = rows[-1][0]
+    finally:
+        await engine.dispose()
+    return dict(balances)
+
+
+def _sum_log_range_in_process(url: str, first_id: int, last_id: int, chunk_size: int) -> dict[int, int]:
+    """Process pool entry point: each worker runs its own event loop and engine."""
+    return asyncio.run(_sum_log_range(url, first_id, last_id, chunk_size))
+
+
+# --- Coordinator ---
+
+
+class BalanceRebuildService:
+    """
+    Replays the whole ledger across a process pool and repairs drifted balance caches.
+    """
+
+    # Slices per worker: smaller slices even out workers that hit denser ID ranges.
+    _SLICES_PER_WORKER = 4
+
+    def __init__(self, engine: AsyncEngine, workers: int | None = None, chunk_size: int = 50_000):
+        """
+        Args:
+            engine: Engine of the database to rebuild, with install_log_partitions() applied
+                    if the log is partitioned. Workers open their own engines on the same
+                    URL, so it must not be an in-memory database.
+            workers: Size of the process pool (default: CPU count).
+            chunk_size: Logs fetched per round trip by each worker.
+        """
+        self._engine = engine
+        self._workers = workers or os.cpu_count() or 1
+        self._chunk_size = chunk_size
+        self._session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def compute_ledger_balances(self) -> dict[int, Decimal]:
+        """
+        Returns the balance of every entity that appears in the log, computed from the log
+        alone (plus the opening balances that summarize archived logs).
+        """
+        # Archived history is summarized per entity (see app.services.archive).
+        async with self._session_factory() as session:
+            openings = await LedgerArchiveRepository(session).get_opening_balances()
+        balances: defaultdict[int, int] = defaultdict(
+            int, {entity_id: to_minor_units(balance) for entity_id, balance in openings.items()}
+        )
+        async with self._engine.connect() as conn:
+            logs = log_source(conn)
+            first_id, last_id = (await conn.execute(select(func.min(logs.id), func.max(logs.id)))).one()
+        if first_id is None:
+            return {entity_id: from_minor_units(units) for entity_id, units in balances.items()}
+
+        slice_count = self._workers * self._SLICES_PER_WORKER
+        slice_size = max(1, -(-(last_id - first_id + 1) // slice_count))
+        url = self._engine.url.render_as_string(hide_password=False)
+
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=self._workers) as pool:
+            partials = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        pool,
+                        _sum_log_range_in_process,
+                        url,
+                        start,
+                        min(start + slice_size - 1, last_id),
+                        self._chunk_size,
+                    )
+                    for start in range(first_id, last_id + 1, slice_size)
+                )
+            )
+
+        for partial in partials:
+            for entity_id, delta in partial.items():
+                balances[entity_id] += delta
+        return {entity_id: from_minor_units(units) for entity_id, units in balances.items()}
+
+    async def find_drift(self) -> list[BalanceDrift]:
+        """Compares every cached balance with the ledger; returns the mismatches in entity ID order."""
+        ledger_balances = await self.compute_ledger_balances()
+        async with self._session_factory() as session:
+            cached = await AccountRepository(session).get_all_balances()
+
+        drifts: list[BalanceDrift] = []
+        for entity_id, cached_balance in sorted(cached):
+            cached_balance = to_decimal(cached_balance)
+            ledger_balance = ledger_balances.get(entity_id, Decimal(0))
+            if cached_balance != ledger_balance:
+                drifts.append(BalanceDrift(entity_id, cached_balance, ledger_balance))
+        return drifts
+
+    async def rebuild(self, dry_run: bool = False) -> list[BalanceDrift]:
+        """
+        Replays the ledger and overwrites every drifted current_balance in one transaction.
+
+        Returns:
+            The drifted entities (as found before the repair).
+        """
+        drifts = await self.find_drift()
+        for drift in drifts:
+            logger.warning(
+                f"Balance drift on entity {drift.entity_id}: cached {drift.cached_balance}, "
+                f"ledger {drift.ledger_balance} (difference {drift.difference})"
+            )
+
+        if drifts and not dry_run:
+            async with self._session_factory() as session, session.begin():
+                await AccountRepository(session).set_balances(
+                    {drift.entity_id: drift.ledger_balance for drift in drifts}
+                )
+        return drifts
@@ -0,0 +1,119 @@
+"""
+Change Feed Consumers 📣
+
+Runs a named consumer over every ledger posting, exactly once, in log order:
+first the backlog after its durable cursor, then each new posting as soon as the
+in-process change feed (app.core.change_feed) reports its commit.
+
+---
+DESIGN:
+- The cursor is the highest TransactionLog.id handled, stored in
+  change_feed_cursors. Each chunk of logs is handed to the consumer together with
+  a session whose transaction also advances the cursor, so the consumer's own
+  writes and its progress commit (or roll back) together.
+- The consumer subscribes BEFORE its first read, so nothing committed between
+  the catch-up and the first wake-up is missed. Wake-ups are coalesced: all
+  pending changes trigger one read from the cursor, and dropped changes (a full
+  subscriber queue) need no special handling since the read covers them.
+- Without wake-ups (postings from other processes), the cursor is re-read every
+  resync interval instead of polling MAX(id) on a short timer.
+- TransactionLog IDs are assigned when rows are inserted, so with concurrent
+  writers on PostgreSQL or MySQL a lower ID can commit after a higher one has been
+  read. The cursor therefore stops before a missing ID until it has been missing
+  for `settle_delay` (app.core.ledger.LogIdGaps, as balance snapshots do); a zero
+  delay opts out and may skip such late commits.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Sequence
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_change_feed_queue_size, get_change_feed_resync_interval, get_change_feed_settle_delay
+from app.core.change_feed import LedgerChangeFeed, ledger_change_feed
+from app.core.ledger import LogIdGaps
+from app.repositories import ChangeFeedCursorRepository, LedgerRepository
+
+logger = logging.getLogger(__name__)
+
+# Receives one chunk of logs (rows of the consumer's columns, id first) in the transaction that advances its cursor.
+ChangeHandler = Callable[[AsyncSession, Sequence[Sequence[Any]]], Awaitable[None]]
+
+
+class ChangeFeedConsumer:
+    """Feeds committed ledger postings to a handler, resuming from a durable cursor."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        name: str,
+        columns: Sequence[str],
+        chunk_size: int = 10_000,
+        settle_delay: timedelta | None = None,
+        feed: LedgerChangeFeed | None = None,
+        max_pending: int | None = None,
+        resync_interval: timedelta | None = None,
+    ):
+        """
+        Args:
+            name: The consumer's unique name; its cursor is stored under it.
+            columns: TransactionLog columns handed to the handler; "id" is prepended if missing.
+            settle_delay: How long a missing log ID holds the cursor back (see DESIGN).
+        """
+        self._session_factory = session_factory
+        self._name = name
+        self._columns = tuple(columns) if columns and columns[0] == "id" else ("id", *columns)
+        self._chunk_size = chunk_size
+        self._settle_delay = settle_delay if settle_delay is not None else get_change_feed_settle_delay()
+        self._gaps = LogIdGaps(self._settle_delay)
+        self._feed = feed or ledger_change_feed
+        self._max_pending = max_pending or get_change_feed_queue_size()
+        self._resync_interval = resync_interval or get_change_feed_resync_interval()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    async def catch_up(self, handle: ChangeHandler) -> int:
+        """
+        Hands every log after the cursor to `handle`, one chunk (and one transaction) at a time.
+
+        Returns:
+            The number of logs handled.
+        """
+        handled = 0
+        while True:
+            async with self._session_factory() as session, session.begin():
+                cursor = await ChangeFeedCursorRepository(session).get_cursor(self._name)
+                rows = await LedgerRepository(session).get_logs_after(self._columns, cursor, self._chunk_size)
+                rows = rows[: self._gaps.settled(cursor, [row[0] for row in rows])]
+                if not rows:
+                    return handled
+                await handle(session, rows)
+                await ChangeFeedCursorRepository(session).save_cursor(self._name, rows[-1][0])
+            handled += len(rows)
+            if len(rows) < self._chunk_size:
+                return handled
+
+    async def run(self, handle: ChangeHandler, stop: asyncio.Event) -> None:
+        """
+        Background loop: catches up, then handles new postings as the change feed reports
+        them (or every resync interval). Runs until `stop` is set; a failed chunk is
+        retried on the next wake-up or resync.
+        """
+        with self._feed.subscribe(self._max_pending) as subscription:
+            while not stop.is_set():
+                try:
+                    await self.catch_up(handle)
+                except Exception:
+                    logger.exception(f"Change feed consumer {self._name!r} failed; retrying on the next change.")
+
+                timeout = self._resync_interval.total_seconds()
+                if self._settle_delay:
+                    timeout = min(timeout, self._settle_delay.total_seconds())
+                delivery = await subscription.wait(stop, timeout)
+                if delivery.dropped:
+                    logger.debug(f"Change feed consumer {self._name!r} fell behind by {delivery.dropped} changes.")
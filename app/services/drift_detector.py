@@ -0,0 +1,160 @@
+"""
+Online Balance Drift Detector 🔍
+
+Continuously verifies a sample of AccountEntity balance caches against the ledger,
+as a cheap complement to the full replay in app.services.balance_rebuild.
+
+---
+DESIGN:
+- Each run samples recently touched entities (most likely to be wrong) and random
+  ones (to eventually cover dormant entities).
+- An entity's ledger balance is its latest snapshot plus the logs posted since, so a
+  check costs one entity's activity within a snapshot interval, not its whole history.
+  The cached balance and that log tail are read in a single statement.
+- Checks are throttled twice: a semaphore bounds the connections held at once and a
+  rate limiter spaces out check starts, so posting traffic keeps priority.
+- Results go to the process-wide metrics registry (app.core.metrics) and the log.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from datetime import timedelta
+from decimal import Decimal
+from typing import NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import (
+    get_drift_check_concurrency,
+    get_drift_check_interval,
+    get_drift_check_rate,
+    get_drift_check_sample_size,
+)
+from app.core.amounts import to_decimal
+from app.core.metrics import MetricsRegistry, metrics
+from app.repositories import AccountRepository, BalanceSnapshotRepository, LedgerRepository
+from app.services.balance_rebuild import BalanceDrift
+
+logger = logging.getLogger(__name__)
+
+
+class DriftCheckStats(NamedTuple):
+    """Outcome of one sampled drift check."""
+
+    entities_checked: int
+    drifts: list[BalanceDrift]
+    elapsed_seconds: float
+
+
+class _RateLimiter:
+    """Spaces out acquisitions so at most `rate` happen per second."""
+
+    def __init__(self, rate: float):
+        self._interval = 1 / rate
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next_slot - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_slot = max(self._next_slot, loop.time()) + self._interval
+
+
+class BalanceDriftDetector:
+    """
+    Samples AccountEntity rows and compares their cached balance with the ledger.
+    """
+
+    # Number of latest logs whose entities count as "recently touched"
+    _RECENT_LOG_WINDOW = 1000
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        sample_size: int | None = None,
+        concurrency: int | None = None,
+        rate: float | None = None,
+        registry: MetricsRegistry = metrics,
+    ):
+        self._session_factory = session_factory
+        concurrency = concurrency if concurrency is not None else get_drift_check_concurrency()
+        rate = rate if rate is not None else get_drift_check_rate()
+        if concurrency < 1 or not rate > 0:
+            raise ValueError("Drift checks need a positive concurrency and rate.")
+        self._sample_size = sample_size if sample_size is not None else get_drift_check_sample_size()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._rate_limiter = _RateLimiter(rate)
+        self._metrics = registry
+
+    async def check_sample(self) -> DriftCheckStats:
+        """Runs one sampled check and records its stats in the metrics registry."""
+        started = time.perf_counter()
+        entity_ids = await self._sample_entity_ids()
+        results = await asyncio.gather(*(self._check_throttled(entity_id) for entity_id in entity_ids))
+        drifts = [drift for drift in results if drift is not None]
+        stats = DriftCheckStats(len(entity_ids), drifts, time.perf_counter() - started)
+
+        self._metrics.increment("ledger.drift_check.entities_checked", stats.entities_checked)
+        self._metrics.increment("ledger.drift_check.drift_found", len(drifts))
+        self._metrics.set_gauge("ledger.drift_check.last_run_drift_found", len(drifts))
+        self._metrics.observe_duration("ledger.drift_check.run_seconds", stats.elapsed_seconds)
+        for drift in drifts:
+            logger.error(
+                f"Balance drift on entity {drift.entity_id}: cached {drift.cached_balance}, "
+                f"ledger {drift.ledger_balance} (difference {drift.difference})"
+            )
+        logger.info(
+            f"Drift check: {stats.entities_checked} entities checked, {len(drifts)} drifted, "
+            f"{stats.elapsed_seconds:.3f}s"
+        )
+        return stats
+
+    async def check_entity(self, entity_id: int) -> BalanceDrift | None:
+        """Verifies one entity; returns its drift, or None if the cache matches the ledger."""
+        async with self._session_factory() as session:
+            snapshot = await BalanceSnapshotRepository(session).get_latest_snapshot(entity_id)
+            base_balance = to_decimal(snapshot.balance) if snapshot else Decimal(0)
+            after_log_id = snapshot.last_log_id if snapshot else 0
+
+            cached_balance, log_delta = await LedgerRepository(session).get_cached_balance_and_log_delta(
+                entity_id, after_log_id
+            )
+
+        ledger_balance = base_balance + log_delta
+        if cached_balance == ledger_balance:
+            return None
+        return BalanceDrift(entity_id, cached_balance, ledger_balance)
+
+    async def run(self, stop: asyncio.Event, interval: timedelta | None = None) -> None:
+        """Background loop: one sampled check per `interval` until `stop` is set."""
+        interval = interval or get_drift_check_interval()
+        while not stop.is_set():
+            try:
+                await self.check_sample()
+            except Exception:
+                self._metrics.increment("ledger.drift_check.failed_runs")
+                logger.exception("Balance drift check failed; retrying after the interval.")
+
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(stop.wait(), timeout=interval.total_seconds())
+
+    async def _sample_entity_ids(self) -> list[int]:
+        """Half recently touched entities, topped up with random ones."""
+        async with self._session_factory() as session:
+            recent = await LedgerRepository(session).get_recently_touched_entity_ids(self._RECENT_LOG_WINDOW)
+            sample = dict.fromkeys(recent[: self._sample_size // 2])
+            for entity_id in await AccountRepository(session).sample_entity_ids(self._sample_size):
+                if len(sample) >= self._sample_size:
+                    break
+                sample.setdefault(entity_id)
+        return list(sample)
+
+    async def _check_throttled(self, entity_id: int) -> BalanceDrift | None:
+        async with self._semaphore:
+            await self._rate_limiter.acquire()
+            return await self.check_entity(entity_id)
@@ -0,0 +1,99 @@
+"""
+Idempotent Posting 🔑
+
+Posts a batch under a client-supplied idempotency key, so a retried submission
+(e.g., a mobile client that lost the response) returns the original batch ID
+instead of posting the expense twice.
+
+---
+DESIGN:
+- The key row is inserted in the same transaction as the batch, before its logs.
+  Two concurrent submissions of one key race on its primary key; the loser
+  returns the winner's batch instead. On PostgreSQL and MySQL the key and logs
+  share a SAVEPOINT, since a failed statement there aborts (or may abort) the
+  transaction. SQLite skips it: pysqlite does not open a transaction before a
+  SAVEPOINT (so releasing it would commit), and a failed INSERT there only
+  undoes itself.
+- A key replayed with different content is rejected rather than silently
+  returning a batch that does not match the request.
+- Recently used keys are answered from a per-process LRU without a query
+  (app.repositories.idempotency); expired keys are swept in bulk. A key reused
+  after it expired but before the sweep replaces its old row inside the savepoint.
+"""
+
+import contextlib
+from collections.abc import Sequence
+from datetime import timedelta
+from typing import NamedTuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_idempotency_key_ttl
+from app.core.ledger import TransactionLogLike, batch_fingerprint
+from app.exceptions import ConflictError
+from app.repositories import AccountRepository, IdempotencyRecord, IdempotencyRepository, LedgerRepository
+
+
+class PostingResult(NamedTuple):
+    """Outcome of an idempotent posting."""
+
+    transaction_batch_id: int
+    replayed: bool  # True if the key had already been posted and nothing new was written
+
+
+class IdempotentPostingService:
+    """Records batches at most once per idempotency key."""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        ledger_repo: LedgerRepository,
+        account_repo: AccountRepository,
+        idempotency_repo: IdempotencyRepository,
+        ttl: timedelta | None = None,
+    ):
+        self._session = session
+        self._ledger_repo = ledger_repo
+        self._account_repo = account_repo
+        self._idempotency_repo = idempotency_repo
+        self._ttl = ttl or get_idempotency_key_ttl()
+
+    async def post(self, idempotency_key: str, logs: Sequence[TransactionLogLike]) -> PostingResult:
+        """
+        Records one pre-validated batch and its balance changes in the caller's
+        transaction, unless the key was already used.
+
+        Raises:
+            ConflictError: If the key was already used for a batch with different content.
+        """
+        fingerprint = batch_fingerprint(logs)
+        existing = await self._idempotency_repo.get(idempotency_key)
+        if existing is not None:
+            return self._replay(idempotency_key, existing, fingerprint)
+
+        conn = await self._session.connection()
+        savepoint = contextlib.nullcontext() if conn.dialect.name == "sqlite" else self._session.begin_nested()
+        try:
+            async with savepoint:
+                # The key goes first: a concurrent holder of the same key blocks us here (or fails us) before any work.
+                batch_id = await self._ledger_repo.get_next_batch_id()
+                await self._idempotency_repo.add(idempotency_key, batch_id, fingerprint, self._ttl)
+                await self._ledger_repo.record_batches([logs], batch_ids=[batch_id])
+                await self._account_repo.apply_log_deltas(logs)
+        except IntegrityError:
+            existing = await self._idempotency_repo.get(idempotency_key)
+            if existing is None:
+                raise
+            return self._replay(idempotency_key, existing, fingerprint)
+        return PostingResult(batch_id, replayed=False)
+
+    async def sweep_expired(self) -> int:
+        """Deletes expired keys in the caller's transaction; returns how many were deleted."""
+        return await self._idempotency_repo.delete_expired()
+
+    @staticmethod
+    def _replay(idempotency_key: str, record: IdempotencyRecord, fingerprint: str) -> PostingResult:
+        if record.fingerprint != fingerprint:
+            raise ConflictError(f"Idempotency key '{idempotency_key}' was already used for a different submission.")
+        return PostingResult(record.transaction_batch_id, replayed=True)
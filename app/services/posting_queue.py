@@ -0,0 +1,161 @@
+"""
+Group-Commit Posting Queue 🚚
+
+Coalesces concurrent postings into shared database transactions. Callers await
+`post(logs)` as if they had their own transaction; a single background worker
+commits everything that arrived within a few milliseconds together, so N postings
+cost one transaction (and, on SQLite, one write lock) instead of N.
+
+---
+DESIGN:
+- One worker per queue takes the first waiting posting, waits up to `max_delay`
+  for more, then commits up to `max_batches` of them with record_batches() (one
+  batch ID each) and a single apply_log_deltas() for all their balance changes.
+- Each caller's future resolves with its own batch ID once the group commits.
+- If the group transaction fails, its postings are retried one transaction each,
+  so only the postings that fail on their own receive an error.
+- A caller that stops waiting (e.g., cancelled) does not withdraw its posting.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Sequence
+from datetime import timedelta
+from typing import NamedTuple, Self
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_posting_queue_max_batches, get_posting_queue_max_delay
+from app.core.ledger import TransactionLogLike
+from app.core.metrics import MetricsRegistry, metrics
+from app.repositories import AccountRepository, LedgerRepository
+
+logger = logging.getLogger(__name__)
+
+
+class _Posting(NamedTuple):
+    logs: Sequence[TransactionLogLike]
+    future: asyncio.Future[int]
+
+
+class PostingQueue:
+    """
+    Posts pre-validated batches (Debit = Credit is checked by the Service Layer)
+    through group commits. Use as `async with PostingQueue(...) as queue:` or call
+    start() and close().
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_delay: timedelta | None = None,
+        max_batches: int | None = None,
+        registry: MetricsRegistry = metrics,
+    ):
+        self._session_factory = session_factory
+        self._max_delay = (max_delay if max_delay is not None else get_posting_queue_max_delay()).total_seconds()
+        self._max_batches = max_batches or get_posting_queue_max_batches()
+        self._metrics = registry
+        self._queue: asyncio.Queue[_Posting | None] = asyncio.Queue()
+        self._worker: asyncio.Task[None] | None = None
+        self._closing = False
+
+    async def __aenter__(self) -> Self:
+        self.start()
+        return self
+
+    async def __aexit__(self, *_exc_info: object) -> None:
+        await self.close()
+
+    def start(self) -> None:
+        """Starts the background worker on the running event loop."""
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(self._run(), name="posting-queue")
+
+    async def close(self) -> None:
+        """Stops accepting postings, commits the ones already queued, and stops the worker."""
+        if self._worker is None or self._closing:
+            return
+        self._closing = True
+        await self._queue.put(None)
+        await self._worker
+
+    async def post(self, logs: Sequence[TransactionLogLike]) -> int:
+        """
+        Queues one batch and waits until it is committed.
+
+        Returns:
+            The batch's transaction_batch_id.
+
+        Raises:
+            ValueError: If the batch has no logs.
+            RuntimeError: If the queue is not running.
+            Exception: Whatever posting the batch on its own raised.
+        """
+        if not logs:
+            raise ValueError("A batch must contain at least one log.")
+        if self._worker is None or self._closing:
+            raise RuntimeError("PostingQueue is not running.")
+
+        future: asyncio.Future[int] = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Posting(list(logs), future))
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            if self._queue.qsize() < self._max_batches - 1 and self._max_delay > 0:
+                await asyncio.sleep(self._max_delay)
+
+            group = [first]
+            while len(group) < self._max_batches and not self._queue.empty():
+                posting = self._queue.get_nowait()
+                if posting is None:
+                    stopping = True
+                    break
+                group.append(posting)
+            await self._commit(group)
+
+        # Postings queued behind the close marker (posted concurrently with close()) still commit.
+        while not self._queue.empty():
+            posting = self._queue.get_nowait()
+            if posting is not None:
+                await self._commit([posting])
+
+    async def _commit(self, group: list[_Posting]) -> None:
+        """Commits a group in one transaction, falling back to one transaction per posting on failure."""
+        started = time.perf_counter()
+        try:
+            async with self._session_factory() as session, session.begin():
+                batch_ids = await LedgerRepository(session).record_batches([posting.logs for posting in group])
+                await AccountRepository(session).apply_log_deltas(log for posting in group for log in posting.logs)
+        except Exception as exc:
+            if len(group) == 1:
+                self._metrics.increment("ledger.posting_queue.failed_postings")
+                _resolve(group[0].future, exception=exc)
+                return
+            self._metrics.increment("ledger.posting_queue.group_fallbacks")
+            logger.warning(f"Group commit of {len(group)} postings failed ({exc!r}); retrying them one by one.")
+            for posting in group:
+                await self._commit([posting])
+            return
+
+        self._metrics.increment("ledger.posting_queue.postings", len(group))
+        self._metrics.increment("ledger.posting_queue.commits")
+        self._metrics.observe_duration("ledger.posting_queue.commit_seconds", time.perf_counter() - started)
+        for posting, batch_id in zip(group, batch_ids, strict=True):
+            _resolve(posting.future, result=batch_id)
+
+
+def _resolve(future: asyncio.Future[int], result: int = 0, exception: Exception | None = None) -> None:
+    """Settles a caller's future, unless the caller already stopped waiting."""
+    with contextlib.suppress(asyncio.InvalidStateError):
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
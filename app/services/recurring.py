@@ -0,0 +1,183 @@
+"""
+Recurring Expenses 🔁
+
+Defines shared expenses that repeat on a schedule (rent, utilities, ...) and
+materializes every occurrence due in a window as bulk batches. Splitting goes
+through app.services.split (NumPy required: `pip install divvy[analytics]`).
+
+---
+DESIGN:
+- A materialization run is a fixed number of statements however many schedules
+  are due: one query for the due schedules with their participants, one
+  vectorized split, one record_batches() call, one bulk insert of occurrence
+  rows and one bulk UPDATE advancing the schedules.
+- Idempotent per occurrence: the occurrence rows (primary key: schedule and
+  occurrence number) and the advanced next_occurrence commit in the same
+  transaction as the batches. A rerun after a crash finds the schedules exactly
+  where the last committed run left them, and a concurrent run that raced for
+  the same occurrence fails on the primary key and rolls back.
+- Missed occurrences are caught up: every occurrence due on or before the end of
+  the window is posted, oldest first, each as its own batch.
+"""
+
+from collections.abc import Sequence
+from datetime import date
+from decimal import Decimal
+from typing import Any, NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.amounts import to_decimal
+from app.core.datetime import utc_now
+from app.core.recurrence import due_occurrences, occurrence_date
+from app.core.split import Expense, split_expenses
+from app.exceptions import BusinessRuleError
+from app.models.ledger import RecurringExpense, RecurringExpenseParticipant
+from app.repositories import AccountRepository, LedgerRepository, RecurringExpenseRepository
+from app.services.split import SplitService
+
+
+class MaterializeStats(NamedTuple):
+    """Outcome of one materialization run."""
+
+    schedules: int  # Due schedules processed
+    occurrences: int  # Occurrences posted (one batch each)
+    finished: int  # Schedules that reached their end date
+
+
+class RecurringExpenseService:
+    """Creates recurring expenses and posts their due occurrences in bulk."""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        ledger_repo: LedgerRepository,
+        account_repo: AccountRepository,
+        recurring_repo: RecurringExpenseRepository,
+    ):
+        self._session = session
+        self._ledger_repo = ledger_repo
+        self._account_repo = account_repo
+        self._recurring_repo = recurring_repo
+        self._split_service = SplitService(session, ledger_repo, account_repo)
+
+    async def create(
+        self,
+        payer_id: int,
+        amount: Decimal,
+        participant_ids: Sequence[int],
+        interval_unit: str,
+        starts_on: date,
+        interval_count: int = 1,
+        ends_on: date | None = None,
+        split_method: str = "equal",
+        split_values: Sequence[Decimal | int | str] | None = None,
+        expense_catalog_id: int | None = None,
+        narrative: str | None = None,
+    ) -> RecurringExpense:
+        """
+        Defines a recurring expense whose first occurrence is due on `starts_on`.
+
+        Raises:
+            BusinessRuleError: If the schedule or the split is invalid (see occurrence_date()
+                               and split_expenses()), or it ends before it starts.
+        """
+        expense = Expense(payer_id, amount, participant_ids, split_method, split_values, expense_catalog_id, narrative)
+        try:
+            split_expenses([expense])
+            next_due_on = occurrence_date(starts_on, interval_unit, interval_count, 0)
+        except ValueError as exc:
+            raise BusinessRuleError(str(exc)) from exc
+        if ends_on is not None and ends_on < starts_on:
+            raise BusinessRuleError("A recurring expense cannot end before it starts.")
+
+        values = list(split_values) if split_method != "equal" and split_values else None
+        return await self._recurring_repo.add(
+            RecurringExpense(
+                payer_id=payer_id,
+                amount=amount,
+                split_method=split_method,
+                expense_catalog_id=expense_catalog_id,
+                narrative=narrative,
+                interval_unit=interval_unit,
+                interval_count=interval_count,
+                starts_on=starts_on,
+                ends_on=ends_on,
+                next_occurrence=0,
+                next_due_on=next_due_on,
+                is_active=True,
+                participants=[
+                    RecurringExpenseParticipant(
+                        position=position,
+                        user_id=user_id,
+                        split_value=to_decimal(values[position]) if values else None,
+                    )
+                    for position, user_id in enumerate(participant_ids)
+                ],
+            )
+        )
+
+    async def materialize(self, until: date, limit: int | None = None) -> MaterializeStats:
+        """
+        Posts every occurrence due on or before `until` in the caller's transaction, for
+        at most `limit` schedules (default: all due ones; call again until nothing is due).
+
+        Raises:
+            BusinessRuleError: If a stored schedule can no longer be split (e.g., fixed
+                               shares that no longer add up).
+        """
+        schedules = await self._recurring_repo.get_due(until, limit)
+
+        expenses: list[Expense] = []
+        occurrences: list[dict[str, Any]] = []
+        advanced: list[dict[str, Any]] = []
+        finished = 0
+        for schedule in schedules:
+            values = None if schedule.split_method == "equal" else list(schedule.split_values)
+            next_occurrence = schedule.next_occurrence
+            for occurrence, due_on in due_occurrences(
+                schedule.starts_on,
+                schedule.interval_unit,
+                schedule.interval_count,
+                schedule.next_occurrence,
+                until,
+                schedule.ends_on,
+            ):
+                narrative = f"{schedule.narrative or 'Recurring expense'} ({due_on.isoformat()})"
+                expenses.append(
+                    Expense(
+                        schedule.payer_id,
+                        schedule.amount,
+                        schedule.participant_ids,
+                        schedule.split_method,
+                        values,
+                        schedule.expense_catalog_id,
+                        narrative,
+                    )
+                )
+                occurrences.append({"recurring_expense_id": schedule.id, "occurrence": occurrence, "due_on": due_on})
+                next_occurrence = occurrence + 1
+
+            next_due_on = occurrence_date(
+                schedule.starts_on, schedule.interval_unit, schedule.interval_count, next_occurrence
+            )
+            is_active = schedule.ends_on is None or next_due_on <= schedule.ends_on
+            finished += not is_active
+            advanced.append(
+                {
+                    "id": schedule.id,
+                    "next_occurrence": next_occurrence,
+                    "next_due_on": next_due_on,
+                    "is_active": is_active,
+                }
+            )
+
+        if expenses:
+            batch_ids = await self._split_service.post(expenses)
+            now = utc_now()
+            for row, batch_id in zip(occurrences, batch_ids, strict=True):
+                row["transaction_batch_id"] = batch_id
+                row["created_at"] = now
+            await self._recurring_repo.add_occurrences(occurrences)
+        await self._recurring_repo.advance(advanced)
+        return MaterializeStats(schedules=len(schedules), occurrences=len(occurrences), finished=finished)
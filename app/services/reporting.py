@@ -0,0 +1,176 @@
+"""
+Balance Reports 📊
+
+Builds a user's balance sheet and the system trial balance from the cached
+AccountEntity balances, each with a single joined query, and keeps them in the
+process-wide balance_report_cache until a posting that affects them commits.
+
+---
+DESIGN:
+- Balance sheet: one AccountEntity ⨝ Account query for the user's entities,
+  instead of get_user_entities() plus a lazy Account load per entity.
+- Trial balance: one GROUP BY over all entities; per Account, positive balances
+  (Debits - Credits) are totalled as debits and negative ones as credits.
+- Multi-currency: every line carries its entity's currency and totals are kept
+  per currency; amounts in different currencies are never added together.
+- Reports hold plain values, never ORM objects, so a cached report can be served
+  to any session.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable, Mapping, Sequence
+from datetime import timedelta
+from decimal import Decimal
+from typing import NamedTuple
+
+from app.config import get_report_cache_ttl
+from app.core.report_cache import BalanceReportCache, balance_report_cache
+from app.models.ledger import AccountSubType, AccountType
+from app.repositories import AccountRepository
+
+# Types whose balance is naturally a credit (shown as Credits - Debits)
+_CREDIT_NORMAL_TYPES = frozenset({AccountType.LIABILITY, AccountType.EQUITY, AccountType.INCOME})
+
+
+class BalanceSheetLine(NamedTuple):
+    account_entity_id: int
+    account_id: int
+    account_name: str
+    account_type: AccountType
+    sub_type: AccountSubType
+    currency: str
+    balance: Decimal  # In the account's natural sign (a positive AP is money owed)
+
+
+class BalanceSheet(NamedTuple):
+    user_id: int
+    lines: Sequence[BalanceSheetLine]
+    total_assets: Mapping[str, Decimal]  # Per currency
+    total_liabilities: Mapping[str, Decimal]  # Per currency
+
+    @property
+    def net_worth(self) -> dict[str, Decimal]:
+        """Assets minus liabilities, per currency."""
+        return {
+            currency: self.total_assets.get(currency, Decimal(0)) - self.total_liabilities.get(currency, Decimal(0))
+            for currency in self.total_assets.keys() | self.total_liabilities.keys()
+        }
+
+
+class TrialBalanceLine(NamedTuple):
+    account_id: int
+    account_name: str
+    account_type: AccountType
+    sub_type: AccountSubType
+    currency: str
+    debit: Decimal
+    credit: Decimal
+
+
+class TrialBalance(NamedTuple):
+    lines: Sequence[TrialBalanceLine]
+    total_debits: Mapping[str, Decimal]  # Per currency
+    total_credits: Mapping[str, Decimal]  # Per currency
+
+    @property
+    def balanced(self) -> bool:
+        """Whether debits equal credits in every currency."""
+        currencies = self.total_debits.keys() | self.total_credits.keys()
+        return all(
+            self.total_debits.get(currency, Decimal(0)) == self.total_credits.get(currency, Decimal(0))
+            for currency in currencies
+        )
+
+
+def _totals_by_currency[L: (BalanceSheetLine, TrialBalanceLine)](
+    lines: Sequence[L], amount: Callable[[L], Decimal]
+) -> dict[str, Decimal]:
+    totals: defaultdict[str, Decimal] = defaultdict(Decimal)
+    for line in lines:
+        totals[line.currency] += amount(line)
+    return dict(totals)
+
+
+class BalanceReportService:
+    """Serves balance sheets and trial balances, cached until a relevant posting commits."""
+
+    def __init__(
+        self,
+        account_repo: AccountRepository,
+        cache: BalanceReportCache = balance_report_cache,
+        max_age: timedelta | None = None,
+    ):
+        self._account_repo = account_repo
+        self._cache = cache
+        self._max_age = (max_age if max_age is not None else get_report_cache_ttl()).total_seconds()
+
+    async def get_balance_sheet(self, user_id: int) -> BalanceSheet:
+        """Returns the user's balance per AccountEntity, with asset and liability totals."""
+        cached = self._cache.get_user(user_id, self._max_age)
+        if cached is not None:
+            return cached
+
+        tick = self._cache.begin_load()
+        lines: list[BalanceSheetLine] = []
+        for entity_id, account, currency, balance in await self._account_repo.get_user_balances_by_account(user_id):
+            account_type = AccountType(account.account_type)
+            lines.append(
+                BalanceSheetLine(
+                    account_entity_id=entity_id,
+                    account_id=account.id,
+                    account_name=account.account_name,
+                    account_type=account_type,
+                    sub_type=AccountSubType(account.sub_type),
+                    currency=currency,
+                    balance=-balance if account_type in _CREDIT_NORMAL_TYPES else balance,
+                )
+            )
+        sheet = BalanceSheet(
+            user_id=user_id,
+            lines=tuple(lines),
+            total_assets=_totals_by_currency(
+                [line for line in lines if line.account_type == AccountType.ASSET], lambda line: line.balance
+            ),
+            total_liabilities=_totals_by_currency(
+                [line for line in lines if line.account_type == AccountType.LIABILITY], lambda line: line.balance
+            ),
+        )
+        self._cache.put_user(user_id, (line.account_entity_id for line in lines), sheet, tick)
+        return sheet
+
+    async def get_trial_balance(self) -> TrialBalance:
+        """
+        Returns debit and credit totals per Account and currency over every user; they balance,
+        currency by currency, when the ledger does.
+        """
+        cached = self._cache.get_system(self._max_age)
+        if cached is not None:
+            return cached
+
+        tick = self._cache.begin_load()
+        # Entities without a currency and those explicitly in the base currency report on one line
+        merged: dict[tuple[int, str], TrialBalanceLine] = {}
+        for account, currency, debit, credit in await self._account_repo.get_trial_balance_totals():
+            previous = merged.get((account.id, currency))
+            if previous is not None:
+                merged[account.id, currency] = previous._replace(
+                    debit=previous.debit + debit, credit=previous.credit + credit
+                )
+                continue
+            merged[account.id, currency] = TrialBalanceLine(
+                account_id=account.id,
+                account_name=account.account_name,
+                account_type=AccountType(account.account_type),
+                sub_type=AccountSubType(account.sub_type),
+                currency=currency,
+                debit=debit,
+                credit=credit,
+            )
+        lines = tuple(merged.values())
+        trial_balance = TrialBalance(
+            lines=lines,
+            total_debits=_totals_by_currency(lines, lambda line: line.debit),
+            total_credits=_totals_by_currency(lines, lambda line: line.credit),
+        )
+        self._cache.put_system(trial_balance, tick)
+        return trial_balance
@@ -0,0 +1,161 @@
+from collections import defaultdict
+from collections.abc import Iterable
+from decimal import Decimal
+from typing import Any, NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.amounts import to_decimal
+from app.core.settlement import EXACT_SETTLEMENT_MAX_MEMBERS, Transfer, plan_transfers
+from app.exceptions import BusinessRuleError
+from app.models.ledger import AccountSubType
+from app.repositories import AccountRepository, LedgerRepository, StatusRepository
+
+
+class OpenItem(NamedTuple):
+    """An outstanding AR or AP status item to be cleared by a settlement."""
+
+    account_entity_id: int
+    counterparty_entity_id: int
+    owner_id: int
+    amount: Decimal
+
+
+class SettlementPlan(NamedTuple):
+    """Net positions of a group, the items they came from, and the transfers that settle them."""
+
+    positions: dict[int, Decimal]
+    receivables: list[OpenItem]
+    payables: list[OpenItem]
+    transfers: list[Transfer]
+
+
+class SettlementService:
+    """
+    Settles the debts within a group of users with as few cash transfers as possible,
+    instead of paying every AR/AP pair separately.
+
+    Each user's net position is Sum(AR owed to them) - Sum(AP they owe), read from the
+    status tables and restricted to counterparties inside the group.
+
+    Posting follows the SSD settlement flow through each user's SETTLEMENT entity:
+    every AR/AP item is cleared against SETTLEMENT (one batch), then each transfer
+    moves cash from the debtor's SETTLEMENT/CASH pair to the creditor's (one batch per
+    transfer). Afterwards every SETTLEMENT entity is back to zero.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        ledger_repo: LedgerRepository,
+        account_repo: AccountRepository,
+        status_repo: StatusRepository,
+    ):
+        self._session = session
+        self._ledger_repo = ledger_repo
+        self._account_repo = account_repo
+        self._status_repo = status_repo
+
+    # --- 1. PLANNING ---
+
+    async def plan(
+        self, user_ids: Iterable[int], exact_max_members: int = EXACT_SETTLEMENT_MAX_MEMBERS
+    ) -> SettlementPlan:
+        """
+        Computes the group's net positions and a near-minimal transfer list: exact (fewest
+        possible transfers) for up to `exact_max_members` members with a balance, greedy
+        (at most n - 1 transfers) beyond that.
+
+        Raises:
+            BusinessRuleError: If the group's AR and AP items do not mirror each other.
+        """
+        user_ids = set(user_ids)
+        positions: defaultdict[int, Decimal] = defaultdict(Decimal)
+        receivables: list[OpenItem] = []
+        payables: list[OpenItem] = []
+
+        for item, holder_id, _ in await self._status_repo.get_receivables_within(user_ids):
+            amount = to_decimal(item.amount_owed)
+            positions[holder_id] += amount
+            receivables.append(OpenItem(item.account_entity_id, item.counterparty_entity_id, holder_id, amount))
+        for item, holder_id, _ in await self._status_repo.get_payables_within(user_ids):
+            amount = to_decimal(item.amount_due)
+            positions[holder_id] -= amount
+            payables.append(OpenItem(item.account_entity_id, item.counterparty_entity_id, holder_id, amount))
+
+        try:
+            transfers = plan_transfers(positions, exact_max_members)
+        except ValueError as exc:
+            raise BusinessRuleError(f"AR and AP items of the group do not match: {exc}") from exc
+        return SettlementPlan(dict(positions), receivables, payables, transfers)
+
+    # --- 2. POSTING ---
+
+    async def post(self, plan: SettlementPlan) -> list[int]:
+        """
+        Records the settlement batches and their balance changes in the caller's transaction.
+
+        Returns:
+            The batch IDs: the clearing batch first, then one per transfer.
+        """
+        user_ids = {item.owner_id for item in plan.receivables + plan.payables}
+        user_ids |= {t.debtor_id for t in plan.transfers} | {t.creditor_id for t in plan.transfers}
+        settlement_ids = await self._account_repo.get_or_create_user_entities(user_ids, AccountSubType.SETTLEMENT)
+        cash_ids = await self._account_repo.get_or_create_user_entities(user_ids, AccountSubType.CASH)
+
+        clearing_logs = [
+            self._log(
+                settlement_ids[item.owner_id],
+                item.account_entity_id,
+                item.amount,
+                item.counterparty_entity_id,
+                "Settlement: clear receivable",
+            )
+            for item in plan.receivables
+        ] + [
+            self._log(
+                item.account_entity_id,
+                settlement_ids[item.owner_id],
+                item.amount,
+                item.counterparty_entity_id,
+                "Settlement: clear payable",
+            )
+            for item in plan.payables
+        ]
+        transfer_batches = [
+            [
+                self._log(
+                    settlement_ids[t.debtor_id],
+                    cash_ids[t.debtor_id],
+                    t.amount,
+                    cash_ids[t.creditor_id],
+                    "Settlement: pay",
+                ),
+                self._log(
+                    cash_ids[t.creditor_id],
+                    settlement_ids[t.creditor_id],
+                    t.amount,
+                    cash_ids[t.debtor_id],
+                    "Settlement: receive",
+                ),
+            ]
+            for t in plan.transfers
+        ]
+
+        batches = ([clearing_logs] if clearing_logs else []) + transfer_batches
+        batch_ids = await self._ledger_repo.record_batches(batches)
+        await self._account_repo.apply_log_deltas(log for batch in batches for log in batch)
+        return batch_ids
+
+    @staticmethod
+    def _log(debit_id: int, credit_id: int, amount: Decimal, counterparty_id: int, narrative: str) -> dict[str, Any]:
+        """Builds one log; negative amounts (e.g., an overpaid claim) are posted with the sides swapped."""
+        if amount < 0:
+            debit_id, credit_id, amount = credit_id, debit_id, -amount
+        return {
+            "debit_account_entity_id": debit_id,
+            "credit_account_entity_id": credit_id,
+            "amount": amount,
+            "counterparty_entity_id": counterparty_id,
+            "narrative": narrative,
+        }
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import (
+    get_change_feed_queue_size,
+    get_change_feed_resync_interval,
+    get_snapshot_every_n_batches,
+    get_snapshot_interval,
+    get_snapshot_settle_delay,
+)
+from app.core.change_feed import ledger_change_feed
+from app.core.ledger import LogIdGaps
+from app.repositories import BalanceSnapshotRepository
+
+logger = logging.getLogger(__name__)
+
+
+class BalanceSnapshotService:
+    """
+    Schedules balance snapshots: one per interval, or sooner once enough batches have
+    been posted since the last one.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        interval: timedelta | None = None,
+        every_n_batches: int | None = None,
+        settle_delay: timedelta | None = None,
+    ):
+        self._session_factory = session_factory
+        self._interval = interval or get_snapshot_interval()
+        self._every_n_batches = every_n_batches or get_snapshot_every_n_batches()
+        self._gaps = LogIdGaps(settle_delay if settle_delay is not None else get_snapshot_settle_delay())
+
+    async def take_snapshot(self) -> int:
+        """Writes one snapshot in its own transaction and returns the number of entity rows written."""
+        async with self._session_factory() as session, session.begin():
+            written = await BalanceSnapshotRepository(session).take_snapshot(self._gaps)
+        logger.info(f"Balance snapshot written for {written} entities.")
+        return written
+
+    async def snapshot_if_due(self) -> int:
+        """Takes a snapshot only if at least `every_n_batches` batches were posted since the last one."""
+        async with self._session_factory() as session:
+            pending_batches = await BalanceSnapshotRepository(session).count_batches_since_last_snapshot()
+        if pending_batches < self._every_n_batches:
+            return 0
+        return await self.take_snapshot()
+
+    async def run(self, stop: asyncio.Event, poll_interval: timedelta | None = None) -> None:
+        """
+        Background loop: snapshots every `interval`, and sooner once `every_n_batches`
+        batches were posted since the last one. Batches posted in this process are counted
+        from the ledger change feed, so the database is only asked once they add up, and
+        otherwise every `poll_interval` (default: the change feed resync interval) for
+        batches posted by other processes. Runs until `stop` is set.
+        """
+        loop = asyncio.get_running_loop()
+        poll_seconds = (poll_interval or get_change_feed_resync_interval()).total_seconds()
+        next_scheduled = next_poll = loop.time()
+        posted = 0
+        with ledger_change_feed.subscribe(get_change_feed_queue_size()) as subscription:
+            while not stop.is_set():
+                now = loop.time()
+                checked = True
+                try:
+                    if now >= next_scheduled:
+                        await self.take_snapshot()
+                        next_scheduled = loop.time() + self._interval.total_seconds()
+                    elif posted >= self._every_n_batches or now >= next_poll:
+                        next_poll = now + poll_seconds
+                        if await self.snapshot_if_due():
+                            next_scheduled = loop.time() + self._interval.total_seconds()
+                    else:
+                        checked = False
+                except Exception:
+                    logger.exception("Balance snapshot failed; retrying on the next poll.")
+                    next_scheduled = max(next_scheduled, now + poll_seconds)
+                    next_poll = now + poll_seconds
+                if checked:
+                    posted = 0
+
+                delivery = await subscription.wait(stop, max(0.0, min(next_scheduled, next_poll) - loop.time()))
+                # A dropped change held at least one batch.
+                posted += delivery.batch_count + delivery.dropped
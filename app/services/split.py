@@ -0,0 +1,102 @@
+"""
+Shared Expense Posting ✂️
+
+Turns shared expenses into the log batches of SSD Scenario 3.1, splitting the
+amounts with app.core.split (NumPy required: `pip install divvy[analytics]`).
+
+---
+DESIGN:
+- One batch per expense. The payer's CASH is credited with the full amount:
+  - the payer's own share: Debit payer SHARED_COST / Credit payer CASH;
+  - every other share: Debit payer AR / Credit payer CASH (counterparty: the
+    participant's AP), plus Debit participant SHARED_COST / Credit participant AP
+    (counterparty: the payer's AR).
+- All expenses of a call are split in one vectorized pass and their entities are
+  resolved with one query per account sub-type, so a bulk import costs a few
+  queries plus one record_batches() call.
+- Zero shares produce no logs.
+"""
+
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.split import Expense, split_expenses
+from app.exceptions import BusinessRuleError
+from app.models.ledger import AccountSubType
+from app.repositories import AccountRepository, LedgerRepository
+
+
+class SplitService:
+    """Splits shared expenses between participants and posts the resulting AR/AP and expense logs."""
+
+    def __init__(self, session: AsyncSession, ledger_repo: LedgerRepository, account_repo: AccountRepository):
+        self._session = session
+        self._ledger_repo = ledger_repo
+        self._account_repo = account_repo
+
+    async def build_batches(self, expenses: Sequence[Expense]) -> list[list[dict[str, Any]]]:
+        """
+        Splits the expenses and builds one ready-to-post batch of log rows per expense, in
+        input order (see LedgerRepository.record_batches()). Entities missing for a payer or
+        participant are created in the caller's transaction.
+
+        Raises:
+            BusinessRuleError: If an expense cannot be split (see split_expenses()).
+        """
+        try:
+            splits = split_expenses(expenses)
+        except ValueError as exc:
+            raise BusinessRuleError(str(exc)) from exc
+
+        user_ids = {expense.payer_id for expense in expenses}
+        user_ids.update(user_id for expense in expenses for user_id in expense.participant_ids)
+        cash = await self._account_repo.get_or_create_user_entities(user_ids, AccountSubType.CASH)
+        receivable = await self._account_repo.get_or_create_user_entities(user_ids, AccountSubType.AR)
+        payable = await self._account_repo.get_or_create_user_entities(user_ids, AccountSubType.AP)
+        cost = await self._account_repo.get_or_create_user_entities(user_ids, AccountSubType.SHARED_COST)
+
+        batches: list[list[dict[str, Any]]] = []
+        for expense, shares in zip(expenses, splits, strict=True):
+            payer = expense.payer_id
+            logs: list[dict[str, Any]] = []
+            for user_id, amount in shares:
+                if not amount:
+                    continue
+                if user_id == payer:
+                    logs.append(self._log(expense, cost[payer], cash[payer], amount, None))
+                    continue
+                logs.append(self._log(expense, receivable[payer], cash[payer], amount, payable[user_id]))
+                logs.append(self._log(expense, cost[user_id], payable[user_id], amount, receivable[payer]))
+            batches.append(logs)
+        return batches
+
+    async def post(self, expenses: Sequence[Expense]) -> list[int]:
+        """
+        Records the expenses' batches and their balance changes in the caller's transaction.
+
+        Returns:
+            The batch ID of each expense, in input order.
+
+        Raises:
+            BusinessRuleError: If an expense cannot be split.
+        """
+        batches = await self.build_batches(expenses)
+        batch_ids = await self._ledger_repo.record_batches(batches)
+        await self._account_repo.apply_log_deltas(log for batch in batches for log in batch)
+        return batch_ids
+
+    @staticmethod
+    def _log(
+        expense: Expense, debit_id: int, credit_id: int, amount: Decimal, counterparty_id: int | None
+    ) -> dict[str, Any]:
+        return {
+            "debit_account_entity_id": debit_id,
+            "credit_account_entity_id": credit_id,
+            "amount": amount,
+            "counterparty_entity_id": counterparty_id,
+            "expense_catalog_id": expense.expense_catalog_id,
+            "narrative": expense.narrative,
+        }
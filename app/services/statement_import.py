@@ -0,0 +1,312 @@
+"""
+Bank Statement Import 🏦
+
+Imports CSV and OFX bank statements into a user's ledger through a pipeline of
+asyncio stages connected by bounded queues:
+
+    parse (thread) -> normalize -> map catalogs + fingerprint -> post chunks
+
+---
+DESIGN:
+- Bounded queues give backpressure: when posting falls behind, the earlier stages
+  block on a full queue instead of reading ahead, so memory stays bounded by
+  queue size x block size whatever the file size. File reads and CSV/OFX parsing
+  run in a worker thread, a block of rows at a time, so they never stall the loop.
+- Every statement line becomes its own batch: money going out is
+  Debit owner SHARED_COST / Credit owner CASH, money coming in (refunds) the
+  reverse, dated at UTC midnight of the line's posting date. Zero amounts are skipped.
+- Catalog mapping: the line's category (CSV) is matched against ExpenseCatalog
+  names, ignoring case and the seed data's "  - " indent; otherwise the longest
+  catalog name found as a whole word in the description wins; otherwise the
+  import's default catalog is used.
+- Exactly-once posting: each chunk posts its logs, records the lines'
+  fingerprints (app.core.statements) and advances the file's checkpoint to the
+  chunk's last byte in ONE transaction. A restarted import resumes after the last
+  committed chunk, and lines already imported by an overlapping statement are
+  skipped by fingerprint.
+- Chunks only end where the posting date changes, so the per-date occurrence
+  counters of the fingerprints restart at 0 on resume exactly as they do at a
+  chunk boundary, without persisting them. Memory stays bounded by one day's lines.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import suppress
+from datetime import UTC, datetime
+from datetime import time as clock_time
+from itertools import islice
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.catalog_tree import CatalogTree
+from app.core.statements import (
+    CsvColumns,
+    StatementLine,
+    detect_format,
+    iter_statement_rows,
+    line_fingerprint,
+    line_identity,
+    normalize_row,
+    statement_source_key,
+)
+from app.exceptions import BusinessRuleError
+from app.models.ledger import AccountSubType
+from app.repositories import AccountRepository, LedgerRepository, StatementImportRepository
+
+logger = logging.getLogger(__name__)
+
+# Longest narrative stored on a log (TransactionLog.narrative is String(255))
+_NARRATIVE_LENGTH = 255
+
+_CATALOG_INDENT = re.compile(r"^[\s\-]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class ImportStats(NamedTuple):
+    """Outcome of one import run."""
+
+    lines: int  # Statement lines read in this run
+    posted: int
+    duplicates: int  # Already imported (by this file before, or by an overlapping statement)
+    skipped: int  # Zero amounts
+    resumed_from: int  # Byte offset the run started at (0 for a fresh import)
+    elapsed_seconds: float
+
+
+class _Chunk(NamedTuple):
+    """Mapped statement lines ready to post, and the byte offset right after the last one."""
+
+    lines: list[tuple[StatementLine, int | None, str]]  # (line, expense_catalog_id, fingerprint)
+    end_offset: int
+
+
+class _CatalogMatcher:
+    """Maps statement categories and descriptions to ExpenseCatalog IDs."""
+
+    def __init__(self, tree: CatalogTree):
+        self._ids: dict[str, int] = {}
+        for root in tree.roots:
+            for catalog_id in tree.descendant_ids(root.id):
+                self._ids.setdefault(self.normalize(tree.get(catalog_id).name), catalog_id)
+        names = sorted(self._ids, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(" + "|".join(map(re.escape, names)) + r")\b") if names else None
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        return _WHITESPACE.sub(" ", _CATALOG_INDENT.sub("", name)).strip().casefold()
+
+    def find(self, name: str) -> int | None:
+        """The catalog with this name (ignoring case and indent), if any."""
+        return self._ids.get(self.normalize(name))
+
+    def match(self, line: StatementLine, default: int | None) -> int | None:
+        if line.category and (catalog_id := self.find(line.category)) is not None:
+            return catalog_id
+        if self._pattern and (found := self._pattern.search(line.description.casefold())):
+            return self._ids[found.group(1)]
+        return default
+
+
+class StatementImportService:
+    """Runs resumable, deduplicated bank statement imports (see module docstring)."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        chunk_size: int = 1_000,
+        block_size: int = 1_000,
+        queue_size: int = 4,
+    ):
+        self._session_factory = session_factory
+        self._chunk_size = chunk_size
+        self._block_size = block_size
+        self._queue_size = queue_size
+
+    async def import_file(
+        self,
+        path: str | Path,
+        owner_id: int,
+        statement_format: str | None = None,
+        default_catalog: str | None = None,
+        columns: CsvColumns | None = None,
+        date_format: str | None = None,
+        encoding: str = "utf-8",
+    ) -> ImportStats:
+        """
+        Imports a statement file into the owner's CASH and SHARED_COST entities, resuming
+        after the last posted line if the file was imported before. Importing a completed
+        file again posts nothing.
+
+        Args:
+            statement_format: "csv" or "ofx" (default: from the file extension).
+            default_catalog: Catalog name for lines no catalog matches (default: none).
+            columns: CSV header names (default: CsvColumns()).
+            date_format: strptime format of CSV dates (default: ISO or YYYYMMDD).
+
+        Raises:
+            BusinessRuleError: If the default catalog does not exist.
+            ValueError: If the file is malformed. Chunks committed before the bad line stay posted.
+        """
+        started = time.perf_counter()
+        path = Path(path)
+        statement_format = statement_format or detect_format(path)
+        source_key = await asyncio.to_thread(statement_source_key, owner_id, path, statement_format)
+
+        async with self._session_factory() as session, session.begin():
+            account_repo = AccountRepository(session)
+            matcher = _CatalogMatcher(await account_repo.get_expense_catalog_tree())
+            default_id = None
+            if default_catalog is not None:
+                default_id = matcher.find(default_catalog)
+                if default_id is None:
+                    raise BusinessRuleError(f"Expense catalog {default_catalog!r} does not exist.")
+            cash = (await account_repo.get_or_create_user_entities([owner_id], AccountSubType.CASH))[owner_id]
+            cost = (await account_repo.get_or_create_user_entities([owner_id], AccountSubType.SHARED_COST))[owner_id]
+            checkpoint = await StatementImportRepository(session).get_checkpoint(source_key)
+            start_offset = checkpoint.byte_offset if checkpoint else 0
+
+        if start_offset:
+            logger.info(f"Resuming import of {path.name} at byte {start_offset:,}.")
+        rows = iter_statement_rows(path, statement_format, start_offset, columns, encoding)
+        raw: asyncio.Queue[list[Any] | None] = asyncio.Queue(self._queue_size)
+        normalized: asyncio.Queue[list[StatementLine] | None] = asyncio.Queue(self._queue_size)
+        chunks: asyncio.Queue[_Chunk | None] = asyncio.Queue(self._queue_size)
+        counts = {"lines": 0, "posted": 0, "duplicates": 0, "skipped": 0}
+
+        async def post() -> None:
+            async for chunk in self._drain(chunks):
+                posted, duplicates, skipped = await self._post_chunk(chunk, source_key, owner_id, path.name, cash, cost)
+                counts["posted"] += posted
+                counts["duplicates"] += duplicates
+                counts["skipped"] += skipped
+
+        try:
+            async with asyncio.TaskGroup() as tasks:
+                tasks.create_task(self._parse(rows, raw))
+                tasks.create_task(
+                    self._stage(raw, normalized, lambda block: [normalize_row(row, date_format) for row in block])
+                )
+                tasks.create_task(self._map(normalized, chunks, owner_id, matcher, default_id, counts))
+                tasks.create_task(post())
+        except ExceptionGroup as group:
+            raise group.exceptions[0] from None
+        finally:
+            with suppress(ValueError):  # The parse thread may still be inside the generator after a failure
+                rows.close()
+
+        # Mark the file as fully imported (also for files without a single line).
+        end_offset = path.stat().st_size
+        async with self._session_factory() as session, session.begin():
+            repo = StatementImportRepository(session)
+            checkpoint = await repo.get_checkpoint(source_key)
+            if checkpoint is None or checkpoint.completed_at is None:
+                await repo.save_checkpoint(source_key, owner_id, path.name, end_offset, completed=True)
+
+        return ImportStats(
+            counts["lines"],
+            counts["posted"],
+            counts["duplicates"],
+            counts["skipped"],
+            start_offset,
+            time.perf_counter() - started,
+        )
+
+    # --- Pipeline stages (each passes None downstream when done) ---
+
+    async def _parse(self, rows: Iterator[Any], output: asyncio.Queue[list[Any] | None]) -> None:
+        while block := await asyncio.to_thread(list, islice(rows, self._block_size)):
+            await output.put(block)
+        await output.put(None)
+
+    async def _stage(
+        self, source: asyncio.Queue[Any], output: asyncio.Queue[Any], transform: Callable[[Any], Any]
+    ) -> None:
+        async for item in self._drain(source):
+            await output.put(transform(item))
+        await output.put(None)
+
+    async def _map(
+        self,
+        source: asyncio.Queue[list[StatementLine] | None],
+        output: asyncio.Queue[_Chunk | None],
+        owner_id: int,
+        matcher: _CatalogMatcher,
+        default_id: int | None,
+        counts: dict[str, int],
+    ) -> None:
+        chunk: list[tuple[StatementLine, int | None, str]] = []
+        occurrences: dict[tuple[Any, ...], int] = {}  # Lines seen per line_identity() on the current date
+        async for block in self._drain(source):
+            counts["lines"] += len(block)
+            for line in block:
+                if chunk and line.posted_on != chunk[-1][0].posted_on:
+                    # A new date: the only place a full chunk may end (see module docstring).
+                    if len(chunk) >= self._chunk_size:
+                        await output.put(_Chunk(chunk, chunk[-1][0].end_offset))
+                        chunk = []
+                    occurrences.clear()
+                identity = line_identity(line)
+                occurrence = occurrences.get(identity, 0)
+                occurrences[identity] = occurrence + 1
+                catalog_id = matcher.match(line, default_id)
+                chunk.append((line, catalog_id, line_fingerprint(owner_id, line, occurrence)))
+        if chunk:
+            await output.put(_Chunk(chunk, chunk[-1][0].end_offset))
+        await output.put(None)
+
+    async def _post_chunk(
+        self, chunk: _Chunk, source_key: str, owner_id: int, source_name: str, cash: int, cost: int
+    ) -> tuple[int, int, int]:
+        """Posts one chunk with its fingerprints and checkpoint in one transaction. Returns (posted, duplicates, skipped)."""
+        async with self._session_factory() as session, session.begin():
+            repo = StatementImportRepository(session)
+            known = await repo.get_imported_fingerprints({fingerprint for _, _, fingerprint in chunk.lines})
+
+            fingerprints: list[str] = []
+            batches: list[list[dict[str, Any]]] = []
+            duplicates = skipped = 0
+            for line, catalog_id, fingerprint in chunk.lines:
+                if fingerprint in known:
+                    duplicates += 1
+                    continue
+                if not line.amount:
+                    skipped += 1
+                    continue
+                known.add(fingerprint)  # Repeated references within the file
+                fingerprints.append(fingerprint)
+                batches.append([self._log(line, catalog_id, cash, cost, owner_id)])
+
+            if batches:
+                ledger_repo = LedgerRepository(session)
+                batch_ids = await ledger_repo.record_batches(batches)
+                await AccountRepository(session).apply_log_deltas(log for batch in batches for log in batch)
+                await repo.add_fingerprints(dict(zip(fingerprints, batch_ids, strict=True)))
+            await repo.save_checkpoint(
+                source_key, owner_id, source_name, chunk.end_offset, posted=len(batches), duplicates=duplicates
+            )
+        return len(batches), duplicates, skipped
+
+    @staticmethod
+    def _log(line: StatementLine, catalog_id: int | None, cash: int, cost: int, owner_id: int) -> dict[str, Any]:
+        spent = line.amount < 0
+        return {
+            "debit_account_entity_id": cost if spent else cash,
+            "credit_account_entity_id": cash if spent else cost,
+            "amount": abs(line.amount),
+            "counterparty_entity_id": None,
+            "expense_catalog_id": catalog_id,
+            "narrative": line.description[:_NARRATIVE_LENGTH] or None,
+            "created_by": owner_id,
+            # Historical lines belong on the day the bank posted them, not on the day of the import.
+            "created_at": datetime.combine(line.posted_on, clock_time.min, tzinfo=UTC),
+        }
+
+    @staticmethod
+    async def _drain(queue: asyncio.Queue[Any]) -> AsyncIterator[Any]:
+        while (item := await queue.get()) is not None:
+            yield item
@@ -0,0 +1,72 @@
+"""
+Shared fixtures: a fresh SQLite database per test, holding the seed accounts and two
+users who own one AccountEntity per account.
+
+AccountEntity IDs are `user_id * 1000 + account_id`, e.g., 1100 is user 1's CASH and
+2400 is user 2's SHARED_COST.
+"""
+
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.catalog_tree import invalidate_catalog_tree
+from app.core.fx import invalidate_fx_rates
+from app.core.report_cache import balance_report_cache
+from app.models.base import Base
+from app.models.definitions import User
+from app.models.ledger import Account, AccountEntity, AccountSubType
+from app.models.seed import ACCOUNTS_SEED_DATA
+
+USER_IDS = (1, 2)
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches() -> Iterator[None]:
+    """Process-wide caches are not keyed by database; every test starts without them."""
+    yield
+    invalidate_catalog_tree()
+    invalidate_fx_rates()
+    balance_report_cache.clear()
+
+
+@pytest.fixture
+async def engine(tmp_path: Path) -> AsyncIterator[AsyncEngine]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'divvy.db'}")
+    # One account per sub-type, as app.models.seed creates them (it skips the second SETTLEMENT account).
+    accounts: dict[AccountSubType, dict[str, Any]] = {}
+    for name, account_type, sub_type, account_id in ACCOUNTS_SEED_DATA:
+        accounts.setdefault(
+            sub_type, {"id": account_id, "account_name": name, "account_type": account_type, "sub_type": sub_type}
+        )
+    account_ids = sorted(account["id"] for account in accounts.values())
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Account), list(accounts.values()))
+        await conn.execute(
+            insert(User),
+            [
+                {"id": u, "email": f"user{u}@example.com", "username": f"user{u}", "password_hash": "x"}
+                for u in USER_IDS
+            ],
+        )
+        await conn.execute(
+            insert(AccountEntity),
+            [
+                {"id": u * 1000 + a, "owner_id": u, "account_type_id": a, "current_balance": 0}
+                for u in USER_IDS
+                for a in account_ids
+            ],
+        )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(engine, expire_on_commit=False)
@@ -0,0 +1,66 @@
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.repositories import AccountRepository, LedgerRepository
+from app.services.analytics import LedgerAnalytics
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+CASH_2, SHARED_COST_2 = 2100, 2400
+
+
+def spend(cost: int, cash: int, amount: str, month: int) -> dict[str, Any]:
+    return {
+        "debit_account_entity_id": cost,
+        "credit_account_entity_id": cash,
+        "amount": Decimal(amount),
+        "created_at": datetime(2024, month, 15, tzinfo=UTC),
+    }
+
+
+async def post(session_factory: async_sessionmaker[AsyncSession], *logs: dict[str, Any]) -> None:
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches([list(logs)])
+
+
+async def test_a_failed_refresh_keeps_the_watermark_with_the_columns(
+    session_factory: async_sessionmaker[AsyncSession], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    await post(
+        session_factory,
+        spend(SHARED_COST_1, CASH_1, "10", 1),
+        spend(SHARED_COST_2, CASH_2, "2.5", 1),
+        spend(SHARED_COST_1, CASH_1, "4", 2),
+        spend(CASH_1, SHARED_COST_1, "1", 2),  # A refund
+        spend(SHARED_COST_2, CASH_2, "0.25", 3),
+    )
+    analytics = LedgerAnalytics(session_factory, chunk_size=2)
+    load_entities = LedgerAnalytics._load_entities  # pyright: ignore[reportPrivateUsage]
+    calls = 0
+
+    async def fail_on_third_chunk(self: LedgerAnalytics, repo: AccountRepository, chunk: Sequence[Any]) -> None:
+        nonlocal calls
+        calls += 1
+        if calls == 3:
+            raise ConnectionError("Connection lost")
+        await load_entities(self, repo, chunk)
+
+    monkeypatch.setattr(LedgerAnalytics, "_load_entities", fail_on_third_chunk)
+    with pytest.raises(ConnectionError):
+        await analytics.refresh()
+    # Two chunks were read, but nothing was kept, so the watermark did not move either.
+    assert (analytics.last_log_id, analytics.log_count, analytics.total_spending()) == (0, 0, 0)
+
+    monkeypatch.undo()
+    assert await analytics.refresh() == 5
+    assert (analytics.last_log_id, analytics.log_count) == (5, 5)
+    assert analytics.spending("user") == {1: Decimal(13), 2: Decimal("2.75")}
+    assert analytics.spending("month", user_id=1) == {"2024-01": Decimal(10), "2024-02": Decimal(3)}
+
+    await post(session_factory, spend(SHARED_COST_2, CASH_2, "1", 3))
+    assert await analytics.refresh() == 1
+    assert analytics.total_spending(user_id=2) == Decimal("3.75")
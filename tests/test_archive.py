@@ -0,0 +1,85 @@
+from datetime import UTC, datetime
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.ledger import net_balance_deltas
+from app.models.ledger import TransactionLog
+from app.repositories import AccountRepository, LedgerArchiveRepository, LedgerRepository
+from app.services.archive import ArchiveStats, LedgerArchiveService
+from app.services.balance_rebuild import BalanceRebuildService
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+CASH_2, AR_2, SHARED_COST_2 = 2100, 2110, 2400
+
+CUTOFF = datetime(2024, 6, 1, tzinfo=UTC)
+
+
+def log(debit: int, credit: int, amount: str, month: int) -> dict[str, Any]:
+    return {
+        "debit_account_entity_id": debit,
+        "credit_account_entity_id": credit,
+        "amount": Decimal(amount),
+        "created_at": datetime(2024, month, 10, tzinfo=UTC),
+    }
+
+
+async def post(session_factory: async_sessionmaker[AsyncSession], *batches: list[dict[str, Any]]) -> None:
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches(list(batches))
+        await AccountRepository(session).apply_log_deltas([entry for batch in batches for entry in batch])
+
+
+async def hot_logs(session_factory: async_sessionmaker[AsyncSession]) -> list[TransactionLog]:
+    async with session_factory() as session:
+        return list((await session.scalars(select(TransactionLog).order_by(TransactionLog.id))).all())
+
+
+async def test_opening_balances_plus_remaining_logs_equal_the_balances_before_archival(
+    engine: AsyncEngine, session_factory: async_sessionmaker[AsyncSession]
+) -> None:
+    await post(
+        session_factory,
+        [log(SHARED_COST_1, CASH_1, "10", 1), log(CASH_1, SHARED_COST_1, "2.5", 2)],
+        [log(SHARED_COST_1, CASH_1, "4", 3)],
+        [log(AR_2, CASH_2, "7", 2)],  # User 2 is owed money at the cutoff, so stays hot
+        [log(SHARED_COST_2, CASH_2, "1", 3)],
+        [log(SHARED_COST_1, CASH_1, "0.75", 7)],  # After the cutoff
+    )
+    rebuild = BalanceRebuildService(engine)
+    before = await rebuild.compute_ledger_balances()
+
+    service = LedgerArchiveService(session_factory, chunk_size=2)
+    plan = await service.plan(CUTOFF)
+    assert (plan.user_ids, plan.blocked_user_ids) == ({1}, {2})
+    assert await service.archive(CUTOFF) == ArchiveStats(users=1, logs=3, entities=2)
+
+    remaining = await hot_logs(session_factory)
+    assert [entry.amount for entry in remaining] == [Decimal(7), Decimal(1), Decimal("0.75")]
+    async with session_factory() as session:
+        openings = await LedgerArchiveRepository(session).get_opening_balances()
+        assert openings == {SHARED_COST_1: Decimal("11.5"), CASH_1: Decimal("-11.5")}
+        assert len(await LedgerRepository(session).get_logs_for_entity(CASH_1, include_archived=True)) == 4
+
+    after = net_balance_deltas(remaining)
+    for entity_id, opening in openings.items():
+        after[entity_id] = after.get(entity_id, Decimal(0)) + opening
+    assert after == before
+    assert await rebuild.compute_ledger_balances() == before
+    assert await rebuild.find_drift() == []
+
+    # Archiving again with the same cutoff has nothing left to move.
+    assert await service.archive(CUTOFF) == ArchiveStats(users=0, logs=0, entities=0)
+
+
+async def test_users_sharing_a_batch_with_an_unsettled_user_stay_hot(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    await post(session_factory, [log(SHARED_COST_1, CASH_1, "10", 1), log(AR_2, CASH_2, "7", 1)])
+
+    plan = await LedgerArchiveService(session_factory).plan(CUTOFF)
+    assert (plan.user_ids, plan.blocked_user_ids) == (set(), {1, 2})
+    async with session_factory() as session:
+        assert await session.scalar(select(func.count()).select_from(TransactionLog)) == 2
@@ -0,0 +1,59 @@
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.ledger import net_balance_deltas
+from app.repositories import AccountRepository, LedgerRepository
+
+CASH_1, AR_1, SHARED_COST_1 = 1100, 1110, 1400
+AP_2, SHARED_COST_2 = 2210, 2400
+
+
+def log(debit: int, credit: int, amount: str | float) -> dict[str, Any]:
+    return {"debit_account_entity_id": debit, "credit_account_entity_id": credit, "amount": amount}
+
+
+def test_deltas_are_debits_minus_credits_per_entity() -> None:
+    logs = [log(SHARED_COST_1, CASH_1, "40"), log(AR_1, CASH_1, "20"), log(SHARED_COST_2, AP_2, "20")]
+
+    assert net_balance_deltas(logs) == {
+        SHARED_COST_1: Decimal(40),
+        CASH_1: Decimal(-60),
+        AR_1: Decimal(20),
+        SHARED_COST_2: Decimal(20),
+        AP_2: Decimal(-20),
+    }
+
+
+def test_cancelling_changes_are_omitted() -> None:
+    logs = [log(SHARED_COST_1, CASH_1, "12.5"), log(CASH_1, SHARED_COST_1, "12.5"), log(AR_1, CASH_1, 0.1)]
+
+    assert net_balance_deltas(logs) == {AR_1: Decimal("0.1"), CASH_1: Decimal("-0.1")}
+
+
+async def test_balances_follow_the_posted_logs(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    batches = [[log(SHARED_COST_1, CASH_1, "40")], [log(AR_1, CASH_1, "0.1"), log(AR_1, CASH_1, "0.2")]]
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches(batches)
+        applied = await AccountRepository(session).apply_log_deltas(log for batch in batches for log in batch)
+    assert applied == {SHARED_COST_1: Decimal(40), CASH_1: Decimal("-40.3"), AR_1: Decimal("0.3")}
+
+    async with session_factory() as session:
+        for entity_id, delta in applied.items():
+            entity = await AccountRepository(session).get_entity_by_id(entity_id)
+            assert entity is not None
+            assert entity.current_balance == delta
+        # The cached balance agrees with the ledger.
+        assert await LedgerRepository(session).get_cached_balance_and_log_delta(CASH_1) == (
+            Decimal("-40.3"),
+            Decimal("-40.3"),
+        )
+
+
+async def test_unknown_entities_fail_the_whole_update(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    async with session_factory() as session, session.begin():
+        with pytest.raises(NoResultFound):
+            await AccountRepository(session).apply_balance_deltas({CASH_1: Decimal(1), 999_999: Decimal(-1)})
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.ledger import net_balance_deltas
+from app.repositories import AccountRepository, LedgerRepository
+from app.services.balance_rebuild import BalanceDrift, BalanceRebuildService
+
+CASH_1, AR_1, SHARED_COST_1 = 1100, 1110, 1400
+CASH_2, AP_2 = 2100, 2210
+
+LOGS = [
+    {"debit_account_entity_id": debit, "credit_account_entity_id": credit, "amount": Decimal(amount)}
+    for debit, credit, amount in [
+        (SHARED_COST_1, CASH_1, "12.34"),
+        (AR_1, CASH_1, "20"),
+        (AP_2, CASH_2, "7.5"),
+        (CASH_1, AR_1, "0.0001"),
+    ]
+    * 25
+]
+
+
+async def cached_balances(session_factory: async_sessionmaker[AsyncSession]) -> dict[int, Decimal]:
+    async with session_factory() as session:
+        return dict(await AccountRepository(session).get_all_balances())
+
+
+async def test_rebuild_repairs_drift_to_the_ledger_balances(
+    engine: AsyncEngine, session_factory: async_sessionmaker[AsyncSession]
+) -> None:
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches([LOGS[i : i + 10] for i in range(0, len(LOGS), 10)])
+        await AccountRepository(session).apply_log_deltas(LOGS)
+    current = await cached_balances(session_factory)
+    async with session_factory() as session, session.begin():
+        await AccountRepository(session).set_balances({AR_1: Decimal(1)})
+
+    service = BalanceRebuildService(engine, workers=2, chunk_size=7)
+    assert await service.compute_ledger_balances() == net_balance_deltas(LOGS)
+    assert await service.rebuild() == [BalanceDrift(AR_1, Decimal(1), current[AR_1])]
+
+    assert await cached_balances(session_factory) == current
+    assert await service.find_drift() == []
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.ledger import AccountEntity, AccountEntityBalanceShard
+from app.repositories import AccountRepository, LedgerRepository
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+SHARD_COUNT = 4
+
+
+@pytest.fixture
+async def sharded(session_factory: async_sessionmaker[AsyncSession], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Splits SHARED_COST_1's balance over SHARD_COUNT counters, as a promotion to hot would."""
+    monkeypatch.setenv("DIVVY_BALANCE_SHARDS", str(SHARD_COUNT))
+    async with session_factory() as session, session.begin():
+        await session.execute(
+            insert(AccountEntityBalanceShard),
+            [{"account_entity_id": SHARED_COST_1, "shard": shard, "balance": 0} for shard in range(SHARD_COUNT)],
+        )
+
+
+async def shard_total(session: AsyncSession) -> Decimal | None:
+    shard = AccountEntityBalanceShard
+    return await session.scalar(select(func.sum(shard.balance)).where(shard.account_entity_id == SHARED_COST_1))
+
+
+async def row_balance(session: AsyncSession) -> Decimal | None:
+    return await session.scalar(select(AccountEntity.current_balance).where(AccountEntity.id == SHARED_COST_1))
+
+
+async def post(session_factory: async_sessionmaker[AsyncSession], amount: str) -> None:
+    logs = [{"debit_account_entity_id": SHARED_COST_1, "credit_account_entity_id": CASH_1, "amount": Decimal(amount)}]
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches([logs])
+        await AccountRepository(session).apply_log_deltas(logs)
+
+
+@pytest.mark.usefixtures("sharded")
+async def test_sharded_entities_report_one_balance(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    for amount in ("1.25", "2.50", "0.05"):
+        await post(session_factory, amount)
+
+    async with session_factory() as session:
+        # Postings went to the shards, not the entity row.
+        assert await row_balance(session) == 0
+        assert await shard_total(session) == Decimal("3.8")
+
+        repo = AccountRepository(session)
+        entity = await repo.get_entity_by_id(SHARED_COST_1)
+        assert entity is not None
+        assert entity.current_balance == Decimal("3.8")
+        balances = {entity_id: balance for entity_id, _, _, balance in await repo.get_user_balances_by_account(1)}
+        assert balances[SHARED_COST_1] == Decimal("3.8")
+        assert balances[CASH_1] == Decimal("-3.8")
+        assert await LedgerRepository(session).get_cached_balance_and_log_delta(SHARED_COST_1) == (
+            Decimal("3.8"),
+            Decimal("3.8"),
+        )
+
+
+@pytest.mark.usefixtures("sharded")
+async def test_overwriting_a_balance_resets_its_shards(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    await post(session_factory, "7")
+
+    async with session_factory() as session, session.begin():
+        await AccountRepository(session).set_balances({SHARED_COST_1: Decimal(50)})
+
+    async with session_factory() as session:
+        assert await row_balance(session) == 50
+        assert await shard_total(session) == 0
+        entity = await AccountRepository(session).get_entity_by_id(SHARED_COST_1)
+        assert entity is not None
+        assert entity.current_balance == 50
+
+
+async def test_unsharded_entities_update_their_row(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    await post(session_factory, "7")
+
+    async with session_factory() as session:
+        assert await row_balance(session) == 7
+        assert await shard_total(session) is None
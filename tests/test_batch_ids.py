@@ -0,0 +1,91 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.db.sequences import BatchIdAllocator
+from app.models.ledger import TransactionLog
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+
+
+async def reserve(
+    allocator: BatchIdAllocator, session_factory: async_sessionmaker[AsyncSession], count: int
+) -> list[int]:
+    async with session_factory() as session, session.begin():
+        return await allocator.reserve(count, session)
+
+
+async def test_ids_are_served_from_blocks(
+    engine: AsyncEngine, session_factory: async_sessionmaker[AsyncSession]
+) -> None:
+    allocator = BatchIdAllocator(engine, block_size=3)
+
+    assert await reserve(allocator, session_factory, 2) == [1, 2]
+    assert await reserve(allocator, session_factory, 2) == [3, 4]  # The rest of the first block, then a new one
+    assert await reserve(allocator, session_factory, 5) == [5, 6, 7, 8, 9]  # One oversized block
+
+
+async def test_rolled_back_blocks_are_not_shared(
+    engine: AsyncEngine, session_factory: async_sessionmaker[AsyncSession]
+) -> None:
+    allocator = BatchIdAllocator(engine, block_size=3)
+    async with session_factory() as session:
+        await allocator.reserve(2, session)  # Reserves block 1-3 in a transaction that rolls back
+        await session.rollback()
+
+    # The counter update rolled back too, so the IDs are issued again, but only once.
+    issued = await reserve(allocator, session_factory, 3) + await reserve(allocator, session_factory, 1)
+    assert issued == [1, 2, 3, 4]
+
+
+async def test_first_reservation_starts_after_existing_batches(
+    engine: AsyncEngine, session_factory: async_sessionmaker[AsyncSession]
+) -> None:
+    async with session_factory() as session, session.begin():
+        await session.execute(
+            insert(TransactionLog).values(
+                transaction_batch_id=41,
+                debit_account_entity_id=SHARED_COST_1,
+                credit_account_entity_id=CASH_1,
+                amount=1,
+            )
+        )
+
+    assert await reserve(BatchIdAllocator(engine, block_size=10), session_factory, 1) == [42]
+
+
+async def test_sqlite_writer_waiting_for_ids_does_not_deadlock(
+    engine: AsyncEngine, session_factory: async_sessionmaker[AsyncSession]
+) -> None:
+    allocator = BatchIdAllocator(engine, block_size=3)
+    writer_holds_lock = asyncio.Event()
+
+    async def writer() -> list[int]:
+        # Takes SQLite's write lock first, then asks for IDs while the other session waits for the lock.
+        async with session_factory() as session, session.begin():
+            await session.execute(
+                insert(TransactionLog).values(
+                    transaction_batch_id=0,
+                    debit_account_entity_id=SHARED_COST_1,
+                    credit_account_entity_id=CASH_1,
+                    amount=Decimal(1),
+                )
+            )
+            writer_holds_lock.set()
+            await asyncio.sleep(0.2)
+            return await allocator.reserve(3, session)
+
+    async def waiter() -> list[int]:
+        await writer_holds_lock.wait()
+        return await reserve(allocator, session_factory, 2)
+
+    first, second = await asyncio.wait_for(asyncio.gather(writer(), waiter()), timeout=10)
+    assert len(set(first) | set(second)) == 5
+
+
+async def test_sqlite_reservations_require_the_callers_session(engine: AsyncEngine) -> None:
+    with pytest.raises(RuntimeError, match="requires the caller's session"):
+        await BatchIdAllocator(engine, block_size=3).reserve(1)
@@ -0,0 +1,79 @@
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import ExpenseCatalog, ExpenseCatalogClosure
+from app.repositories import AccountRepository, LedgerRepository
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+CASH_2, SHARED_COST_2 = 2100, 2400
+
+
+def spend(cost: int, cash: int, amount: str, catalog_id: int) -> dict[str, Any]:
+    return {
+        "debit_account_entity_id": cost,
+        "credit_account_entity_id": cash,
+        "amount": Decimal(amount),
+        "expense_catalog_id": catalog_id,
+    }
+
+
+async def closure_rows(session: AsyncSession) -> set[tuple[int, int, int]]:
+    stmt = select(ExpenseCatalogClosure.ancestor_id, ExpenseCatalogClosure.descendant_id, ExpenseCatalogClosure.depth)
+    return {(a, d, depth) for a, d, depth in await session.execute(stmt)}
+
+
+async def test_rollups_follow_a_moved_subtree(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    async with session_factory() as session, session.begin():
+        food = ExpenseCatalog(catalog_name="Food")
+        travel = ExpenseCatalog(catalog_name="Travel")
+        session.add_all([food, travel])
+        await session.flush()
+        groceries = ExpenseCatalog(catalog_name="Groceries", parent_id=food.id)
+        dining = ExpenseCatalog(catalog_name="Dining", parent_id=food.id)
+        session.add_all([groceries, dining])
+        await session.flush()
+        fruit = ExpenseCatalog(catalog_name="Fruit", parent_id=groceries.id)
+        session.add(fruit)
+        await session.flush()
+
+        await LedgerRepository(session).record_batches(
+            [
+                [
+                    spend(SHARED_COST_1, CASH_1, "10", fruit.id),
+                    spend(SHARED_COST_1, CASH_1, "5", groceries.id),
+                    spend(SHARED_COST_2, CASH_2, "7", dining.id),
+                    spend(CASH_1, SHARED_COST_1, "1", fruit.id),  # A refund
+                    spend(SHARED_COST_2, CASH_2, "20", travel.id),
+                ]
+            ]
+        )
+
+    async with session_factory() as session:
+        repo = LedgerRepository(session)
+        assert await repo.get_spending_by_top_level_catalog() == {food.id: Decimal(21), travel.id: Decimal(20)}
+        assert await repo.get_catalog_spending(groceries.id) == Decimal(14)
+        assert await repo.get_catalog_spending(food.id, user_id=1) == Decimal(14)
+        tree = await AccountRepository(session).get_expense_catalog_tree()
+        assert tree.root_of(fruit.id).id == food.id
+
+    async with session_factory() as session, session.begin():
+        moved = await session.get_one(ExpenseCatalog, groceries.id)
+        moved.parent_id = travel.id
+
+    async with session_factory() as session:
+        repo = LedgerRepository(session)
+        assert await repo.get_spending_by_top_level_catalog() == {food.id: Decimal(7), travel.id: Decimal(34)}
+        assert await repo.get_catalog_spending(travel.id, user_id=1) == Decimal(14)
+        assert await repo.get_catalog_spending(groceries.id) == Decimal(14)
+        # The cached tree was dropped when the move committed.
+        tree = await AccountRepository(session).get_expense_catalog_tree()
+        assert [node.id for node in tree.ancestors(fruit.id)] == [groceries.id, travel.id]
+        maintained = await closure_rows(session)
+
+    # Rebuilding from the parent links gives the same rows the listeners kept up to date.
+    async with session_factory() as session, session.begin():
+        assert await AccountRepository(session).rebuild_expense_catalog_closure() == len(maintained)
+        assert await closure_rows(session) == maintained
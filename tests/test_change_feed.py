@@ -0,0 +1,55 @@
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.ledger import net_balance_deltas
+from app.repositories import AccountRepository, ChangeFeedCursorRepository, LedgerRepository
+from app.services.change_feed import ChangeFeedConsumer
+
+CASH_1, AR_1, SHARED_COST_1 = 1100, 1110, 1400
+CASH_2 = 2100
+
+COLUMNS = ("debit_account_entity_id", "credit_account_entity_id", "amount")
+
+LOGS = [
+    {"debit_account_entity_id": debit, "credit_account_entity_id": credit, "amount": Decimal(i + 1)}
+    for i, (debit, credit) in enumerate([(SHARED_COST_1, CASH_1), (AR_1, CASH_1), (CASH_2, AR_1)] * 4)
+]
+
+
+async def balances(session_factory: async_sessionmaker[AsyncSession]) -> dict[int, Decimal]:
+    async with session_factory() as session:
+        return {
+            entity_id: balance for entity_id, balance in await AccountRepository(session).get_all_balances() if balance
+        }
+
+
+async def test_cursor_resumes_after_a_crash_mid_chunk(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches([LOGS[:5], LOGS[5:]])
+
+    calls = 0
+
+    async def apply_deltas(session: AsyncSession, rows: Sequence[Sequence[Any]]) -> None:
+        """Keeps the cached balances from the log; fails once, after writing the third chunk."""
+        nonlocal calls
+        calls += 1
+        await AccountRepository(session).apply_log_deltas([dict(zip(COLUMNS, row[1:], strict=True)) for row in rows])
+        if calls == 3:
+            raise ConnectionError("Connection lost")
+
+    consumer = ChangeFeedConsumer(session_factory, "balances", COLUMNS, chunk_size=4)
+    with pytest.raises(ConnectionError):
+        await consumer.catch_up(apply_deltas)
+    # The failed chunk's writes rolled back with its cursor update.
+    async with session_factory() as session:
+        assert await ChangeFeedCursorRepository(session).get_cursor("balances") == 8
+    assert await balances(session_factory) == net_balance_deltas(LOGS[:8])
+
+    # A new consumer under the same name picks up at the failed chunk and handles each log once.
+    assert await ChangeFeedConsumer(session_factory, "balances", COLUMNS, chunk_size=4).catch_up(apply_deltas) == 4
+    assert await balances(session_factory) == net_balance_deltas(LOGS)
+    assert await consumer.catch_up(apply_deltas) == 0
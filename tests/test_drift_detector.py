@@ -0,0 +1,20 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import get_drift_check_concurrency, get_drift_check_rate
+from app.services.drift_detector import BalanceDriftDetector
+
+
+@pytest.mark.parametrize(("variable", "value"), [("CONCURRENCY", "0"), ("CONCURRENCY", "-2"), ("RATE", "0")])
+def test_drift_checks_need_positive_limits(monkeypatch: pytest.MonkeyPatch, variable: str, value: str) -> None:
+    monkeypatch.setenv(f"DIVVY_DRIFT_CHECK_{variable}", value)
+    with pytest.raises(ValueError, match=f"DIVVY_DRIFT_CHECK_{variable}"):
+        get_drift_check_concurrency() if variable == "CONCURRENCY" else get_drift_check_rate()
+
+
+@pytest.mark.parametrize(("concurrency", "rate"), [(0, 20.0), (2, 0.0)])
+def test_zero_overrides_are_rejected(
+    session_factory: async_sessionmaker[AsyncSession], concurrency: int, rate: float
+) -> None:
+    with pytest.raises(ValueError, match="positive concurrency and rate"):
+        BalanceDriftDetector(session_factory, concurrency=concurrency, rate=rate)
@@ -0,0 +1,79 @@
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.repositories import LedgerRepository
+
+CASH_1, AR_1, SHARED_COST_1 = 1100, 1110, 1400
+CASH_2 = 2100
+
+NOON = datetime(2024, 3, 1, 12, tzinfo=UTC)
+
+
+def log(debit: int, credit: int, created_at: datetime = NOON) -> dict[str, Any]:
+    return {
+        "debit_account_entity_id": debit,
+        "credit_account_entity_id": credit,
+        "amount": Decimal(1),
+        "created_at": created_at,
+    }
+
+
+@pytest.fixture
+async def cash_log_ids(session_factory: async_sessionmaker[AsyncSession]) -> list[int]:
+    """Posts logs with CASH_1 on alternating sides, all at the same instant, between unrelated ones."""
+    logs: list[dict[str, Any]] = []
+    for i in range(20):
+        logs.append(log(CASH_1, AR_1) if i % 3 else log(SHARED_COST_1, CASH_1))
+        logs.append(log(SHARED_COST_1, CASH_2))
+    logs.append(log(CASH_1, CASH_1))  # A self-transfer is listed once
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches([logs])
+        page = await LedgerRepository(session).get_logs_for_entity(CASH_1, limit=100)
+    return sorted(entry.id for entry in page)
+
+
+async def test_pages_back_through_history_without_gaps(
+    session_factory: async_sessionmaker[AsyncSession], cash_log_ids: list[int]
+) -> None:
+    assert len(cash_log_ids) == 21
+
+    seen: list[int] = []
+    before_id: int | None = None
+    async with session_factory() as session:
+        repo = LedgerRepository(session)
+        while page := await repo.get_logs_for_entity(CASH_1, limit=4, before_id=before_id):
+            ids = [entry.id for entry in page]
+            assert ids == sorted(ids, reverse=True)
+            seen.extend(ids)
+            before_id = ids[-1]
+    assert seen == cash_log_ids[::-1]
+
+
+async def test_pages_forward_to_newer_logs_without_gaps(
+    session_factory: async_sessionmaker[AsyncSession], cash_log_ids: list[int]
+) -> None:
+    seen: list[int] = []
+    after_id = 0
+    async with session_factory() as session:
+        repo = LedgerRepository(session)
+        while page := await repo.get_logs_for_entity(CASH_1, limit=4, after_id=after_id):
+            ids = [entry.id for entry in page]
+            assert ids == sorted(ids, reverse=True)  # Each page is still newest first
+            seen.extend(reversed(ids))
+            after_id = ids[0]
+    assert seen == cash_log_ids
+
+
+async def test_pages_can_be_bounded_by_date(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    async with session_factory() as session, session.begin():
+        repo = LedgerRepository(session)
+        await repo.record_batches([[log(CASH_1, AR_1, NOON + timedelta(days=day)) for day in range(5)]])
+
+        page = await repo.get_logs_for_entity(CASH_1, since=NOON + timedelta(days=1), until=NOON + timedelta(days=3))
+        assert [entry.id for entry in page] == [3, 2]
+        with pytest.raises(ValueError, match="either before_id or after_id"):
+            await repo.get_logs_for_entity(CASH_1, before_id=1, after_id=1)
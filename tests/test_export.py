@@ -0,0 +1,87 @@
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.datetime import utc
+from app.core.export import EXPORT_COLUMNS, open_writer
+from app.repositories import LedgerRepository
+from app.services.export import LedgerExportFilter, LedgerExportService
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+CASH_1, AR_1, SHARED_COST_1 = 1100, 1110, 1400
+
+START = datetime(2024, 5, 1, 8, 30, 15, 123456, tzinfo=UTC)
+
+
+@pytest.fixture
+async def exported_rows(session_factory: async_sessionmaker[AsyncSession]) -> list[dict[str, Any]]:
+    logs = [
+        {
+            "debit_account_entity_id": SHARED_COST_1 if i % 2 else AR_1,
+            "credit_account_entity_id": CASH_1,
+            "amount": Decimal("1234567890.1234") / (i + 1),
+            "counterparty_entity_id": None,
+            "narrative": "Café ☕" if i % 3 else None,
+            "created_at": START + timedelta(hours=i),
+            "created_by": 1,
+        }
+        for i in range(10)
+    ]
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches([logs[:4], logs[4:]])
+
+    async with session_factory() as session:
+        rows: list[dict[str, Any]] = []
+        async for chunk in LedgerRepository(session).stream_logs(EXPORT_COLUMNS):
+            rows.extend(dict(zip(EXPORT_COLUMNS, row, strict=True)) for row in chunk)
+    for row in rows:
+        row["created_at"] = utc(row["created_at"])
+    return rows
+
+
+async def export(session_factory: async_sessionmaker[AsyncSession], export_format: str, path: Path) -> int:
+    async with session_factory() as session, session.begin():
+        service = LedgerExportService(session, LedgerRepository(session), chunk_size=3)
+        stats = await service.export(open_writer(export_format, path))
+    return stats.rows
+
+
+@pytest.mark.parametrize("export_format", ["arrow", "parquet"])
+async def test_columnar_exports_round_trip(
+    session_factory: async_sessionmaker[AsyncSession],
+    exported_rows: list[dict[str, Any]],
+    tmp_path: Path,
+    export_format: str,
+) -> None:
+    path = tmp_path / f"ledger.{export_format}"
+    assert await export(session_factory, export_format, path) == 10
+
+    if export_format == "arrow":
+        with pa.ipc.open_file(str(path)) as reader:
+            assert reader.num_record_batches == 4  # One per streamed chunk
+            table = reader.read_all()
+    else:
+        assert pq.ParquetFile(str(path)).num_row_groups == 4
+        table = pq.read_table(str(path))
+
+    assert table.column_names == list(EXPORT_COLUMNS)
+    assert str(table.schema.field("amount").type) == "decimal128(14, 4)"
+    assert table.to_pylist() == exported_rows
+
+
+async def test_filtered_exports_stream_only_matching_logs(
+    session_factory: async_sessionmaker[AsyncSession], exported_rows: list[dict[str, Any]], tmp_path: Path
+) -> None:
+    path = tmp_path / "ledger.arrow"
+    async with session_factory() as session, session.begin():
+        service = LedgerExportService(session, LedgerRepository(session))
+        await service.export(open_writer("arrow", path), LedgerExportFilter(entity_id=AR_1))
+
+    with pa.ipc.open_file(str(path)) as reader:
+        assert reader.read_all().to_pylist() == [row for row in exported_rows if row["debit_account_entity_id"] == AR_1]
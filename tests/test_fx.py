@@ -0,0 +1,83 @@
+from datetime import UTC, datetime
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.fx import FxQuote
+from app.exceptions import BusinessRuleError
+from app.models.ledger import AccountEntity
+from app.repositories import AccountRepository, FxRateRepository, LedgerRepository
+from app.services.reporting import BalanceReportService
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+CASH_2, SHARED_COST_2 = 2100, 2400
+
+JAN, MAR = datetime(2024, 1, 1, tzinfo=UTC), datetime(2024, 3, 1, tzinfo=UTC)
+
+
+def log(debit: int, credit: int, amount: str, currency: str | None) -> dict[str, Any]:
+    return {
+        "debit_account_entity_id": debit,
+        "credit_account_entity_id": credit,
+        "amount": Decimal(amount),
+        "currency": currency,
+    }
+
+
+async def test_logs_must_match_their_entities_currency(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    async with session_factory() as session, session.begin():
+        await session.execute(
+            update(AccountEntity).where(AccountEntity.id.in_([CASH_2, SHARED_COST_2])).values(currency="EUR")
+        )
+
+    for rejected in (
+        log(SHARED_COST_2, CASH_2, "5", None),  # The base currency, USD
+        log(SHARED_COST_2, CASH_2, "5", "USD"),
+        log(SHARED_COST_1, CASH_2, "5", "EUR"),  # Across currencies, whatever the log's
+        log(SHARED_COST_1, CASH_1, "5", "EUR"),
+    ):
+        async with session_factory() as session, session.begin():
+            with pytest.raises(BusinessRuleError, match="kept in"):
+                await LedgerRepository(session).record_batches([[rejected]])
+
+    logs = [log(SHARED_COST_2, CASH_2, "5", "EUR"), log(SHARED_COST_1, CASH_1, "3", "USD")]
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches([logs])
+        await AccountRepository(session).apply_log_deltas(logs)
+
+    async with session_factory() as session:
+        trial_balance = await BalanceReportService(AccountRepository(session)).get_trial_balance()
+    assert trial_balance.total_debits == {"EUR": Decimal(5), "USD": Decimal(3)}
+    assert trial_balance.balanced
+
+
+async def test_rates_are_looked_up_as_of_a_point_in_time(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    async with session_factory() as session, session.begin():
+        await FxRateRepository(session).add_rates(
+            [
+                FxQuote("EUR", "USD", JAN, Decimal("1.10")),
+                FxQuote("EUR", "USD", MAR, Decimal("1.20")),
+                FxQuote("USD", "JPY", JAN, Decimal(150)),
+            ]
+        )
+
+    async with session_factory() as session:
+        rates = await FxRateRepository(session).get_rates()
+    assert rates.rate("EUR", "USD", datetime(2024, 2, 29, 23, 59, tzinfo=UTC)) == Decimal("1.10")
+    assert rates.rate("EUR", "USD", MAR) == Decimal("1.20")  # In effect from effective_at on
+    assert rates.rate("USD", "EUR", MAR) == 1 / Decimal("1.20")
+    assert rates.rate("EUR", "JPY", MAR) == Decimal(180)  # Through the base currency
+    assert rates.convert(Decimal("0.01"), "USD", "EUR", MAR) == Decimal("0.0083")
+    with pytest.raises(ValueError, match="No EUR/USD exchange rate"):
+        rates.rate("EUR", "USD", datetime(2023, 12, 31, tzinfo=UTC))
+
+    # Rates stay cached until new ones commit.
+    async with session_factory() as session, session.begin():
+        repo = FxRateRepository(session)
+        await repo.add_rates([FxQuote("EUR", "USD", MAR, Decimal("1.25"))])
+        assert await repo.get_rates() is rates
+    async with session_factory() as session:
+        assert (await FxRateRepository(session).get_rates()).rate("EUR", "USD", MAR) == Decimal("1.25")
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.datetime import utc_now
+from app.exceptions import ConflictError
+from app.models.ledger import IdempotencyKey, TransactionLog
+from app.repositories import AccountRepository, IdempotencyRepository, LedgerRepository
+from app.services.idempotent_posting import IdempotentPostingService, PostingResult
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+
+LOGS = [{"debit_account_entity_id": SHARED_COST_1, "credit_account_entity_id": CASH_1, "amount": Decimal("12.3")}]
+
+
+async def post(
+    session_factory: async_sessionmaker[AsyncSession],
+    key: str,
+    logs: list[dict[str, Any]] = LOGS,
+    ttl: timedelta | None = None,
+) -> PostingResult:
+    async with session_factory() as session, session.begin():
+        service = IdempotentPostingService(
+            session, LedgerRepository(session), AccountRepository(session), IdempotencyRepository(session), ttl
+        )
+        return await service.post(key, logs)
+
+
+async def count(session_factory: async_sessionmaker[AsyncSession], model: type[Any]) -> int | None:
+    async with session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+async def test_a_key_posts_once_and_replays(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    first = await post(session_factory, "key")
+    # The same content, written differently, replays the original batch.
+    same = [{"debit_account_entity_id": SHARED_COST_1, "credit_account_entity_id": CASH_1, "amount": "12.3000"}]
+    assert await post(session_factory, "key", same) == PostingResult(first.transaction_batch_id, replayed=True)
+    assert not first.replayed
+    assert await count(session_factory, TransactionLog) == 1
+
+
+async def test_a_key_reused_for_other_content_conflicts(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    await post(session_factory, "key")
+    other = [{"debit_account_entity_id": SHARED_COST_1, "credit_account_entity_id": CASH_1, "amount": Decimal(1)}]
+    with pytest.raises(ConflictError):
+        await post(session_factory, "key", other)
+
+
+async def test_an_expired_key_posts_again(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    expired = await post(session_factory, "key", ttl=timedelta(seconds=-1))
+
+    # The expired row has not been swept; it is replaced in the posting transaction.
+    reposted = await post(session_factory, "key")
+    assert not reposted.replayed
+    assert reposted.transaction_batch_id != expired.transaction_batch_id
+    assert await post(session_factory, "key") == PostingResult(reposted.transaction_batch_id, replayed=True)
+    assert await count(session_factory, TransactionLog) == 2
+
+
+async def test_sweeping_deletes_only_expired_keys(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    await post(session_factory, "expired", ttl=timedelta(seconds=-1))
+    await post(session_factory, "live")
+
+    async with session_factory() as session, session.begin():
+        assert await IdempotencyRepository(session).delete_expired() == 1
+        assert await IdempotencyRepository(session).get("expired") is None
+        assert await IdempotencyRepository(session).get("live") is not None
+        assert await IdempotencyRepository(session).get("live", now=utc_now() + timedelta(days=365)) is None
+    assert await count(session_factory, IdempotencyKey) == 1
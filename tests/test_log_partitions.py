@@ -0,0 +1,53 @@
+from datetime import UTC, datetime
+from decimal import Decimal
+from pathlib import Path
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.partitioning import SQLITE_MAX_PARTITIONS, install_log_partitions, log_source, rotate_sqlite_partitions
+from app.models.ledger import LogPartition
+from app.repositories import LedgerRepository
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+
+NOW = datetime(2025, 3, 15, tzinfo=UTC)
+# Fifteen months of logs, one a month: fourteen closed periods, more than SQLite can attach.
+MONTHS = [datetime(2024 + (m - 1) // 12, (m - 1) % 12 + 1, 10, tzinfo=UTC) for m in range(1, 16)]
+
+
+async def test_rotation_stays_within_the_attach_limit(
+    engine: AsyncEngine, session_factory: async_sessionmaker[AsyncSession], tmp_path: Path
+) -> None:
+    logs = [
+        {
+            "debit_account_entity_id": SHARED_COST_1,
+            "credit_account_entity_id": CASH_1,
+            "amount": Decimal(month.month),
+            "created_at": month,
+        }
+        for month in MONTHS
+    ]
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches([logs])
+
+    moved = await rotate_sqlite_partitions(engine, "month", tmp_path / "partitions", now=NOW)
+    assert moved
+
+    # A new connection attaches every registered partition and reads the whole ledger through them.
+    reader = create_async_engine(engine.url)
+    install_log_partitions(reader)
+    try:
+        async with reader.connect() as conn:
+            partitions = (await conn.scalars(select(LogPartition.name))).all()
+            assert 2 <= len(partitions) <= SQLITE_MAX_PARTITIONS
+            attached = (await conn.exec_driver_sql("PRAGMA database_list")).scalars(1).all()
+            assert set(partitions) <= set(attached)
+
+            logs_source = log_source(conn)
+            count, total = (await conn.execute(select(func.count(), func.sum(logs_source.amount)))).one()
+            assert (count, total) == (len(MONTHS), sum(Decimal(month.month) for month in MONTHS))
+            main_count = await conn.scalar(select(func.count()).select_from(log_source(conn, since=NOW)))
+            assert main_count == 1  # Only the open period stays in the main database
+    finally:
+        await reader.dispose()
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.amounts import from_minor_units, sum_to_decimal, to_minor_units
+from app.models.ledger import AccountEntity, TransactionLog
+from app.models.types import minor_units
+from app.repositories import LedgerRepository
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+
+
+@pytest.mark.parametrize(
+    ("amount", "units"),
+    [
+        ("12.34", 123_400),
+        (0.1, 1_000),  # Through the float's shortest repr, not its binary value
+        (7, 70_000),
+        ("0.00005", 1),  # Beyond four places, half rounds away from zero
+        ("-0.00005", -1),
+        ("0.00004", 0),
+    ],
+)
+def test_amounts_convert_to_minor_units(amount: Decimal | float | int | str, units: int) -> None:
+    assert to_minor_units(amount) == units
+
+
+def test_minor_units_convert_back_with_four_places() -> None:
+    assert str(from_minor_units(123_400)) == "12.3400"
+    assert str(from_minor_units(-1)) == "-0.0001"
+    assert sum_to_decimal(None) == 0
+
+
+async def test_amounts_are_stored_as_integers_and_sum_exactly(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    logs = [
+        {"debit_account_entity_id": SHARED_COST_1, "credit_account_entity_id": CASH_1, "amount": amount}
+        for amount in (0.1, 0.2, "0.3", Decimal("0.0001"))
+    ]
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches([logs])
+
+    async with session_factory() as session:
+        stored = (await session.scalars(text("SELECT amount FROM transaction_logs ORDER BY id"))).all()
+        assert stored == [1_000, 2_000, 3_000, 1]
+        assert await session.scalar(select(func.sum(TransactionLog.amount))) == Decimal("0.6001")
+        assert await session.scalar(select(func.sum(minor_units(TransactionLog.amount)))) == 6_001
+
+
+async def test_money_arithmetic_stays_money(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    async with session_factory() as session, session.begin():
+        balance = AccountEntity.current_balance + Decimal("0.1")
+        await session.execute(update(AccountEntity).where(AccountEntity.id == CASH_1).values(current_balance=balance))
+        assert await session.scalar(select(balance).where(AccountEntity.id == CASH_1)) == Decimal("0.2")
+        assert (
+            await session.scalar(text("SELECT current_balance FROM account_entities WHERE id = :id"), {"id": CASH_1})
+            == 1_000
+        )
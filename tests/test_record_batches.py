@@ -0,0 +1,54 @@
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.ledger import TransactionLog
+from app.repositories import LedgerRepository
+
+CASH_1, SHARED_COST_1, SHARED_COST_2 = 1100, 1400, 2400
+
+
+def log(debit: int, credit: int, amount: str) -> dict[str, Any]:
+    return {"debit_account_entity_id": debit, "credit_account_entity_id": credit, "amount": Decimal(amount)}
+
+
+async def test_each_batch_gets_its_own_id(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    batches = [
+        [log(SHARED_COST_1, CASH_1, "10")],
+        [log(SHARED_COST_1, CASH_1, "5"), log(SHARED_COST_2, CASH_1, "5")],
+        [log(SHARED_COST_2, CASH_1, "1.25")],
+    ]
+    async with session_factory() as session, session.begin():
+        batch_ids = await LedgerRepository(session).record_batches(batches)
+
+    assert len(set(batch_ids)) == 3
+    async with session_factory() as session:
+        stmt = select(TransactionLog.transaction_batch_id, func.count(), func.sum(TransactionLog.amount)).group_by(
+            TransactionLog.transaction_batch_id
+        )
+        logged = {batch_id: (count, total) for batch_id, count, total in await session.execute(stmt)}
+    assert logged == {
+        batch_ids[0]: (1, Decimal("10")),
+        batch_ids[1]: (2, Decimal("10")),
+        batch_ids[2]: (1, Decimal("1.25")),
+    }
+
+
+async def test_batches_roll_back_with_the_caller(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    async with session_factory() as session:
+        await LedgerRepository(session).record_batches([[log(SHARED_COST_1, CASH_1, "10")]])
+        await session.rollback()
+
+    async with session_factory() as session:
+        assert await session.scalar(select(func.count()).select_from(TransactionLog)) == 0
+
+
+async def test_given_batch_ids_must_match_the_batches(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    async with session_factory() as session, session.begin():
+        with pytest.raises(ValueError, match="Expected 2 batch IDs"):
+            await LedgerRepository(session).record_batches(
+                [[log(SHARED_COST_1, CASH_1, "1")], [log(SHARED_COST_1, CASH_1, "2")]], batch_ids=[7]
+            )
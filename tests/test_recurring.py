@@ -0,0 +1,77 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.ledger import RecurringExpense, RecurringExpenseOccurrence, TransactionLog
+from app.repositories import AccountRepository, LedgerRepository, RecurringExpenseRepository
+from app.services.recurring import MaterializeStats, RecurringExpenseService
+
+CASH_1, AP_2 = 1100, 2210
+
+
+def service_for(session: AsyncSession) -> RecurringExpenseService:
+    return RecurringExpenseService(
+        session, LedgerRepository(session), AccountRepository(session), RecurringExpenseRepository(session)
+    )
+
+
+async def materialize(session_factory: async_sessionmaker[AsyncSession], until: date) -> MaterializeStats:
+    async with session_factory() as session, session.begin():
+        return await service_for(session).materialize(until)
+
+
+async def test_reruns_post_each_occurrence_once(
+    session_factory: async_sessionmaker[AsyncSession], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async with session_factory() as session, session.begin():
+        rent = await service_for(session).create(
+            payer_id=1,
+            amount=Decimal(30),
+            participant_ids=[1, 2],
+            interval_unit="month",
+            starts_on=date(2024, 1, 31),
+            ends_on=date(2024, 4, 30),
+        )
+
+    assert await materialize(session_factory, date(2024, 3, 15)) == MaterializeStats(1, 2, 0)
+    assert await materialize(session_factory, date(2024, 3, 15)) == MaterializeStats(0, 0, 0)
+
+    # A run that fails after posting its batches, before committing, leaves the schedule
+    # where the last committed run left it.
+    calls = 0
+
+    async def crash(self: RecurringExpenseRepository, *args: object, **kwargs: object) -> None:
+        nonlocal calls
+        calls += 1
+        raise ConnectionError("Connection lost")
+
+    monkeypatch.setattr(RecurringExpenseRepository, "advance", crash)
+    with pytest.raises(ConnectionError):
+        await materialize(session_factory, date(2024, 12, 31))
+    assert calls == 1
+    monkeypatch.undo()
+
+    assert await materialize(session_factory, date(2024, 12, 31)) == MaterializeStats(1, 2, 1)
+    assert await materialize(session_factory, date(2024, 12, 31)) == MaterializeStats(0, 0, 0)
+
+    async with session_factory() as session:
+        due = await session.scalars(
+            select(RecurringExpenseOccurrence.due_on).order_by(RecurringExpenseOccurrence.occurrence)
+        )
+        # Month-end dates are clamped, never drifting to the 29th.
+        assert due.all() == [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)]
+        batches = await session.scalar(select(func.count(func.distinct(TransactionLog.transaction_batch_id))))
+        assert batches == 4
+        schedule = await session.get_one(RecurringExpense, rent.id)
+        assert not schedule.is_active
+
+        repo = AccountRepository(session)
+        balances: dict[int, Decimal] = {}
+        for entity_id in (CASH_1, AP_2):
+            entity = await repo.get_entity_by_id(entity_id)
+            assert entity is not None
+            balances[entity_id] = entity.current_balance
+    assert balances == {CASH_1: -120, AP_2: -60}
@@ -0,0 +1,66 @@
+import shutil
+from collections.abc import AsyncIterator
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.session import ReplicaRouter
+from app.models.ledger import TransactionLog
+from app.repositories import AccountRepository, LedgerRepository
+from app.services.reporting import BalanceReportService
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+
+
+async def post(session: AsyncSession, amount: str) -> None:
+    logs = [{"debit_account_entity_id": SHARED_COST_1, "credit_account_entity_id": CASH_1, "amount": Decimal(amount)}]
+    await LedgerRepository(session).record_batches([logs])
+    await AccountRepository(session).apply_log_deltas(logs)
+
+
+@pytest.fixture
+async def router(
+    engine: AsyncEngine, session_factory: async_sessionmaker[AsyncSession], tmp_path: Path
+) -> AsyncIterator[ReplicaRouter]:
+    """A router whose replica is a copy of the database taken after the first of two postings."""
+    async with session_factory() as session, session.begin():
+        await post(session, "1")
+    shutil.copy(tmp_path / "divvy.db", tmp_path / "replica.db")
+    async with session_factory() as session, session.begin():
+        await post(session, "2")
+
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    yield ReplicaRouter(engine, replica)
+    await replica.dispose()
+
+
+async def test_read_only_methods_read_the_replica_until_the_session_writes(router: ReplicaRouter) -> None:
+    async with router.session_factory()() as session:
+        repo = LedgerRepository(session)
+        assert len(await repo.get_logs_for_entity(CASH_1)) == 1  # The replica's copy
+        assert await session.scalar(select(func.count()).select_from(TransactionLog)) == 2  # Unmarked: primary
+
+        await post(session, "3")
+        # Pinned to the primary once written, so the session reads its own posting.
+        assert len(await repo.get_logs_for_entity(CASH_1)) == 3
+
+
+async def test_cached_trial_balances_are_loaded_from_the_primary(router: ReplicaRouter) -> None:
+    async with router.session_factory()() as session:
+        trial_balance = await BalanceReportService(AccountRepository(session)).get_trial_balance()
+        assert sum(trial_balance.total_debits.values()) == Decimal(3)
+
+
+async def test_reads_fall_back_to_the_primary_when_the_lag_is_unknown(
+    router: ReplicaRouter, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async def fail(self: ReplicaRouter) -> float | None:
+        raise ConnectionError("Connection lost")
+
+    monkeypatch.setattr(ReplicaRouter, "_measure_lag", fail)
+    async with router.session_factory()() as session:
+        assert len(await LedgerRepository(session).get_logs_for_entity(CASH_1)) == 2
+    assert not router.replica_usable
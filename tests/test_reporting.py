@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.repositories import AccountRepository, LedgerRepository
+from app.services.reporting import BalanceReportService, BalanceSheet, TrialBalance
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+CASH_2, SHARED_COST_2 = 2100, 2400
+
+
+async def post(session_factory: async_sessionmaker[AsyncSession], debit: int, credit: int, amount: str) -> None:
+    logs = [{"debit_account_entity_id": debit, "credit_account_entity_id": credit, "amount": Decimal(amount)}]
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches([logs])
+        await AccountRepository(session).apply_log_deltas(logs)
+
+
+async def reports(session_factory: async_sessionmaker[AsyncSession]) -> tuple[BalanceSheet, BalanceSheet, TrialBalance]:
+    async with session_factory() as session:
+        service = BalanceReportService(AccountRepository(session))
+        return await service.get_balance_sheet(1), await service.get_balance_sheet(2), await service.get_trial_balance()
+
+
+def same(reloaded: tuple[object, ...], cached: tuple[object, ...]) -> bool:
+    return all(a is b for a, b in zip(reloaded, cached, strict=True))
+
+
+def balance_of(sheet: BalanceSheet, entity_id: int) -> Decimal:
+    return next(line.balance for line in sheet.lines if line.account_entity_id == entity_id)
+
+
+async def test_cached_reports_are_invalidated_by_committed_postings(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    await post(session_factory, SHARED_COST_1, CASH_1, "10")
+    sheet_1, sheet_2, trial_balance = await reports(session_factory)
+    assert balance_of(sheet_1, CASH_1) == Decimal(-10)
+    assert trial_balance.balanced
+    # Served from the cache while nothing changes
+    assert same(await reports(session_factory), (sheet_1, sheet_2, trial_balance))
+
+    await post(session_factory, SHARED_COST_1, CASH_1, "2.5")
+    new_sheet_1, new_sheet_2, new_trial_balance = await reports(session_factory)
+    assert balance_of(new_sheet_1, CASH_1) == Decimal("-12.5")
+    assert balance_of(new_sheet_1, SHARED_COST_1) == Decimal("12.5")
+    assert new_sheet_2 is sheet_2  # User 2's entities did not change
+    assert new_trial_balance is not trial_balance
+    assert sum(new_trial_balance.total_debits.values()) == Decimal("12.5")
+    assert new_trial_balance.balanced
+
+
+async def test_rolled_back_postings_keep_the_cached_reports(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    cached = await reports(session_factory)
+
+    logs = [{"debit_account_entity_id": SHARED_COST_2, "credit_account_entity_id": CASH_2, "amount": Decimal(3)}]
+    async with session_factory() as session:
+        await AccountRepository(session).apply_log_deltas(logs)
+        await session.rollback()
+
+    assert same(await reports(session_factory), cached)
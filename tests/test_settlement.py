@@ -0,0 +1,84 @@
+import random
+from collections import defaultdict
+from collections.abc import Iterator
+from decimal import Decimal
+
+import pytest
+
+from app.core.settlement import Transfer, plan_transfers, plan_transfers_exact, plan_transfers_greedy
+
+
+def positions_of(*amounts: Decimal | int | str) -> dict[int, Decimal]:
+    return {member_id: Decimal(amount) for member_id, amount in enumerate(amounts, start=1)}
+
+
+def partitions(members: list[int]) -> Iterator[list[list[int]]]:
+    if not members:
+        yield []
+        return
+    first, rest = members[0], members[1:]
+    for partition in partitions(rest):
+        yield [[first], *partition]
+        for i in range(len(partition)):
+            yield [*partition[:i], [first, *partition[i]], *partition[i + 1 :]]
+
+
+def fewest_transfers(positions: dict[int, Decimal]) -> int:
+    """Brute force: members with a balance, less the most disjoint zero-sum groups they split into."""
+    members = [member_id for member_id, amount in positions.items() if amount]
+    most_groups = max(
+        sum(1 for group in partition if sum(positions[m] for m in group) == 0) for partition in partitions(members)
+    )
+    return len(members) - most_groups
+
+
+def assert_settles(positions: dict[int, Decimal], transfers: list[Transfer]) -> None:
+    balances: defaultdict[int, Decimal] = defaultdict(Decimal, positions)
+    for debtor_id, creditor_id, amount in transfers:
+        assert amount > 0
+        balances[debtor_id] += amount
+        balances[creditor_id] -= amount
+    assert not any(balances.values())
+
+
+def test_exact_plans_beat_greedy_where_a_subgroup_settles_alone() -> None:
+    # Members 2 and 6 settle between themselves; greedy pairs 2 with 1 instead.
+    positions = positions_of(-9, 7, -2, 5, 6, -7)
+    greedy, exact = plan_transfers_greedy(positions), plan_transfers_exact(positions)
+
+    assert (len(greedy), len(exact)) == (5, 4)
+    assert Transfer(6, 2, Decimal(7)) in exact
+    assert_settles(positions, greedy)
+    assert_settles(positions, exact)
+
+
+def test_plans_settle_every_balance_with_the_fewest_transfers() -> None:
+    rng = random.Random(9)
+    for _ in range(300):
+        amounts = [Decimal(rng.randint(-20, 20)).scaleb(-rng.randint(0, 2)) for _ in range(rng.randint(1, 6))]
+        positions = positions_of(*amounts, -sum(amounts, Decimal(0)))
+
+        exact = plan_transfers_exact(positions)
+        assert len(exact) == fewest_transfers(positions)
+        assert_settles(positions, exact)
+
+        greedy = plan_transfers_greedy(positions)
+        assert len(greedy) <= max(sum(1 for amount in positions.values() if amount) - 1, 0)
+        assert_settles(positions, greedy)
+
+
+def test_large_groups_fall_back_to_greedy() -> None:
+    positions = positions_of(*([1] * 10), *([-1] * 10))
+    with pytest.raises(ValueError, match="at most 15 members"):
+        plan_transfers_exact(positions)
+
+    transfers = plan_transfers(positions)
+    assert len(transfers) == 10
+    assert_settles(positions, transfers)
+    small = positions_of(-9, 7, -2, 5, 6, -7)
+    assert plan_transfers(small, exact_max_members=4) == plan_transfers_greedy(small)
+
+
+def test_unbalanced_positions_are_rejected() -> None:
+    with pytest.raises(ValueError, match="sum to zero, got 1"):
+        plan_transfers(positions_of(5, -4))
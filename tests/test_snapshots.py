@@ -0,0 +1,65 @@
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.ledger import LogIdGaps
+from app.models.ledger import TransactionLog
+from app.repositories import BalanceSnapshotRepository
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+
+JANUARY = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+async def post(
+    session_factory: async_sessionmaker[AsyncSession], log_id: int, amount: str, created_at: datetime
+) -> None:
+    async with session_factory() as session, session.begin():
+        await session.execute(
+            insert(TransactionLog).values(
+                id=log_id,
+                transaction_batch_id=log_id,
+                debit_account_entity_id=SHARED_COST_1,
+                credit_account_entity_id=CASH_1,
+                amount=Decimal(amount),
+                created_at=created_at,
+            )
+        )
+
+
+async def snapshot(session_factory: async_sessionmaker[AsyncSession], gaps: LogIdGaps) -> int:
+    async with session_factory() as session, session.begin():
+        return await BalanceSnapshotRepository(session).take_snapshot(gaps)
+
+
+def test_gaps_hold_the_mark_until_they_settle() -> None:
+    gaps = LogIdGaps(timedelta(hours=1))
+    assert gaps.settled(0, [1, 2, 4, 5]) == 2  # 3 may not have committed yet
+    assert gaps.settled(2, [3, 4, 5]) == 3  # It did
+    assert gaps.settled(5, [6, 8]) == 1
+
+    assert LogIdGaps(timedelta(0)).settled(5, [6, 8]) == 2  # No delay: gaps are skipped at once
+
+
+async def test_a_late_commit_below_the_mark_is_snapshotted(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    gaps = LogIdGaps(timedelta(hours=1))
+    # Log 2 is still being posted (backdated, as statement imports do) when the first snapshot runs.
+    await post(session_factory, 1, "10", JANUARY)
+    await post(session_factory, 3, "1", JANUARY + timedelta(days=2))
+    assert await snapshot(session_factory, gaps) == 2
+    async with session_factory() as session:
+        assert await BalanceSnapshotRepository(session).get_last_snapshot_log_id() == 1
+
+    await post(session_factory, 2, "5", JANUARY + timedelta(days=1))
+    await snapshot(session_factory, gaps)
+
+    async with session_factory() as session:
+        repo = BalanceSnapshotRepository(session)
+        assert await repo.get_last_snapshot_log_id() == 3
+        latest = await repo.get_latest_snapshot(SHARED_COST_1)
+        assert latest is not None
+        assert latest.balance == Decimal(16)
+        assert await repo.as_of(SHARED_COST_1, JANUARY + timedelta(days=1)) == Decimal(15)
+        assert await repo.as_of(CASH_1, JANUARY + timedelta(days=3)) == Decimal(-16)
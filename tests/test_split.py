@@ -0,0 +1,128 @@
+import random
+from decimal import Decimal
+from fractions import Fraction
+
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.amounts import from_minor_units, to_minor_units
+from app.core.split import Expense, Share, allocate_largest_remainder, split_expenses
+from app.exceptions import BusinessRuleError
+from app.repositories import AccountRepository, LedgerRepository
+from app.services.split import SplitService
+
+CASH_1, AR_1, SHARED_COST_1 = 1100, 1110, 1400
+AP_2, SHARED_COST_2 = 2210, 2400
+
+
+def reference_split(total: int, weights: list[int]) -> list[int]:
+    """Largest remainder with exact fractions: leftover units go to the largest remainders, earlier first."""
+    exact = [Fraction(total * weight, sum(weights)) for weight in weights]
+    shares = [int(share) for share in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: (-(exact[i] - shares[i]), i))
+    for i in by_remainder[: total - sum(shares)]:
+        shares[i] += 1
+    return shares
+
+
+def amounts(shares: list[Share]) -> list[str]:
+    return [str(share.amount) for share in shares]
+
+
+def test_leftover_units_go_to_the_largest_remainders_first() -> None:
+    [equal, weighted] = split_expenses(
+        [
+            Expense(payer_id=1, amount=Decimal("0.0002"), participant_ids=[1, 2, 3]),
+            Expense(payer_id=1, amount=Decimal("1"), participant_ids=[1, 2, 3], method="weighted", values=[1, 2, 4]),
+        ]
+    )
+    # Ties go to the earlier participant.
+    assert amounts(equal) == ["0.0001", "0.0001", "0.0000"]
+    # 10000 units by 1:2:4 is 1428.57 / 2857.14 / 5714.29: the two leftover units go to the .57 and the .29.
+    assert amounts(weighted) == ["0.1429", "0.2857", "0.5714"]
+    assert [share.user_id for share in weighted] == [1, 2, 3]
+
+
+def test_shares_match_an_exact_reference() -> None:
+    rng = random.Random(21)
+    expenses: list[Expense] = []
+    for _ in range(3000):
+        count = rng.randint(1, 8)
+        amount = from_minor_units(rng.randint(0, 10**9))
+        match rng.choice(("equal", "weighted", "percentage")):
+            case "equal":
+                expenses.append(Expense(1, amount, list(range(count))))
+            case "weighted":
+                values = [rng.randint(0, 50) for _ in range(count - 1)] + [rng.randint(1, 50)]
+                expenses.append(Expense(1, amount, list(range(count)), "weighted", values))
+            case _:
+                cuts = sorted(rng.randint(0, 10_000) for _ in range(count - 1))
+                bounds = [0, *cuts, 10_000]
+                values = [Decimal(high - low).scaleb(-2) for low, high in zip(bounds, bounds[1:], strict=False)]
+                expenses.append(Expense(1, amount, list(range(count)), "percentage", values))
+
+    for expense, shares in zip(expenses, split_expenses(expenses), strict=True):
+        if expense.method == "equal":
+            weights = [1] * len(expense.participant_ids)
+        else:
+            assert expense.values is not None
+            weights = [int(Decimal(value).scaleb(2)) for value in expense.values]
+        assert [to_minor_units(share.amount) for share in shares] == reference_split(
+            to_minor_units(expense.amount), weights
+        )
+
+
+def test_fixed_shares_are_used_as_given() -> None:
+    [shares] = split_expenses([Expense(1, Decimal(10), [1, 2], "fixed", ["2.5", "7.5"])])
+    assert amounts(shares) == ["2.5000", "7.5000"]
+
+
+@pytest.mark.parametrize(
+    ("expense", "message"),
+    [
+        (Expense(1, Decimal(10), [1, 2], "percentage", [50, 40]), "percentages total 90, not 100"),
+        (Expense(1, Decimal(10), [1, 2], "percentage", ["33.3", "66.6"]), "percentages total 99.9, not 100"),
+        (Expense(1, Decimal(10), [1, 2], "fixed", ["2.5", "7"]), "fixed shares total 9.5000, not 10"),
+        (Expense(1, Decimal(10), [1, 2], "weighted", [0, 0]), "weights must not all be zero"),
+        (Expense(1, Decimal(10), [1, 2], "weighted", [1]), "one value per participant"),
+        (Expense(1, Decimal(10), [1, 1]), "duplicate participants"),
+        (Expense(1, Decimal(-1), [1]), "must not be negative"),
+        (Expense(1, Decimal(10), [1], "shares"), "unknown split method"),
+    ],
+)
+def test_invalid_expenses_are_rejected(expense: Expense, message: str) -> None:
+    valid = Expense(1, Decimal(1), [1, 2])
+    with pytest.raises(ValueError, match=f"Expense 1: .*{message}"):
+        split_expenses([valid, expense])
+
+
+def test_large_totals_fall_back_to_exact_integers() -> None:
+    # total * weight overflows int64, so the products are computed on Python ints.
+    total, weights = 10**15, [3_000_001, 2_999_999, 1]
+    assert total * max(weights) > np.iinfo(np.int64).max
+    shares = allocate_largest_remainder(
+        np.array([total], dtype=np.int64), np.array([3], dtype=np.int64), np.array(weights, dtype=np.int64)
+    )
+    assert shares.dtype == np.int64
+    assert shares.tolist() == reference_split(total, weights)
+
+    [split] = split_expenses([Expense(1, from_minor_units(total), [1, 2, 3], "weighted", weights)])
+    assert [to_minor_units(share.amount) for share in split] == reference_split(total, weights)
+
+
+async def test_shares_are_posted_as_receivables_and_costs(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    async with session_factory() as session, session.begin():
+        service = SplitService(session, LedgerRepository(session), AccountRepository(session))
+        await service.post([Expense(payer_id=1, amount=Decimal("10"), participant_ids=[1, 2], method="equal")])
+        with pytest.raises(BusinessRuleError, match="no participants"):
+            await service.build_batches([Expense(payer_id=1, amount=Decimal(1), participant_ids=[])])
+
+    async with session_factory() as session:
+        repo = AccountRepository(session)
+        balances: dict[int, Decimal] = {}
+        for entity_id in (CASH_1, AR_1, SHARED_COST_1, AP_2, SHARED_COST_2):
+            entity = await repo.get_entity_by_id(entity_id)
+            assert entity is not None
+            balances[entity_id] = entity.current_balance
+    assert balances == {CASH_1: -10, AR_1: 5, SHARED_COST_1: 5, AP_2: -5, SHARED_COST_2: 5}
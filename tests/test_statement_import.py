@@ -0,0 +1,117 @@
+from datetime import UTC, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.datetime import utc
+from app.core.statements import iter_statement_rows
+from app.models.ledger import ImportedStatementLine, TransactionLog
+from app.repositories import AccountRepository
+from app.services.statement_import import StatementImportService
+
+CASH_1 = 1100
+
+LINES = [
+    "2024-01-01,Coffee,-4.50",
+    "2024-01-02,Groceries,-20.00",
+    '2024-01-03,"Rent, flat 2",-800.00',
+    "2024-01-04,Refund,12.00",
+    "2024-01-05,Coffee,-4.50",
+    "2024-01-05,Coffee,-4.50",  # A second, identical purchase that day
+]
+
+
+def write_statement(path: Path, lines: list[str]) -> Path:
+    path.write_text("\n".join(["date,description,amount", *lines]) + "\n", encoding="utf-8")
+    return path
+
+
+async def ledger_counts(session_factory: async_sessionmaker[AsyncSession]) -> tuple[int | None, int | None]:
+    async with session_factory() as session:
+        return (
+            await session.scalar(select(func.count()).select_from(TransactionLog)),
+            await session.scalar(select(func.count()).select_from(ImportedStatementLine)),
+        )
+
+
+async def cash_balance(session_factory: async_sessionmaker[AsyncSession]) -> Decimal | None:
+    async with session_factory() as session:
+        entity = await AccountRepository(session).get_entity_by_id(CASH_1)
+        return entity.current_balance if entity else None
+
+
+def test_rows_resume_after_an_end_offset(tmp_path: Path) -> None:
+    path = write_statement(tmp_path / "statement.csv", LINES)
+    rows = list(iter_statement_rows(path, "csv"))
+
+    assert [row.description for row in rows[:3]] == ["Coffee", "Groceries", "Rent, flat 2"]
+    assert list(iter_statement_rows(path, "csv", rows[2].end_offset)) == rows[3:]
+
+
+async def test_import_posts_every_line_once(tmp_path: Path, session_factory: async_sessionmaker[AsyncSession]) -> None:
+    path = write_statement(tmp_path / "statement.csv", LINES)
+    service = StatementImportService(session_factory, chunk_size=2)
+
+    stats = await service.import_file(path, owner_id=1)
+    assert (stats.lines, stats.posted, stats.duplicates, stats.resumed_from) == (6, 6, 0, 0)
+    assert await cash_balance(session_factory) == Decimal("-821.50")
+
+    again = await service.import_file(path, owner_id=1)
+    assert (again.lines, again.posted, again.resumed_from) == (0, 0, path.stat().st_size)
+    assert await ledger_counts(session_factory) == (6, 6)
+
+
+async def test_lines_are_dated_on_their_posting_day(
+    tmp_path: Path, session_factory: async_sessionmaker[AsyncSession]
+) -> None:
+    await StatementImportService(session_factory).import_file(write_statement(tmp_path / "s.csv", LINES), owner_id=1)
+
+    async with session_factory() as session:
+        dates = (await session.scalars(select(TransactionLog.created_at).order_by(TransactionLog.id))).all()
+    assert [utc(created_at) for created_at in dates] == [
+        datetime(2024, 1, day, tzinfo=UTC) for day in (1, 2, 3, 4, 5, 5)
+    ]
+
+
+async def test_an_interrupted_import_resumes_after_its_last_chunk(
+    tmp_path: Path, session_factory: async_sessionmaker[AsyncSession], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = write_statement(tmp_path / "statement.csv", LINES)
+    service = StatementImportService(session_factory, chunk_size=2)
+    post_chunk = StatementImportService._post_chunk  # pyright: ignore[reportPrivateUsage]
+    calls = 0
+
+    async def crash_on_second_chunk(self: StatementImportService, *args: Any) -> tuple[int, int, int]:
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise ConnectionError("Connection lost")
+        return await post_chunk(self, *args)
+
+    monkeypatch.setattr(StatementImportService, "_post_chunk", crash_on_second_chunk)
+    with pytest.raises(ConnectionError):
+        await service.import_file(path, owner_id=1)
+    assert await ledger_counts(session_factory) == (2, 2)
+
+    monkeypatch.undo()
+    stats = await service.import_file(path, owner_id=1)
+    assert stats.resumed_from > 0
+    assert (stats.lines, stats.posted, stats.duplicates) == (4, 4, 0)
+    assert await ledger_counts(session_factory) == (6, 6)
+    assert await cash_balance(session_factory) == Decimal("-821.50")
+
+
+async def test_overlapping_statements_skip_imported_lines(
+    tmp_path: Path, session_factory: async_sessionmaker[AsyncSession]
+) -> None:
+    service = StatementImportService(session_factory, chunk_size=2)
+    await service.import_file(write_statement(tmp_path / "january.csv", LINES[:4]), owner_id=1)
+
+    # A later export repeats two of the lines, and adds both purchases of January 5th.
+    stats = await service.import_file(write_statement(tmp_path / "export.csv", LINES[2:]), owner_id=1)
+    assert (stats.lines, stats.posted, stats.duplicates) == (4, 2, 2)
+    assert await ledger_counts(session_factory) == (6, 6)
@@ -0,0 +1,87 @@
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.repositories import LedgerRepository, StatusRepository
+
+CASH_1, AR_1, UR_1, SHARED_COST_1 = 1100, 1110, 1220, 1400
+CASH_2, AP_2, SHARED_COST_2 = 2100, 2210, 2400
+
+
+def log(debit: int, credit: int, amount: str, counterparty: int | None = None) -> dict[str, Any]:
+    return {
+        "debit_account_entity_id": debit,
+        "credit_account_entity_id": credit,
+        "amount": Decimal(amount),
+        "counterparty_entity_id": counterparty,
+    }
+
+
+# User 1 pays a 60.00 dinner shared equally with user 2.
+DINNER = [
+    log(SHARED_COST_1, CASH_1, "30"),
+    log(AR_1, CASH_1, "30", counterparty=AP_2),
+    log(SHARED_COST_2, AP_2, "30", counterparty=AR_1),
+]
+
+
+def repayment(amount: str) -> list[dict[str, Any]]:
+    """User 2 pays `amount` of the debt back in cash."""
+    return [log(CASH_1, AR_1, amount, counterparty=AP_2), log(AP_2, CASH_2, amount, counterparty=AR_1)]
+
+
+async def post(session_factory: async_sessionmaker[AsyncSession], *batches: list[dict[str, Any]]) -> None:
+    async with session_factory() as session, session.begin():
+        await LedgerRepository(session).record_batches(batches)
+
+
+async def lookups(session: AsyncSession) -> tuple[Decimal | None, Decimal | None, Decimal, Decimal, list[int]]:
+    repo = StatusRepository(session)
+    cash_1, cash_2 = await repo.get_cash_status(CASH_1), await repo.get_cash_status(CASH_2)
+    return (
+        cash_1.current_balance if cash_1 else None,
+        cash_2.current_balance if cash_2 else None,
+        await repo.get_amount_owed(AR_1, AP_2),
+        await repo.get_amount_due(AP_2, AR_1),
+        [item.counterparty_entity_id for item in await repo.get_receivables(AR_1)],
+    )
+
+
+async def test_postings_maintain_cash_and_debts(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    await post(session_factory, DINNER)
+    async with session_factory() as session:
+        assert await lookups(session) == (Decimal(-60), None, Decimal(30), Decimal(30), [AP_2])
+
+    await post(session_factory, repayment("10"))
+    async with session_factory() as session:
+        assert await lookups(session) == (Decimal(-50), Decimal(-10), Decimal(20), Decimal(20), [AP_2])
+
+    await post(session_factory, repayment("20"))
+    async with session_factory() as session:
+        assert await lookups(session) == (Decimal(-30), Decimal(-30), Decimal(0), Decimal(0), [])
+
+
+async def test_rebuild_matches_incremental_maintenance(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    await post(session_factory, DINNER, repayment("10"))
+    await post(session_factory, repayment("5"))
+    async with session_factory() as session:
+        incremental = await lookups(session)
+
+    async with session_factory() as session, session.begin():
+        assert await StatusRepository(session).rebuild() == 7
+    async with session_factory() as session:
+        assert await lookups(session) == incremental
+
+
+async def test_prepayments_track_their_settlement(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    # User 2 prepays 15.00 to user 1, who then spends 5.00 of it on user 2's behalf.
+    await post(
+        session_factory, [log(CASH_1, UR_1, "15", counterparty=AP_2)], [log(UR_1, CASH_1, "5", counterparty=AP_2)]
+    )
+
+    async with session_factory() as session:
+        prepayments = await StatusRepository(session).get_prepayments(UR_1)
+        assert [(p.counterparty_entity_id, p.amount_prepaid, p.settled_amount) for p in prepayments] == [
+            (AP_2, Decimal(15), Decimal(5))
+        ]
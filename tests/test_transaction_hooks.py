@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.change_feed import ledger_change_feed
+from app.db.events import on_commit, on_rollback
+from app.db.sequences import BatchIdAllocator
+from app.repositories import LedgerRepository
+
+CASH_1, SHARED_COST_1 = 1100, 1400
+
+LOGS = [{"debit_account_entity_id": SHARED_COST_1, "credit_account_entity_id": CASH_1, "amount": Decimal(1)}]
+
+
+async def test_a_rolled_back_savepoint_only_undoes_its_own_hooks(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    fired: list[str] = []
+    async with session_factory() as session, session.begin():
+        on_commit(session, lambda: fired.append("outer commit"))
+        on_rollback(session, lambda: fired.append("outer rollback"))
+
+        savepoint = await session.begin_nested()
+        on_commit(session, lambda: fired.append("savepoint commit"))
+        on_rollback(session, lambda: fired.append("savepoint rollback"))
+        await savepoint.rollback()
+        assert fired == ["savepoint rollback"]
+
+        async with session.begin_nested():
+            on_commit(session, lambda: fired.append("released commit"))
+        assert fired == ["savepoint rollback"]
+
+    assert fired == ["savepoint rollback", "outer commit", "released commit"]
+
+
+async def test_batches_of_a_rolled_back_savepoint_are_not_published(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    with ledger_change_feed.subscribe() as subscription:
+        async with session_factory() as session, session.begin():
+            repo = LedgerRepository(session)
+            [kept] = await repo.record_batches([LOGS])
+            savepoint = await session.begin_nested()
+            await repo.record_batches([LOGS])
+            await savepoint.rollback()
+
+        assert [change.batch_ids for change in subscription.take().changes] == [(kept,)]
+
+
+async def test_a_rolled_back_savepoint_keeps_earlier_id_blocks(
+    engine: AsyncEngine, session_factory: async_sessionmaker[AsyncSession]
+) -> None:
+    allocator = BatchIdAllocator(engine, block_size=3)
+    async with session_factory() as session, session.begin():
+        assert await allocator.reserve(1, session) == [1]
+        savepoint = await session.begin_nested()
+        assert await allocator.reserve(4, session) == [2, 3, 4, 5]  # Drains the first block, then reserves 4-6
+        await savepoint.rollback()
+        assert await allocator.reserve(1, session) == [4]  # 4-6 were undone with the savepoint
+
+    async with session_factory() as session, session.begin():
+        assert await allocator.reserve(3, session) == [5, 6, 7]